@@ -1,2 +1,17 @@
 from .manager import Manager
 from .structure import Structures
+from .hashes import FileHashCache
+from .registry import MoleculeRegistry, MoleculeView
+from .library import LigandLibrary
+from .staging import FileStager
+from .cache import DiskCache
+from .geometry import ReceptorGeometry
+from .cost import JobCostModel
+from .events import ComplexEvents
+from .pipeline import StreamPipeline
+from .journal import ProgressJournal
+from .complexes import ComplexStore
+from .tables import TableStore, TableRef
+from .results import ResultChannel
+from .sessions import RESTSession, RESTSessionError, SessionPool
+from .interactions import InteractionEngine
@@ -0,0 +1,275 @@
+import os as OS
+import time as Time
+import shutil as SHUTIL
+import hashlib as HashLib
+import contextlib as ContextLib
+
+try:
+  import fcntl as FCntl
+except ImportError:
+  # Windows: runs sharing a cache are not coordinated
+  FCntl = None
+
+from ..sieveaibase import EntityPath
+from .staging import FileStager
+
+class DiskCache():
+  """Directory backed cache where every entry is a sub-directory named by its key.
+
+    _cache = DiskCache(path, max_size=20 * 1024 ** 3, max_age=30 * 86400)
+    _key = _cache.key(receptor_hash, center, size, spacing)
+    _entry = _cache.get(_key)
+    if _entry is None:
+      _staged = _cache.stage(_key)
+      ... write files in _staged ...
+      _entry = _cache.commit(_key, _staged)
+
+  Entries are written to a staging directory and renamed in place so that
+  concurrent runs never see partial entries. Last access is tracked via the
+  entry mtime which drives the age and size based (LRU) eviction.
+
+  Single file entries (prepared structures) are shared across projects:
+
+    if not _cache.fetch(_key, _path_target):   # hardlinked (or copied) out
+      ... convert ...
+      _cache.put(_key, _path_target)
+
+  Entries used in place (e.g. vina `--maps`) are held for the whole use:
+
+    with _cache.use(_key) as _entry:          # None on a miss
+      ... read files of _entry ...
+
+  Readers hold a shared lock on the `.lock` file of the entry; eviction
+  removes an entry only when it gets the exclusive lock, so entries in use
+  by any thread or run sharing the cache are skipped. Evicting runs are
+  serialised by the `.lock` of the cache. `evict_interval` (seconds) limits
+  how often entries are scanned.
+  """
+
+  _stage_prefix = '.staging-'
+  _file_lock = '.lock'
+  _file_evicted = '.evicted'
+
+  def __init__(self, *args, **kwargs):
+    self.path_cache = EntityPath(kwargs.get('path_cache', args[0] if len(args) > 0 else None))
+    self.max_size = kwargs.get('max_size', args[1] if len(args) > 1 else None) # bytes
+    self.max_age = kwargs.get('max_age', args[2] if len(args) > 2 else None) # seconds
+    self.evict_interval = kwargs.get('evict_interval', args[3] if len(args) > 3 else None) # seconds
+
+    self.path_cache.validate()
+
+  @ContextLib.contextmanager
+  def lock(self, shared=True, blocking=True):
+    """Yields True when the lock is held (always True without fcntl)."""
+    if FCntl is None:
+      yield True
+      return
+
+    with open(OS.path.join(str(self.path_cache), self._file_lock), 'a') as _fh:
+      _flags = (FCntl.LOCK_SH if shared else FCntl.LOCK_EX) | (0 if blocking else FCntl.LOCK_NB)
+      try:
+        FCntl.flock(_fh, _flags)
+      except OSError:
+        yield False
+        return
+
+      try:
+        yield True
+      finally:
+        FCntl.flock(_fh, FCntl.LOCK_UN)
+
+  @staticmethod
+  def key(*parts) -> str:
+    return HashLib.sha256("|".join(map(str, parts)).encode()).hexdigest()
+
+  def path(self, key) -> EntityPath:
+    return self.path_cache / key
+
+  def get(self, key):
+    _path = self.path(key)
+    if not _path.is_dir():
+      return None
+
+    try:
+      OS.utime(_path)
+    except OSError:
+      return None
+
+    return _path
+
+  @ContextLib.contextmanager
+  def use(self, key):
+    """Yields the entry path (None on a miss), it is not evicted until the block exits."""
+    if FCntl is None:
+      yield self.get(key)
+      return
+
+    _path_lock = OS.path.join(str(self.path(key)), self._file_lock)
+    try:
+      _fh = open(_path_lock, 'a')
+    except OSError:
+      # Not committed or evicted
+      yield None
+      return
+
+    with _fh:
+      FCntl.flock(_fh, FCntl.LOCK_SH)
+      try:
+        # Evicted (and maybe committed again) while waiting for the lock
+        try:
+          _current = OS.stat(_path_lock).st_ino == OS.fstat(_fh.fileno()).st_ino
+        except OSError:
+          _current = False
+
+        yield self.get(key) if _current else None
+      finally:
+        FCntl.flock(_fh, FCntl.LOCK_UN)
+
+  def stage(self, key) -> EntityPath:
+    _staged = self.path_cache / f"{self._stage_prefix}{key}-{OS.getpid()}-{Time.time_ns()}"
+    _staged.mkdir(parents=True, exist_ok=True)
+    return _staged
+
+  def commit(self, key, staged) -> EntityPath:
+    _path = self.path(key)
+    try:
+      OS.rename(staged, _path)
+    except OSError:
+      # Another run committed the same entry first
+      SHUTIL.rmtree(staged, ignore_errors=True)
+
+    self.evict()
+    return self.get(key)
+
+  def discard(self, staged) -> None:
+    SHUTIL.rmtree(staged, ignore_errors=True)
+
+  @staticmethod
+  def link_file(path_source, path_target) -> None:
+    """Hardlinks `path_source` to `path_target`, copies across filesystems."""
+    FileStager('hardlink').stage(path_source, path_target)
+
+  def fetch(self, key, path_target, name='entry') -> bool:
+    """Places the file of a single file entry at `path_target`; False on a miss."""
+    with self.use(key) as _entry:
+      if _entry is None or not OS.path.isfile(OS.path.join(str(_entry), name)):
+        return False
+
+      try:
+        self.link_file(OS.path.join(str(_entry), name), path_target)
+      except OSError:
+        return False
+
+    return True
+
+  def put(self, key, path_source, name='entry'):
+    """Stores a file as a single file entry (linked, the file must not be modified in place)."""
+    if not self.get(key) is None:
+      return self.path(key)
+
+    _staged = self.stage(key)
+    try:
+      self.link_file(path_source, OS.path.join(str(_staged), name))
+    except OSError:
+      self.discard(_staged)
+      return None
+
+    return self.commit(key, _staged)
+
+  def _entry_size(self, entry) -> int:
+    _size = 0
+    for _root, _, _files in OS.walk(entry):
+      for _file in _files:
+        try:
+          _size += OS.stat(OS.path.join(_root, _file)).st_size
+        except OSError:
+          continue
+
+    return _size
+
+  def entries(self) -> list:
+    """Returns [(mtime, size, path)...] of committed entries, oldest first."""
+    _entries = []
+    with OS.scandir(self.path_cache) as _it:
+      for _entry in _it:
+        if not _entry.is_dir() or _entry.name.startswith(self._stage_prefix):
+          continue
+        try:
+          _entries.append((_entry.stat().st_mtime, self._entry_size(_entry.path), _entry.path))
+        except OSError:
+          continue
+
+    return sorted(_entries)
+
+  def _evict_due(self) -> bool:
+    if not self.evict_interval:
+      return True
+
+    _path_stamp = OS.path.join(str(self.path_cache), self._file_evicted)
+    try:
+      if Time.time() - OS.stat(_path_stamp).st_mtime < float(self.evict_interval):
+        return False
+    except OSError:
+      pass
+
+    with open(_path_stamp, 'a'):
+      OS.utime(_path_stamp)
+    return True
+
+  def evict(self) -> list:
+    if self.max_size is None and self.max_age is None:
+      return []
+
+    if not self._evict_due():
+      return []
+
+    # One evicting run at a time, entries in use are skipped (see `_remove`)
+    with self.lock(shared=False, blocking=False) as _locked:
+      return self._evict() if _locked else []
+
+  def _evict(self) -> list:
+    _entries = self.entries()
+    _total = sum(_e[1] for _e in _entries)
+    _now = Time.time()
+
+    _removed = []
+    for _mtime, _size, _path in _entries:
+      _expired = not self.max_age is None and (_now - _mtime) > self.max_age
+      _oversized = not self.max_size is None and _total > self.max_size
+      if not (_expired or _oversized):
+        continue
+
+      if not self._remove(_path):
+        continue
+
+      _total = _total - _size
+      _removed.append(_path)
+
+    return _removed
+
+  def _remove(self, path) -> bool:
+    """Removes an entry unless it is held by `use`."""
+    if FCntl is None:
+      SHUTIL.rmtree(path, ignore_errors=True)
+      return True
+
+    try:
+      _fh = open(OS.path.join(path, self._file_lock), 'a')
+    except OSError:
+      return False
+
+    with _fh:
+      try:
+        FCntl.flock(_fh, FCntl.LOCK_EX | FCntl.LOCK_NB)
+      except OSError:
+        return False
+
+      SHUTIL.rmtree(path, ignore_errors=True)
+      return True
+
+  @property
+  def size(self) -> int:
+    return sum(_e[1] for _e in self.entries())
+
+  def __repr__(self):
+    return f"DiskCache({self.path_cache})"
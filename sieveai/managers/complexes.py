@@ -0,0 +1,237 @@
+import pickle as Pickle
+import sqlite3 as SQLite
+import threading as Threading
+from weakref import WeakValueDictionary
+from collections import OrderedDict
+from collections.abc import MutableMapping
+
+class ComplexStore(MutableMapping):
+  """SQLite backed `Complexes` mapping of a plugin with lazily loaded records.
+
+    _store = ComplexStore(path_db, 'Vina')
+    _store[cuid] = DictConfig(...)       # same access as the in-memory DictConfig
+    _store[cuid].steps_completed.append('dock')
+    _store.flush(cuid)                   # persist the record (done per step)
+    _store.query(rec_uid='1ABC', last_step=['analyse', 'final'])
+    _store.columns('uid', 'step')        # status without loading records
+
+  Index columns (uid, plugin, rec_uid, lig_uid, step, last_step) are derived
+  from the record on every write; the record itself is a pickled payload that
+  is only unpickled on access. Accessed records are kept in a bounded LRU
+  cache and written back on eviction, `flush` and `sync`; `query` and
+  `columns` only update the index columns of cached records that changed.
+  A record evicted while a worker still holds it is handed out again (not
+  reloaded from the database), so changes made through it are not lost.
+  """
+
+  index_columns = ('rec_uid', 'lig_uid', 'step', 'last_step')
+
+  def __init__(self, *args, **kwargs):
+    self.path_db = str(kwargs.get('path_db', args[0] if len(args) > 0 else None))
+    self.plugin_uid = kwargs.get('plugin_uid', args[1] if len(args) > 1 else None)
+    self.cache_size = int(kwargs.get('cache_size', args[2] if len(args) > 2 else 1024))
+    self._connect()
+
+  def _connect(self) -> None:
+    self._lock = Threading.RLock()
+    self._cache = OrderedDict()
+    self._indexed = {} # cuid: index columns last written for a cached record
+    self._loaded = WeakValueDictionary() # cuid: records handed out, alive while referenced
+    self._db = SQLite.connect(self.path_db, check_same_thread=False, isolation_level=None)
+    self._db.execute('PRAGMA journal_mode=WAL')
+    self._db.execute('PRAGMA synchronous=NORMAL')
+    self._db.execute("""CREATE TABLE IF NOT EXISTS complexes (
+      plugin TEXT NOT NULL,
+      uid TEXT NOT NULL,
+      rec_uid TEXT,
+      lig_uid TEXT,
+      step TEXT,
+      last_step TEXT,
+      payload BLOB,
+      PRIMARY KEY (plugin, uid))""")
+    for _col in self.index_columns:
+      self._db.execute(f"CREATE INDEX IF NOT EXISTS idx_complexes_{_col} ON complexes (plugin, {_col})")
+
+  # Pickled with SETTINGS: only the location is stored
+  def __getstate__(self):
+    self.sync()
+    return {'path_db': self.path_db, 'plugin_uid': self.plugin_uid, 'cache_size': self.cache_size}
+
+  def __setstate__(self, state):
+    self.__dict__.update(state)
+    self._connect()
+
+  def _columns_of(self, record) -> tuple:
+    _step = record.get('step')
+    _completed = record.get('steps_completed') or [None]
+    return (
+      record.get('rec_uid'),
+      record.get('lig_uid'),
+      getattr(_step, 'current', None),
+      _completed[-1],
+    )
+
+  def _write(self, cuid, record) -> None:
+    self._db.execute(
+      """INSERT INTO complexes (plugin, uid, rec_uid, lig_uid, step, last_step, payload) VALUES (?, ?, ?, ?, ?, ?, ?)
+      ON CONFLICT (plugin, uid) DO UPDATE SET rec_uid = excluded.rec_uid, lig_uid = excluded.lig_uid,
+        step = excluded.step, last_step = excluded.last_step, payload = excluded.payload""",
+      (self.plugin_uid, cuid, *self._columns_of(record), Pickle.dumps(record, protocol=Pickle.HIGHEST_PROTOCOL)))
+    if cuid in self._cache:
+      self._indexed[cuid] = self._columns_of(record)
+
+  def _cache_put(self, cuid, record) -> None:
+    self._cache[cuid] = record
+    self._cache.move_to_end(cuid)
+    try:
+      self._loaded[cuid] = record
+    except TypeError:
+      # Not weak referenceable (plain dict)
+      self._loaded.pop(cuid, None)
+
+    while len(self._cache) > self.cache_size:
+      _old_cuid, _old_record = self._cache.popitem(last=False)
+      self._indexed.pop(_old_cuid, None)
+      self._write(_old_cuid, _old_record)
+
+  def __getitem__(self, cuid):
+    with self._lock:
+      if cuid in self._cache:
+        self._cache.move_to_end(cuid)
+        return self._cache[cuid]
+
+      # Evicted but still held by a worker: same object, its index is checked by `_sync_index`
+      _record = self._loaded.get(cuid)
+      if not _record is None:
+        self._cache_put(cuid, _record)
+        return _record
+
+      _row = self._db.execute("SELECT payload FROM complexes WHERE plugin = ? AND uid = ?", (self.plugin_uid, cuid)).fetchone()
+      if _row is None:
+        raise KeyError(cuid)
+
+      _record = Pickle.loads(_row[0])
+      self._cache_put(cuid, _record)
+      self._indexed[cuid] = self._columns_of(_record)
+      return _record
+
+  def __setitem__(self, cuid, record) -> None:
+    with self._lock:
+      self._cache_put(cuid, record)
+      self._write(cuid, record)
+
+  def __delitem__(self, cuid) -> None:
+    with self._lock:
+      self._cache.pop(cuid, None)
+      self._indexed.pop(cuid, None)
+      self._loaded.pop(cuid, None)
+      _cur = self._db.execute("DELETE FROM complexes WHERE plugin = ? AND uid = ?", (self.plugin_uid, cuid))
+      if _cur.rowcount == 0:
+        raise KeyError(cuid)
+
+  def __contains__(self, cuid) -> bool:
+    with self._lock:
+      if cuid in self._cache:
+        return True
+      return self._db.execute("SELECT 1 FROM complexes WHERE plugin = ? AND uid = ?", (self.plugin_uid, cuid)).fetchone() is not None
+
+  def __iter__(self):
+    return iter(self.keys())
+
+  def __len__(self) -> int:
+    with self._lock:
+      return self._db.execute("SELECT COUNT(*) FROM complexes WHERE plugin = ?", (self.plugin_uid, )).fetchone()[0]
+
+  def keys(self) -> list:
+    with self._lock:
+      return [_r[0] for _r in self._db.execute("SELECT uid FROM complexes WHERE plugin = ? ORDER BY rowid", (self.plugin_uid, ))]
+
+  # DictConfig compatibility
+  _keys = property(keys)
+
+  def get(self, cuid, default=None):
+    try:
+      return self[cuid]
+    except KeyError:
+      return default
+
+  def flush(self, cuid, record=None) -> None:
+    """Writes the cached record of the complex (or the given copy of it) to the database."""
+    with self._lock:
+      record = self._cache.get(cuid, self._loaded.get(cuid)) if record is None else record
+      if not record is None:
+        self._write(cuid, record)
+
+  def sync(self) -> None:
+    with self._lock:
+      self._db.execute('BEGIN')
+      for _cuid, _record in self._cache.items():
+        self._write(_cuid, _record)
+      # Evicted records still held by workers
+      for _cuid, _record in list(self._loaded.items()):
+        if not _cuid in self._cache:
+          self._write(_cuid, _record)
+      self._db.execute('COMMIT')
+
+  def _sync_index(self) -> None:
+    """Updates the index columns of cached records changed in place (payloads are left to `flush`)."""
+    with self._lock:
+      _changed = []
+      for _cuid, _record in self._cache.items():
+        _columns = self._columns_of(_record)
+        if not self._indexed.get(_cuid) == _columns:
+          _changed.append((_cuid, _columns))
+
+      if len(_changed) == 0:
+        return
+
+      self._db.execute('BEGIN')
+      for _cuid, _columns in _changed:
+        self._db.execute(
+          "UPDATE complexes SET rec_uid = ?, lig_uid = ?, step = ?, last_step = ? WHERE plugin = ? AND uid = ?",
+          (*_columns, self.plugin_uid, _cuid))
+        self._indexed[_cuid] = _columns
+      self._db.execute('COMMIT')
+
+  def _where(self, filters) -> tuple:
+    _clauses, _params = ["plugin = ?"], [self.plugin_uid]
+    for _col, _value in filters.items():
+      if not _col in ('uid', *self.index_columns):
+        raise KeyError(f"{_col} is not an indexed column.")
+      if isinstance(_value, (list, tuple, set)):
+        _clauses.append(f"{_col} IN ({', '.join('?' * len(_value))})")
+        _params.extend(_value)
+      elif _value is None:
+        _clauses.append(f"{_col} IS NULL")
+      else:
+        _clauses.append(f"{_col} = ?")
+        _params.append(_value)
+
+    return " AND ".join(_clauses), _params
+
+  def query(self, **filters) -> list:
+    """Returns uids matching the indexed column values (a list matches any of them)."""
+    self._sync_index()
+    _where, _params = self._where(filters)
+    with self._lock:
+      return [_r[0] for _r in self._db.execute(f"SELECT uid FROM complexes WHERE {_where} ORDER BY rowid", _params)]
+
+  def columns(self, *names, **filters) -> list:
+    """Returns rows of indexed columns without loading the records."""
+    self._sync_index()
+    _names = names or ('uid', *self.index_columns)
+    for _col in _names:
+      if not _col in ('uid', *self.index_columns):
+        raise KeyError(f"{_col} is not an indexed column.")
+
+    _where, _params = self._where(filters)
+    with self._lock:
+      return self._db.execute(f"SELECT {', '.join(_names)} FROM complexes WHERE {_where} ORDER BY rowid", _params).fetchall()
+
+  def close(self) -> None:
+    self.sync()
+    with self._lock:
+      self._db.close()
+
+  def __repr__(self):
+    return f"ComplexStore({self.path_db}, plugin={self.plugin_uid}, n={len(self)})"
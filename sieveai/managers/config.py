@@ -32,6 +32,43 @@ class ConfigManager(ManagerBase):
       'path_sob_progress': None,
 
       'multiprocessing': False,
+      'cpu_budget': 0, # Total cores for concurrent jobs (0: all)
+      'cpu_per_job': 0, # Threads per job (0: plugin specific)
+      'workflow_max_workers': 1, # Plugins of a step running concurrently (1: sequential)
+
+      'sync_streaming': False, # Dock molecules while StructureSync is still fetching
+      'sync_url_pubchem': 'https://pubchem.ncbi.nlm.nih.gov/rest/pug',
+      'sync_url_rcsb': 'https://files.rcsb.org/download',
+      'stream_buffer_size': 16, # Bounded queue size between streaming stages
+
+      'progress_compact_every': 1000, # Journal records before a new progress snapshot
+      'complexes_backend': 'memory', # memory|sqlite
+      'complexes_cache_size': 1024, # Complex records kept in memory (sqlite)
+      'file_complexes_db': 'sieveai.complexes.db',
+      'table_format': 'auto', # auto|parquet|npz, auto: Parquet when pyarrow is installed
+
+      'ligand_prep_engine': 'obabel', # obabel|meeko (in-process worker pool)
+      'staging_mode': 'hardlink', # hardlink|symlink|copy of structures into complex directories
+      'structure_cache': False, # Prepared structures shared across projects
+      'structure_cache_size_gb': 20.0,
+      'path_structure_cache': None,
+      'vina_engine': 'cli', # cli|api
+      'vina_batch_size': 1, # Ligands per vina call (CLI only)
+      'vina_funnel': False,
+      'vina_funnel_top_k': 10, # Finalists per receptor
+      'vina_screen_exhaustiveness': 4,
+      'vina_final_exhaustiveness': 32,
+      'vina_final_num_modes': 9,
+      'vina_map_cache': False,
+      'vina_map_cache_size_gb': 50.0,
+      'vina_map_cache_age_days': 30.0,
+      'path_vina_map_cache': None,
+
+      'chimerax_sessions': 0, # Long-lived ChimeraX REST sessions for analysis, 0: one process per complex
+      'chimerax_session_port': 0, # First port of the pool, 0: free ports
+      'chimerax_session_max_jobs': 200, # Scripts before a session is restarted
+      'chimerax_batch_size': 1, # Complexes per ChimeraX analysis script, >1 analyses after docking
+      'interaction_engine': 'external', # external (ChimeraX/VMD)|native (built-in NumPy contacts and H-bonds)
 
       'report_flag': True,
       'report_interval': 90,
@@ -75,6 +112,12 @@ class ConfigManager(ManagerBase):
     if self.SETTINGS.user.path_sob_progress is None:
       self.SETTINGS.user.path_sob_progress = (self.path_base / self.SETTINGS.user.file_sob_progress)
 
+    if self.SETTINGS.user.path_vina_map_cache is None:
+      self.SETTINGS.user.path_vina_map_cache = (self.path_sieveai_master_config / 'cache' / 'vina-maps')
+
+    if self.SETTINGS.user.path_structure_cache is None:
+      self.SETTINGS.user.path_structure_cache = (self.path_sieveai_master_config / 'cache' / 'structures')
+
     if self.SETTINGS.user.path_toml_workflow is None:
       self.SETTINGS.user.path_toml_workflow = (self.path_base / self.SETTINGS.user.file_toml_workflow)
 
@@ -85,6 +128,9 @@ class ConfigManager(ManagerBase):
       for _k, _v in _v1.items():
         _v2[_k] = self._val_casting(_v, _v2[_k]) if _k in _v2 else None
       return _v2
+    elif _v1 is None or _v2 is None:
+      # No type to cast to (paths and other settings resolved later)
+      return _v2
     else:
       return type(_v1)(_v2)
 
@@ -0,0 +1,71 @@
+import numpy as NP
+
+class JobCostModel():
+  """Log-linear runtime estimate of a docking job used to order the queue.
+
+    _model = JobCostModel({'box_volume': 1.0, 'torsions': 1.0})
+    _model.estimate({'box_volume': 27000, 'torsions': 6})
+    _model.add_sample({'box_volume': 27000, 'torsions': 6}, 412.5)
+    _model.fit()
+
+  log(t) = w0 + sum(w_i * log(1 + x_i)); the initial weights act as a prior
+  until enough measured durations are available to refit by least squares.
+  """
+
+  max_samples = 5000
+  min_duration = 1.0 # seconds, shorter runs are skips/restores
+
+  def __init__(self, *args, **kwargs):
+    self.weights = dict(kwargs.get('weights', args[0] if len(args) > 0 else {}))
+    self.intercept = float(kwargs.get('intercept', args[1] if len(args) > 1 else 0.0))
+    self.samples = list(kwargs.get('samples', args[2] if len(args) > 2 else []))
+
+  @property
+  def features(self) -> list:
+    return list(self.weights.keys())
+
+  def _vector(self, values) -> NP.ndarray:
+    return NP.log1p(NP.array([max(float(values.get(_f) or 0), 0.0) for _f in self.features]))
+
+  def estimate(self, values) -> float:
+    """Returns the estimated runtime (arbitrary units before the first fit)."""
+    _w = NP.array([self.weights[_f] for _f in self.features])
+    return float(NP.exp(self.intercept + self._vector(values) @ _w))
+
+  def add_sample(self, values, duration) -> bool:
+    if duration is None or duration < self.min_duration:
+      return False
+
+    self.samples.append(({_f: values.get(_f) for _f in self.features}, float(duration)))
+    self.samples = self.samples[-self.max_samples:]
+    return True
+
+  def fit(self) -> bool:
+    """Refits weights when there are more samples than parameters."""
+    if not len(self.samples) > len(self.features) + 1:
+      return False
+
+    _X = NP.array([self._vector(_v) for _v, _ in self.samples])
+    _X = NP.hstack([NP.ones((_X.shape[0], 1)), _X])
+    _y = NP.log(NP.array([_d for _, _d in self.samples]))
+
+    _coef, *_ = NP.linalg.lstsq(_X, _y, rcond=None)
+    if not NP.all(NP.isfinite(_coef)):
+      return False
+
+    self.intercept = float(_coef[0])
+    self.weights = {_f: float(_c) for _f, _c in zip(self.features, _coef[1:])}
+    return True
+
+  def to_dict(self) -> dict:
+    return {'weights': self.weights, 'intercept': self.intercept, 'samples': self.samples}
+
+  @classmethod
+  def from_dict(cls, data, weights=None):
+    """Restores a saved model; a change in feature names resets it to `weights`."""
+    if not data or (weights and set(data.get('weights', {})) != set(weights)):
+      return cls(weights or {})
+    return cls(data.get('weights'), data.get('intercept', 0.0), data.get('samples', []))
+
+  def __repr__(self):
+    return f"JobCostModel({self.weights}, samples={len(self.samples)})"
@@ -0,0 +1,126 @@
+import threading as Threading
+
+class ComplexEvents():
+  """Thread-safe per-complex event hub shared by the plugins of a workflow.
+
+    EVENTS.reopen('Vina', readers=1)                 # upstream starts, one consumer expected
+    EVENTS.publish('Vina', cuid)                     # upstream, per complex
+    EVENTS.close('Vina')                             # upstream finished
+    for _event in EVENTS.iterate('Vina'):            # downstream, blocking
+      ...
+    EVENTS.subscribe('Vina', callback)               # or push based
+
+  Events are kept until every expected reader (`iterate` or `subscribe`) has
+  seen them, so readers attaching late replay what was published before.
+  With `readers=0` nothing is kept; sources never reopened keep everything.
+  Payloads should be small (ids, paths), not complex records.
+  """
+
+  def __init__(self, *args, **kwargs):
+    self._condition = Threading.Condition()
+    self._events = {}   # source: events not yet seen by every reader
+    self._trimmed = {}  # source: events dropped from the front
+    self._readers = {}  # source: expected readers (None: keep all)
+    self._cursors = {}  # source: {reader: position} of attached readers
+    self._finished = {} # source: readers detached or always up to date (subscribers)
+    self._closed = set()
+    self._subscribers = {}
+
+  def _trim(self, source) -> None:
+    """Drops events seen by all expected readers (caller holds the condition)."""
+    _expected = self._readers.get(source)
+    _cursors = self._cursors.get(source, {})
+    if _expected is None or len(_cursors) + self._finished.get(source, 0) < _expected:
+      return
+
+    _events = self._events.get(source, [])
+    _trimmed = self._trimmed.get(source, 0)
+    _drop = min(_cursors.values(), default=_trimmed + len(_events)) - _trimmed
+    if _drop > 0:
+      del _events[:_drop]
+      self._trimmed[source] = _trimmed + _drop
+
+  def publish(self, source, cuid, **payload) -> dict:
+    _event = {'source': source, 'cuid': cuid, **payload}
+    with self._condition:
+      self._events.setdefault(source, []).append(_event)
+      self._trim(source)
+      _callbacks = list(self._subscribers.get(source, []))
+      self._condition.notify_all()
+
+    for _callback in _callbacks:
+      _callback(_event)
+
+    return _event
+
+  def close(self, source) -> None:
+    with self._condition:
+      self._closed.add(source)
+      self._condition.notify_all()
+
+  def reopen(self, source, readers=None) -> None:
+    """Starts a new run of the source with `readers` expected consumers (None: keep all events)."""
+    with self._condition:
+      self._closed.discard(source)
+      self._events.pop(source, None)
+      self._trimmed[source] = 0
+      self._readers[source] = readers
+      self._cursors[source] = {}
+      self._finished[source] = 0
+
+  def is_closed(self, source) -> bool:
+    return source in self._closed
+
+  def events(self, source) -> list:
+    with self._condition:
+      return list(self._events.get(source, []))
+
+  def subscribe(self, source, callback) -> None:
+    with self._condition:
+      _past = list(self._events.get(source, []))
+      self._subscribers.setdefault(source, []).append(callback)
+      # Pushed every later event, so it never holds events back
+      self._finished[source] = self._finished.get(source, 0) + 1
+      self._trim(source)
+
+    for _event in _past:
+      callback(_event)
+
+  def iterate(self, *sources, timeout=None):
+    """Yields events of the sources as they arrive until all of them are closed."""
+    _reader = object()
+    with self._condition:
+      for _s in sources:
+        self._cursors.setdefault(_s, {})[_reader] = self._trimmed.get(_s, 0)
+
+    try:
+      while True:
+        with self._condition:
+          _pending = []
+          for _s in sources:
+            _start = self._cursors[_s][_reader] - self._trimmed.get(_s, 0)
+            _events = self._events.get(_s, [])[_start:]
+            if len(_events) > 0:
+              _pending.append((_s, _events))
+
+          if not _pending:
+            if all(_s in self._closed for _s in sources):
+              return
+            if not self._condition.wait(timeout=timeout):
+              return
+            continue
+
+        for _source, _events in _pending:
+          yield from _events
+          with self._condition:
+            self._cursors[_source][_reader] = self._cursors[_source][_reader] + len(_events)
+            self._trim(_source)
+    finally:
+      with self._condition:
+        for _s in sources:
+          self._cursors.get(_s, {}).pop(_reader, None)
+          self._finished[_s] = self._finished.get(_s, 0) + 1
+          self._trim(_s)
+
+  def __repr__(self):
+    return f"ComplexEvents({ {_s: len(_e) for _s, _e in self._events.items()} })"
@@ -0,0 +1,135 @@
+import os as OS
+import json as JSON
+import threading as Threading
+import numpy as NP
+
+from ..sieveaibase import EntityPath
+
+class ReceptorGeometry():
+  """Parses receptor coordinates once per file hash and memoizes grid boxes.
+
+    _geo = ReceptorGeometry(path_cache)
+    _center, _size = _geo.get_box(mol_path, mol_hash, residues=['HIS', 'ASP'])
+
+  Coordinates are kept as NumPy arrays in memory and as `<hash>.npz` in the
+  cache directory; computed boxes are stored in `<hash>.box.json` so that all
+  complexes of a receptor, and later runs, share them.
+  """
+
+  _records = ('ATOM  ', 'HETATM')
+
+  def __init__(self, *args, **kwargs):
+    self.path_cache = kwargs.get('path_cache', args[0] if len(args) > 0 else None)
+    self.path_cache = EntityPath(self.path_cache).validate() if self.path_cache else None
+
+    self._lock = Threading.Lock()
+    self._structures = {}
+    self._boxes = {}
+
+  def _parse_pdb(self, mol_path):
+    """Reads ATOM/HETATM records using fixed PDB columns (works for PDBQT too)."""
+    _coords, _resnames = [], []
+    with open(str(mol_path)) as _fh:
+      for _line in _fh:
+        if not _line.startswith(self._records):
+          continue
+        _coords.append((_line[30:38], _line[38:46], _line[46:54]))
+        _resnames.append(_line[17:20].strip())
+
+    _coords = NP.array(_coords, dtype=float).reshape(-1, 3)
+    _resnames = NP.array(_resnames, dtype=str)
+
+    return _coords, _resnames
+
+  def _write_atomic(self, path, writer):
+    _tmp = f"{path}.{OS.getpid()}.{Threading.get_ident()}.tmp"
+    with open(_tmp, 'wb') as _fh:
+      writer(_fh)
+    OS.replace(_tmp, str(path))
+
+  def get_structure(self, mol_path, mol_hash=None):
+    """Returns (coordinates[N, 3], resnames[N]) for the structure."""
+    mol_path = EntityPath(mol_path)
+    mol_hash = mol_hash or mol_path.hash
+
+    with self._lock:
+      if mol_hash in self._structures:
+        return self._structures[mol_hash]
+
+    _path_npz = (self.path_cache / f"{mol_hash}.npz") if self.path_cache else None
+    _structure = None
+    if _path_npz and _path_npz.exists():
+      try:
+        with NP.load(str(_path_npz)) as _npz:
+          _structure = (_npz['coords'], _npz['resnames'])
+      except Exception:
+        _structure = None
+
+    if _structure is None:
+      _structure = self._parse_pdb(mol_path)
+      if _path_npz:
+        self._write_atomic(_path_npz, lambda _fh: NP.savez(_fh, coords=_structure[0], resnames=_structure[1]))
+
+    with self._lock:
+      self._structures[mol_hash] = _structure
+
+    return _structure
+
+  def _read_boxes(self, mol_hash) -> dict:
+    _path_json = (self.path_cache / f"{mol_hash}.box.json") if self.path_cache else None
+    if _path_json and _path_json.exists():
+      try:
+        return JSON.loads(_path_json.read())
+      except Exception:
+        return {}
+    return {}
+
+  def get_box(self, mol_path, mol_hash=None, residues=None):
+    """Returns (center, size) of the atoms, optionally restricted to residue names.
+
+    :param mol_path|0: Receptor structure path
+    :param mol_hash|1: Hash of the file (computed if not given)
+    :param residues|2: List of residue names for site specific box
+
+    :return: ((x, y, z), (size_x, size_y, size_z))
+    """
+    mol_path = EntityPath(mol_path)
+    mol_hash = mol_hash or mol_path.hash
+    _box_key = ",".join(sorted(map(str, residues or [])))
+
+    with self._lock:
+      if (mol_hash, _box_key) in self._boxes:
+        return self._boxes[(mol_hash, _box_key)]
+
+    _boxes = self._read_boxes(mol_hash)
+    if _box_key in _boxes:
+      _center, _size = _boxes[_box_key]
+    else:
+      _coords, _resnames = self.get_structure(mol_path, mol_hash)
+      if residues:
+        _coords = _coords[NP.isin(_resnames, list(residues))]
+
+      if _coords.shape[0] == 0:
+        raise ValueError(f"No atoms were found in {mol_path} to compute the box.")
+
+      _center = _coords.mean(axis=0).tolist()
+      _size = (_coords.max(axis=0) - _coords.min(axis=0)).tolist()
+
+      if self.path_cache:
+        _boxes = self._read_boxes(mol_hash)
+        _boxes[_box_key] = [_center, _size]
+        self._write_atomic(self.path_cache / f"{mol_hash}.box.json", lambda _fh: _fh.write(JSON.dumps(_boxes).encode()))
+
+    _box = (tuple(_center), tuple(_size))
+    with self._lock:
+      self._boxes[(mol_hash, _box_key)] = _box
+
+    return _box
+
+  def get_atom_count(self, mol_path, mol_hash=None) -> int:
+    return int(self.get_structure(mol_path, mol_hash)[0].shape[0])
+
+  def count_atoms(self, mol_path) -> int:
+    """Counts ATOM/HETATM records without parsing or memoizing the structure (e.g. ligands)."""
+    with open(str(mol_path)) as _fh:
+      return sum(1 for _line in _fh if _line.startswith(self._records))
@@ -0,0 +1,93 @@
+import os as OS
+import time as Time
+import pickle as Pickle
+import threading as Threading
+
+class FileHashCache():
+  """Persistent file hashes keyed by (path, size, mtime_ns).
+
+    _hashes = FileHashCache(path_molecules / '.sieveai.hashes')
+    _hash = _hashes.hash(mol_path)          # rehashed only if size/mtime changed
+    _hashes.save()
+
+  Entries of files that were not looked up since loading are dropped on
+  `save(prune=True)` so renamed/removed molecules do not accumulate.
+  """
+
+  def __init__(self, *args, **kwargs):
+    self.path_cache = kwargs.get('path_cache', args[0] if len(args) > 0 else None)
+    self._lock = Threading.Lock()
+    self._entries = {} # path: (size, mtime_ns, hash)
+    self._seen = set()
+    self._dirty = False
+    self.num_hashed = 0
+    self._load()
+
+  # Pickled with SETTINGS (Structures): only the location is stored
+  def __getstate__(self):
+    self.save()
+    return {'path_cache': self.path_cache}
+
+  def __setstate__(self, state):
+    self.__init__(state['path_cache'])
+
+  def _load(self) -> None:
+    if self.path_cache is None or not OS.path.exists(self.path_cache):
+      return
+
+    try:
+      with open(self.path_cache, 'rb') as _fh:
+        self._entries = Pickle.load(_fh)
+    except Exception:
+      # Unreadable cache is rebuilt
+      self._entries = {}
+
+  def hash(self, path, stat=None) -> str:
+    """Returns the hash of `path` (EntityPath); `stat` may come from os.scandir."""
+    _key = str(path)
+    _stat = stat or OS.stat(_key)
+    _sig = (_stat.st_size, _stat.st_mtime_ns)
+
+    with self._lock:
+      self._seen.add(_key)
+      _entry = self._entries.get(_key)
+      if not _entry is None and _entry[:2] == _sig:
+        return _entry[2]
+
+    _hash = path.get_hash()
+    with self._lock:
+      self._entries[_key] = (*_sig, _hash)
+      self._dirty = True
+      self.num_hashed = self.num_hashed + 1
+    return _hash
+
+  def save(self, prune=False) -> None:
+    if self.path_cache is None:
+      return
+
+    with self._lock:
+      if prune:
+        _stale = set(self._entries) - self._seen
+        self._dirty = self._dirty or len(_stale) > 0
+        for _key in _stale:
+          del self._entries[_key]
+
+      if not self._dirty:
+        return
+
+      _tmp = f"{self.path_cache}.{OS.getpid()}-{Time.time_ns()}.tmp"
+      try:
+        with open(_tmp, 'wb') as _fh:
+          Pickle.dump(self._entries, _fh, protocol=Pickle.HIGHEST_PROTOCOL)
+        OS.replace(_tmp, self.path_cache)
+        self._dirty = False
+      except OSError:
+        # Read-only molecule directory, hashes are recomputed next time
+        if OS.path.exists(_tmp):
+          OS.remove(_tmp)
+
+  def __len__(self):
+    return len(self._entries)
+
+  def __repr__(self):
+    return f"FileHashCache({self.path_cache}, n={len(self._entries)})"
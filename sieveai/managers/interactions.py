@@ -0,0 +1,346 @@
+import os as OS
+import math as Math
+import threading as Threading
+import itertools as IterTools
+import numpy as NP
+
+class InteractionEngine():
+  """Contacts and H-bonds from PDB/PDBQT coordinates without ChimeraX or VMD.
+
+    _engine = InteractionEngine()
+    _tables = _engine.analyse(path_receptor, path_out)   # {pose: (contacts, hbonds)} like ChimeraX.parse_*
+    _rows = _engine.interaction_matrix(paths_models)     # VMDPython.get_interactions columns per model
+
+  Structures are read into NumPy arrays (receptors once per file) and atom
+  pairs are found on a uniform grid, for all poses of a complex at once.
+  Contacts are VDW overlaps >= `overlap_cutoff` (as ChimeraX `contacts`) or,
+  with `contact_distance`, atoms within that distance (as VMD). H-bonds need
+  explicit polar hydrogens: donor-acceptor within `hbond_distance` and a
+  D-H...A angle of at least `hbond_angle` degrees.
+  """
+
+  vdw_radii = {'H': 1.1, 'C': 1.7, 'N': 1.55, 'O': 1.52, 'S': 1.8, 'P': 1.8, 'F': 1.47, 'Cl': 1.75, 'Br': 1.85, 'I': 1.98}
+  default_radius = 1.8
+  _records = ('ATOM  ', 'HETATM')
+  _acceptor_types = ('OA', 'NA', 'SA') # AutoDock types (PDBQT)
+  _polar_h_distance = 1.2
+
+  def __init__(self, *args, **kwargs):
+    self.overlap_cutoff = float(kwargs.get('overlap_cutoff', args[0] if len(args) > 0 else -0.4))
+    self.contact_distance = kwargs.get('contact_distance', args[1] if len(args) > 1 else None)
+    self.hbond_distance = float(kwargs.get('hbond_distance', args[2] if len(args) > 2 else 3.5))
+    self.hbond_angle = float(kwargs.get('hbond_angle', args[3] if len(args) > 3 else 120))
+    self.cache_size = int(kwargs.get('cache_size', 8)) # Receptors kept parsed
+
+    self._lock = Threading.Lock()
+    self._structures = {}
+
+  # Reading
+
+  @staticmethod
+  def _element(atom_type) -> str:
+    """Element of an AutoDock type (OA, NA, SA, HD, A, CG0...)."""
+    if atom_type == 'A' or atom_type.startswith(('G', 'CG')):
+      return 'C'
+    if len(atom_type) == 2 and atom_type[0] in 'HNOS' and atom_type[1] in 'ADS':
+      return atom_type[0]
+    return atom_type[:1].upper() + atom_type[1:].lower()
+
+  def read(self, path) -> dict:
+    """Atoms of every MODEL: `coords` (models, atoms, 3) and per atom arrays of the first model."""
+    _is_pdbqt = str(path).lower().endswith('.pdbqt')
+    _coords, _atoms, _num_models = [], [], 0
+    with open(str(path)) as _fh:
+      for _line in _fh:
+        if _line.startswith(self._records):
+          _coords.append((_line[30:38], _line[38:46], _line[46:54]))
+          if _num_models <= 1:
+            _type = _line[77:79].strip() if _is_pdbqt else _line[76:78].strip()
+            _atoms.append((_line[12:16].strip(), _line[17:20].strip(), _line[22:27].strip(), _line[21:22].strip(), _type))
+        elif _line.startswith('MODEL'):
+          _num_models = _num_models + 1
+
+    _num_models = max(_num_models, 1)
+    if len(_atoms) == 0 or len(_coords) != _num_models * len(_atoms):
+      raise ValueError(f"{path} has no atoms or models of different sizes.")
+
+    _name, _resname, _resid, _chain, _type = (NP.array(_col, dtype=str) for _col in zip(*_atoms))
+    if _is_pdbqt:
+      _element = NP.array([self._element(_t) for _t in _type], dtype=str)
+    else:
+      # PDB without the element column: first letter of the atom name
+      _element = NP.array([_t.title() if _t else _n.lstrip('0123456789')[:1] for _t, _n in zip(_type, _name)], dtype=str)
+
+    _mol = {
+      'coords': NP.array(_coords, dtype=float).reshape(_num_models, len(_atoms), 3),
+      'index': NP.arange(len(_atoms)),
+      'name': _name, 'resname': _resname, 'resid': _resid, 'chain': _chain,
+      'type': _type, 'element': _element,
+      'radius': NP.array([self.vdw_radii.get(_e, self.default_radius) for _e in _element]),
+      'pdbqt': _is_pdbqt,
+    }
+    return self._type_hbonds(_mol)
+
+  def _type_hbonds(self, mol) -> dict:
+    """Donor-hydrogen pairs (`dh`: hydrogen, donor index) and `acceptor` flags from the first model."""
+    _xyz = mol['coords'][0]
+    _h = NP.flatnonzero(mol['element'] == 'H')
+    _no = NP.flatnonzero(NP.isin(mol['element'], ('N', 'O')))
+    _dh = NP.zeros((0, 2), dtype=int)
+    if len(_h) > 0 and len(_no) > 0:
+      _ih, _ino, _ = self._pairs(_xyz[_h], _xyz[_no], self._polar_h_distance)
+      _dh = NP.stack([_h[_ih], _no[_ino]], axis=1)
+
+    if mol['pdbqt']:
+      _acceptor = NP.isin(mol['type'], self._acceptor_types)
+    else:
+      _has_h = NP.zeros(len(_xyz), dtype=bool)
+      _has_h[_dh[:, 1]] = True
+      _acceptor = (mol['element'] == 'O') | ((mol['element'] == 'N') & ~_has_h)
+
+    mol['dh'] = _dh
+    mol['acceptor'] = NP.flatnonzero(_acceptor)
+    return mol
+
+  def subset(self, mol, mask) -> dict:
+    """Atoms selected by `mask` (e.g. a chain); `index` keeps the positions in the file."""
+    _sub = {_k: _v[:, mask] if _k == 'coords' else _v[mask] for _k, _v in mol.items() if isinstance(_v, NP.ndarray) and not _k in ('dh', 'acceptor')}
+    _sub['pdbqt'] = mol['pdbqt']
+    return self._type_hbonds(_sub)
+
+  def get_receptor(self, path) -> dict:
+    """Parsed receptor, shared by all complexes of the receptor (keyed by path, size and mtime)."""
+    _stat = OS.stat(str(path))
+    _key = (str(path), _stat.st_size, _stat.st_mtime_ns)
+    with self._lock:
+      if _key in self._structures:
+        return self._structures[_key]
+
+    _mol = self.read(path)
+    with self._lock:
+      if len(self._structures) >= self.cache_size:
+        self._structures.pop(next(iter(self._structures)))
+      self._structures[_key] = _mol
+    return _mol
+
+  # Geometry
+
+  @staticmethod
+  def _pairs(points, targets, radius) -> tuple:
+    """(i, j, distance) of points[i]-targets[j] within `radius`, using a grid of `radius` cells."""
+    _empty = (NP.zeros(0, dtype=int), NP.zeros(0, dtype=int), NP.zeros(0))
+    if len(points) == 0 or len(targets) == 0:
+      return _empty
+
+    _origin = NP.minimum(points.min(0), targets.min(0))
+    _cells_p = NP.floor((points - _origin) / radius).astype(NP.int64) + 1
+    _cells_t = NP.floor((targets - _origin) / radius).astype(NP.int64) + 1
+    _dims = NP.maximum(_cells_p.max(0), _cells_t.max(0)) + 2
+    _key = lambda _c: (_c[:, 0] * _dims[1] + _c[:, 1]) * _dims[2] + _c[:, 2]
+
+    _keys_t = _key(_cells_t)
+    _order = NP.argsort(_keys_t, kind='stable')
+    _keys_t = _keys_t[_order]
+
+    _i, _j = [], []
+    for _offset in IterTools.product((-1, 0, 1), repeat=3):
+      _keys_p = _key(_cells_p + _offset)
+      _lo = NP.searchsorted(_keys_t, _keys_p, 'left')
+      _counts = NP.searchsorted(_keys_t, _keys_p, 'right') - _lo
+      _total = int(_counts.sum())
+      if _total == 0:
+        continue
+      # Position within each run of matching targets
+      _run = NP.arange(_total) - NP.repeat(NP.cumsum(_counts) - _counts, _counts)
+      _i.append(NP.repeat(NP.arange(len(points)), _counts))
+      _j.append(_order[NP.repeat(_lo, _counts) + _run])
+
+    if len(_i) == 0:
+      return _empty
+
+    _i, _j = NP.concatenate(_i), NP.concatenate(_j)
+    _d = NP.linalg.norm(points[_i] - targets[_j], axis=1)
+    _keep = _d <= radius
+    return (_i[_keep], _j[_keep], _d[_keep])
+
+  def contacts(self, rec, lig) -> dict:
+    """Receptor-ligand contacts of all ligand poses: arrays pose, rec, lig, distance, overlap."""
+    _num_atoms = lig['coords'].shape[1]
+    if self.contact_distance:
+      _radius = float(self.contact_distance)
+    else:
+      _radius = rec['radius'].max() + lig['radius'].max() - self.overlap_cutoff
+
+    _flat, _rec_idx, _d = self._pairs(lig['coords'].reshape(-1, 3), rec['coords'][0], _radius)
+    _overlap = rec['radius'][_rec_idx] + lig['radius'][_flat % _num_atoms] - _d
+    _keep = (_d <= float(self.contact_distance)) if self.contact_distance else (_overlap >= self.overlap_cutoff)
+    return {'pose': (_flat // _num_atoms)[_keep], 'rec': _rec_idx[_keep], 'lig': (_flat % _num_atoms)[_keep],
+            'distance': _d[_keep], 'overlap': _overlap[_keep]}
+
+  def _hbonds(self, donors, acceptors, donor_poses) -> dict:
+    """H-bonds from `donors` to `acceptors`; the side with poses (`donor_poses`) is flattened."""
+    _dh = donors['dh']
+    _acc = acceptors['acceptor']
+    _empty = {'pose': NP.zeros(0, dtype=int), 'donor': NP.zeros(0, dtype=int), 'hydrogen': NP.zeros(0, dtype=int),
+              'acceptor': NP.zeros(0, dtype=int), 'distance_DA': NP.zeros(0), 'distance_DHA': NP.zeros(0)}
+    if len(_dh) == 0 or len(_acc) == 0:
+      return _empty
+
+    if donor_poses:
+      _k, _a, _d = self._pairs(donors['coords'][:, _dh[:, 1]].reshape(-1, 3), acceptors['coords'][0][_acc], self.hbond_distance)
+      _pose, _k = NP.divmod(_k, len(_dh))
+      _donor_pose, _acceptor_pose = _pose, NP.zeros_like(_pose)
+    else:
+      _a, _k, _d = self._pairs(acceptors['coords'][:, _acc].reshape(-1, 3), donors['coords'][0][_dh[:, 1]], self.hbond_distance)
+      _pose, _a = NP.divmod(_a, len(_acc))
+      _donor_pose, _acceptor_pose = NP.zeros_like(_pose), _pose
+
+    _h_xyz = donors['coords'][_donor_pose, _dh[_k, 0]]
+    _hd = donors['coords'][_donor_pose, _dh[_k, 1]] - _h_xyz
+    _ha = acceptors['coords'][_acceptor_pose, _acc[_a]] - _h_xyz
+    _d_ha = NP.linalg.norm(_ha, axis=1)
+    _cos = NP.einsum('ij,ij->i', _hd, _ha) / NP.maximum(NP.linalg.norm(_hd, axis=1) * _d_ha, 1e-9)
+    _keep = NP.degrees(NP.arccos(NP.clip(_cos, -1, 1))) >= self.hbond_angle
+
+    return {'pose': _pose[_keep], 'donor': _dh[_k, 1][_keep], 'hydrogen': _dh[_k, 0][_keep],
+            'acceptor': _acc[_a][_keep], 'distance_DA': _d[_keep], 'distance_DHA': _d_ha[_keep]}
+
+  def hbonds(self, rec, lig) -> tuple:
+    """(receptor donors -> ligand, ligand donors -> receptor) over all ligand poses."""
+    return (self._hbonds(rec, lig, donor_poses=False), self._hbonds(lig, rec, donor_poses=True))
+
+  def sasa(self, mol, probe=1.4, num_points=100) -> float:
+    """Solvent accessible surface (Shrake-Rupley) of the first model."""
+    _xyz = mol['coords'][0]
+    _r = mol['radius'] + probe
+
+    # Golden spiral points on the unit sphere
+    _n = NP.arange(num_points) + 0.5
+    _phi, _theta = NP.arccos(1 - 2 * _n / num_points), NP.pi * (1 + 5 ** 0.5) * _n
+    _sphere = NP.stack([NP.cos(_theta) * NP.sin(_phi), NP.sin(_theta) * NP.sin(_phi), NP.cos(_phi)], axis=1)
+
+    _i, _j, _d = self._pairs(_xyz, _xyz, 2 * _r.max())
+    _keep = (_i != _j) & (_d < _r[_i] + _r[_j])
+    _i, _j = _i[_keep], _j[_keep]
+
+    _buried = NP.zeros((len(_xyz), num_points), dtype=bool)
+    for _s in range(0, len(_i), 4096):
+      _ci, _cj = _i[_s:_s + 4096], _j[_s:_s + 4096]
+      _points = _xyz[_ci][:, None, :] + _r[_ci][:, None, None] * _sphere[None]
+      _inside = ((_points - _xyz[_cj][:, None, :]) ** 2).sum(-1) < (_r[_cj] ** 2)[:, None]
+      NP.logical_or.at(_buried, _ci, _inside)
+
+    return float((4 * Math.pi * _r ** 2 * (~_buried).mean(axis=1)).sum())
+
+  # Tables
+
+  def _atom_columns(self, prefix, mol, idx, model_id, sub_model_id) -> dict:
+    return {
+      f"{prefix}__model_id": NP.full(len(idx), model_id, dtype=object),
+      f"{prefix}__sub_model_id": sub_model_id,
+      f"{prefix}__chain": mol['chain'][idx],
+      f"{prefix}__resname": mol['resname'][idx],
+      f"{prefix}__resid": mol['resid'][idx],
+      f"{prefix}__atom": mol['name'][idx],
+      f"{prefix}__atom_type": mol['type'][idx],
+    }
+
+  def analyse(self, path_receptor, path_poses, poses=None) -> dict:
+    """Contacts/H-bonds of every pose in `path_poses` (Vina out PDBQT).
+
+    :return: {pose number: (contacts DataFrame|None, hbonds DataFrame|None)} with the
+      columns of `ChimeraX.parse_contacts`/`parse_hbonds` (receptor #1, poses #2.N)
+    """
+    import pandas as PD
+    _rec = self.get_receptor(path_receptor)
+    _lig = self.read(path_poses)
+    _poses = list(poses) if not poses is None else list(range(1, _lig['coords'].shape[0] + 1))
+
+    _c = self.contacts(_rec, _lig)
+    _hb = self.hbonds(_rec, _lig)
+
+    _tables = {}
+    for _pose in _poses:
+      _p = int(_pose) - 1
+      _sel = NP.flatnonzero(_c['pose'] == _p)
+      _contacts = None
+      if len(_sel) > 0:
+        _contacts = PD.DataFrame({
+          'overlap': _c['overlap'][_sel].round(3), 'distance': _c['distance'][_sel].round(3),
+          **self._atom_columns('atom1', _rec, _c['rec'][_sel], '1', None),
+          **self._atom_columns('atom2', _lig, _c['lig'][_sel], '2', str(_pose)),
+        })
+
+      _parts = []
+      for (_donor, _acceptor), _h in zip(((_rec, _lig), (_lig, _rec)), _hb):
+        _sel = NP.flatnonzero(_h['pose'] == _p)
+        if len(_sel) == 0:
+          continue
+        _ids = {id(_rec): ('1', None), id(_lig): ('2', str(_pose))}
+        _parts.append(PD.DataFrame({
+          'distance_DA': _h['distance_DA'][_sel].round(3), 'distance_DHA': _h['distance_DHA'][_sel].round(3),
+          **self._atom_columns('donor', _donor, _h['donor'][_sel], *_ids[id(_donor)]),
+          **self._atom_columns('acceptor', _acceptor, _h['acceptor'][_sel], *_ids[id(_acceptor)]),
+          **self._atom_columns('hydrogen', _donor, _h['hydrogen'][_sel], *_ids[id(_donor)]),
+        }))
+
+      _tables[_pose] = (_contacts, PD.concat(_parts, ignore_index=True) if len(_parts) > 0 else None)
+
+    return _tables
+
+  @staticmethod
+  def _residues(mol, idx) -> list:
+    """Unique `resname:resid` in order of appearance (VMDPython.get_interactions)."""
+    _labels = NP.char.add(NP.char.add(mol['resname'][idx], ':'), mol['resid'][idx])
+    _labels, _first = NP.unique(_labels, return_index=True)
+    return _labels[NP.argsort(_first)].tolist()
+
+  def interaction_matrix(self, paths_models, rec_chain='A', lig_chain='B') -> list:
+    """`VMDPython.get_interactions` columns for complex models (HDock, receptor and ligand by chain).
+
+    Models with the same receptor coordinates are analysed as poses of one
+    ligand; SASA of the separated chains is computed once, HDock poses are rigid.
+    """
+    _models = [self.read(_path) for _path in paths_models]
+    if len(_models) == 0:
+      return []
+
+    _recs = [self.subset(_m, _m['chain'] == rec_chain) for _m in _models]
+    _ligs = [self.subset(_m, _m['chain'] == lig_chain) for _m in _models]
+    if any(_r['coords'].shape[1] == 0 for _r in _recs) or any(_l['coords'].shape[1] == 0 for _l in _ligs):
+      return [None] * len(_models)
+
+    _same = all(_r['coords'].shape == _recs[0]['coords'].shape and NP.allclose(_r['coords'], _recs[0]['coords']) for _r in _recs)
+    _groups = [(_recs[0], list(range(len(_models))))] if _same else [(_r, [_i]) for _i, _r in enumerate(_recs)]
+
+    _sasa_rec = self.sasa(_recs[0], probe=1.2)
+    _sasa_lig = self.sasa(_ligs[0], probe=1.2)
+
+    _rows = [None] * len(_models)
+    for _rec, _members in _groups:
+      _lig = dict(_ligs[_members[0]])
+      _lig['coords'] = NP.concatenate([_ligs[_i]['coords'][:1] for _i in _members])
+      _c = self.contacts(_rec, _lig)
+      _hb_rec, _hb_lig = self.hbonds(_rec, _lig)
+      _center_rec = _rec['coords'][0].mean(axis=0)
+
+      for _p, _i in enumerate(_members):
+        _sc = _c['pose'] == _p
+        _s1, _s2 = _hb_rec['pose'] == _p, _hb_lig['pose'] == _p
+        _rows[_i] = {
+          'distance': float(NP.linalg.norm(_lig['coords'][_p].mean(axis=0) - _center_rec)),
+          'SASA_1': _sasa_rec, 'SASA_2': _sasa_lig,
+          'Contact_1': self._residues(_rec, _c['rec'][_sc]),
+          'Contact_2': self._residues(_lig, _c['lig'][_sc]),
+          'HBond_1_don': self._residues(_rec, _hb_rec['donor'][_s1]),
+          'HBond_2_acc': self._residues(_lig, _hb_rec['acceptor'][_s1]),
+          'HBond_12_proton': _rec['index'][_hb_rec['hydrogen'][_s1]].tolist(),
+          'HBond_2_don': self._residues(_lig, _hb_lig['donor'][_s2]),
+          'HBond_1_acc': self._residues(_rec, _hb_lig['acceptor'][_s2]),
+          'HBond_21_proton': _lig['index'][_hb_lig['hydrogen'][_s2]].tolist(),
+        }
+
+    return _rows
+
+  def __repr__(self):
+    return f"InteractionEngine(receptors={len(self._structures)})"
@@ -0,0 +1,66 @@
+import os as OS
+import pickle as Pickle
+import threading as Threading
+
+class ProgressJournal():
+  """Append-only journal of per-complex progress next to the SETTINGS snapshot.
+
+    _journal = ProgressJournal(path_journal)
+    _journal.append('Vina', cuid, record)     # one small record per step
+    for _plugin_uid, _cuid, _record in _journal.replay():
+      ...
+    _journal.reset()                          # after a snapshot was written
+
+  Records are pickled one after the other into the same file and always hold
+  the full state of one complex, so replaying them over a snapshot that
+  already contains them is harmless. A truncated last record (crash while
+  writing) is ignored on replay.
+  """
+
+  def __init__(self, *args, **kwargs):
+    self.path_journal = str(kwargs.get('path_journal', args[0] if len(args) > 0 else None))
+    self.fsync = kwargs.get('fsync', args[1] if len(args) > 1 else False)
+    self._lock = Threading.Lock()
+    self.num_records = self._count()
+
+  def _count(self) -> int:
+    return sum(1 for _ in self.replay())
+
+  def append(self, plugin_uid, cuid, record) -> int:
+    """Appends a record and returns the number of records since the last reset."""
+    _data = Pickle.dumps((plugin_uid, cuid, record), protocol=Pickle.HIGHEST_PROTOCOL)
+    with self._lock:
+      with open(self.path_journal, 'ab') as _fh:
+        _fh.write(_data)
+        _fh.flush()
+        if self.fsync:
+          OS.fsync(_fh.fileno())
+      self.num_records = self.num_records + 1
+      return self.num_records
+
+  def replay(self):
+    """Yields (plugin_uid, cuid, record) in the order they were written."""
+    if not OS.path.exists(self.path_journal):
+      return
+
+    with open(self.path_journal, 'rb') as _fh:
+      while True:
+        try:
+          yield Pickle.load(_fh)
+        except EOFError:
+          break
+        except (Pickle.UnpicklingError, AttributeError, ValueError, IndexError):
+          # Partially written tail
+          break
+
+  def reset(self) -> None:
+    with self._lock:
+      if OS.path.exists(self.path_journal):
+        OS.remove(self.path_journal)
+      self.num_records = 0
+
+  def __len__(self):
+    return self.num_records
+
+  def __repr__(self):
+    return f"ProgressJournal({self.path_journal}, records={self.num_records})"
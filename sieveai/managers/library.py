@@ -0,0 +1,261 @@
+import os as OS
+import gzip as GZip
+import glob as Glob
+import shutil as SHUTIL
+import time as Time
+import pickle as Pickle
+import threading as Threading
+from array import array as Array
+
+class LigandLibrary():
+  """Multi-record ligand library (.sdf, .sdf.gz, .smi, .smi.gz) with a persistent byte-offset index.
+
+    _lib = LigandLibrary(path_library)
+    len(_lib), _lib.names[0]
+    _lib.get_block(0)                    # text of one record (random access)
+    _lib.get_mol(0)                      # RDKit molecule
+    _lib.write_record(0, path_sdf)       # single record SDF for the converters
+    for _name, _mol in _lib.iterate():   # streaming RDKit supplier
+      ...
+
+  The index (record offsets, lengths and names) is kept next to the library
+  as `.<file name>.sieveai.idx` and rebuilt when the size or mtime of the
+  library changes. Records are read with positional reads, from any thread
+  and in any order. Offsets of gzip libraries are positions in the
+  decompressed stream: the library is decompressed once to
+  `.<file name>.<size>-<mtime>.sieveai.plain` and records are read from it
+  (a read-only directory falls back to reading the stream forward).
+  """
+
+  extensions = ('.sdf', '.sdf.gz', '.smi', '.smi.gz', '.smiles', '.smiles.gz')
+  min_sdf_size = 64 * 1024 # Smaller .sdf files are single molecules
+
+  def __init__(self, *args, **kwargs):
+    self.path_library = str(kwargs.get('path_library', args[0] if len(args) > 0 else None))
+    _dir, _name = OS.path.split(self.path_library)
+    self.path_index = kwargs.get('path_index', args[1] if len(args) > 1 else None) or OS.path.join(_dir, f".{_name}.sieveai.idx")
+
+    self.name = _name
+    self.is_gzip = _name.endswith('.gz')
+    self.format = 'sdf' if '.sdf' in _name else 'smi'
+    self.stem = _name[:-len(next(_e for _e in self.extensions if _name.endswith(_e)))] if self.has_extension(_name) else _name
+
+    self._connect()
+
+  def _connect(self) -> None:
+    self._lock = Threading.Lock()
+    self._fh = None
+    self._fd = None
+    self._load_index()
+
+  # Pickled with Structures: the index is reloaded from disk
+  def __getstate__(self):
+    return {'path_library': self.path_library, 'path_index': self.path_index}
+
+  def __setstate__(self, state):
+    self.__init__(**state)
+
+  @classmethod
+  def has_extension(cls, name) -> bool:
+    return name.endswith(cls.extensions)
+
+  @classmethod
+  def is_library(cls, path, size=None) -> bool:
+    """Libraries by extension; a plain .sdf only when it holds more than one record."""
+    _name = OS.path.basename(str(path))
+    if not cls.has_extension(_name):
+      return False
+
+    if not _name.endswith('.sdf'):
+      return True
+
+    _size = OS.path.getsize(path) if size is None else size
+    if _size < cls.min_sdf_size:
+      return False
+
+    _records = 0
+    with open(path, 'rb') as _fh:
+      for _line in _fh:
+        if _line.startswith(b'$$$$'):
+          _records = _records + 1
+          if _records > 1:
+            return True
+
+    return False
+
+  def _signature(self) -> tuple:
+    _stat = OS.stat(self.path_library)
+    return (_stat.st_size, _stat.st_mtime_ns)
+
+  def _open(self):
+    return GZip.open(self.path_library, 'rb') if self.is_gzip else open(self.path_library, 'rb')
+
+  def _load_index(self) -> None:
+    _signature = self._signature()
+    if OS.path.exists(self.path_index):
+      try:
+        with open(self.path_index, 'rb') as _fh:
+          _index = Pickle.load(_fh)
+        if _index['signature'] == _signature:
+          self.offsets, self.lengths, self.names = _index['offsets'], _index['lengths'], _index['names']
+          return
+      except Exception:
+        pass
+
+    self.build_index()
+
+  def build_index(self) -> None:
+    self.offsets, self.lengths, _titles = Array('q'), Array('q'), []
+    _scan = self._scan_sdf if self.format == 'sdf' else self._scan_smi
+    with self._open() as _fh:
+      for _offset, _length, _title in _scan(_fh):
+        self.offsets.append(_offset)
+        self.lengths.append(_length)
+        _titles.append(_title)
+
+    # Unique ids, records without (or with repeated) titles are numbered
+    _seen = set()
+    self.names = []
+    for _idx, _title in enumerate(_titles):
+      _name = _title if _title and not _title in _seen else f"{self.stem}-{_idx + 1}"
+      _seen.add(_name)
+      self.names.append(_name)
+
+    _tmp = f"{self.path_index}.{OS.getpid()}-{Time.time_ns()}.tmp"
+    try:
+      with open(_tmp, 'wb') as _fh:
+        Pickle.dump({'signature': self._signature(), 'offsets': self.offsets, 'lengths': self.lengths, 'names': self.names},
+                    _fh, protocol=Pickle.HIGHEST_PROTOCOL)
+      OS.replace(_tmp, self.path_index)
+    except OSError:
+      # Read-only library directory, index is rebuilt next time
+      if OS.path.exists(_tmp):
+        OS.remove(_tmp)
+
+  def _scan_sdf(self, fh):
+    _offset, _start, _title = 0, 0, None
+    for _line in fh:
+      if _title is None:
+        _title = _line.decode(errors='replace').strip()
+      _offset = _offset + len(_line)
+      if _line.startswith(b'$$$$'):
+        yield (_start, _offset - _start, _title)
+        _start, _title = _offset, None
+
+    # Last record without the $$$$ terminator
+    if not _title is None and _offset > _start:
+      yield (_start, _offset - _start, _title)
+
+  def _scan_smi(self, fh):
+    _offset = 0
+    for _num, _line in enumerate(fh):
+      _length = len(_line)
+      _parts = _line.decode(errors='replace').split()
+      if len(_parts) > 0 and not _parts[0].startswith('#') and not (_num == 0 and _parts[0].lower() in ('smiles', 'smi')):
+        yield (_offset, _length, _parts[1] if len(_parts) > 1 else None)
+      _offset = _offset + _length
+
+  def _plain_copy(self):
+    """Decompressed copy of a gzip library (written once per library version), None if it cannot be written."""
+    _dir, _name = OS.path.split(self.path_library)
+    _size, _mtime_ns = self._signature()
+    _path = OS.path.join(_dir, f".{_name}.{_size}-{_mtime_ns}.sieveai.plain")
+    if OS.path.exists(_path):
+      return _path
+
+    _tmp = f"{_path}.{OS.getpid()}-{Time.time_ns()}.tmp"
+    try:
+      with self._open() as _src, open(_tmp, 'wb') as _dst:
+        SHUTIL.copyfileobj(_src, _dst, 1 << 20)
+      OS.replace(_tmp, _path)
+    except OSError:
+      if OS.path.exists(_tmp):
+        OS.remove(_tmp)
+      return None
+
+    # Copies of earlier versions of the library
+    for _stale in Glob.glob(OS.path.join(Glob.escape(_dir), f".{Glob.escape(_name)}.*.sieveai.plain")):
+      _stale == _path or OS.remove(_stale)
+
+    return _path
+
+  def _reader(self):
+    """File descriptor for positional reads (None: read the gzip stream)."""
+    if self._fd is None:
+      with self._lock:
+        if self._fd is None:
+          _path = self._plain_copy() if self.is_gzip else self.path_library
+          self._fd = OS.open(_path, OS.O_RDONLY) if _path and hasattr(OS, 'pread') else -1
+    return None if self._fd < 0 else self._fd
+
+  def get_block(self, idx) -> str:
+    _offset, _length = self.offsets[idx], self.lengths[idx]
+    _fd = self._reader()
+    if not _fd is None:
+      return OS.pread(_fd, _length, _offset).decode(errors='replace')
+
+    with self._lock:
+      if self._fh is None or (self.is_gzip and self._fh.tell() > _offset):
+        self._fh is None or self._fh.close()
+        self._fh = self._open()
+      self._fh.seek(_offset)
+      return self._fh.read(_length).decode(errors='replace')
+
+  def get_mol(self, idx):
+    from rdkit import Chem
+    _block = self.get_block(idx)
+    if self.format == 'sdf':
+      return Chem.MolFromMolBlock(_block, removeHs=False)
+
+    _mol = Chem.MolFromSmiles(_block.split()[0])
+    _mol is None or _mol.SetProp('_Name', self.names[idx])
+    return _mol
+
+  def write_record(self, idx, path_target) -> bool:
+    """Writes the record as a single molecule SDF (SMILES are embedded in 3D)."""
+    if self.format == 'sdf':
+      _block = self.get_block(idx)
+    else:
+      from rdkit import Chem
+      from rdkit.Chem import AllChem
+      _mol = self.get_mol(idx)
+      if _mol is None:
+        return False
+
+      _mol = Chem.AddHs(_mol)
+      if AllChem.EmbedMolecule(_mol, randomSeed=0xf00d) != 0:
+        return False
+      AllChem.MMFFOptimizeMolecule(_mol)
+      _block = Chem.MolToMolBlock(_mol) + "$$$$\n"
+
+    OS.makedirs(OS.path.dirname(str(path_target)), exist_ok=True)
+    _tmp = f"{path_target}.{OS.getpid()}-{Time.time_ns()}.tmp"
+    with open(_tmp, 'w') as _fh:
+      _fh.write(_block)
+    OS.replace(_tmp, str(path_target))
+    return True
+
+  def iterate(self):
+    """Streams (name, RDKit molecule) over the library in file order."""
+    from rdkit import Chem
+    with self._open() as _fh:
+      if self.format == 'sdf':
+        for _idx, _mol in enumerate(Chem.ForwardSDMolSupplier(_fh, removeHs=False)):
+          yield (self.names[_idx], _mol)
+      else:
+        for _idx, (_, _, _) in enumerate(self._scan_smi(_fh)):
+          yield (self.names[_idx], self.get_mol(_idx))
+
+  def close(self) -> None:
+    with self._lock:
+      self._fh is None or self._fh.close()
+      self._fh = None
+      if not self._fd is None and self._fd >= 0:
+        OS.close(self._fd)
+      self._fd = None
+
+  def __len__(self):
+    return len(self.offsets)
+
+  def __repr__(self):
+    return f"LigandLibrary({self.path_library}, n={len(self)})"
@@ -0,0 +1,95 @@
+import queue as Queue
+import threading as Threading
+
+class StreamPipeline():
+  """Chain of worker stages connected with bounded queues.
+
+    _pipe = StreamPipeline(maxsize=8)
+    _pipe.add_stage('convert', convert_fn, workers=1)
+    _pipe.add_stage('dock', dock_fn, workers=4)
+    _pipe.run(iterable_of_items) # Blocks until every stage is drained
+
+  A stage function receives one item and returns the item(s) for the next
+  stage: None drops it and a list/tuple fans it out. A full queue blocks the
+  upstream stage (back-pressure) so fast producers cannot run far ahead of
+  slow consumers. Failures are collected per item in `errors` and reported
+  via `on_error` without stopping the pipeline.
+  """
+
+  _stop = object()
+
+  def __init__(self, *args, **kwargs):
+    self.maxsize = int(kwargs.get('maxsize', args[0] if len(args) > 0 else 16))
+    self.on_error = kwargs.get('on_error', args[1] if len(args) > 1 else None)
+    self.stages = []
+    self.errors = []
+    self.stats = {}
+    self._lock = Threading.Lock()
+
+  def add_stage(self, name, method, workers=1):
+    self.stages.append((name, method, max(1, int(workers))))
+    self.stats[name] = 0
+    return self
+
+  def _put_results(self, result, out_queue) -> None:
+    if result is None or out_queue is None:
+      return
+
+    for _item in (result if isinstance(result, (list, tuple)) else [result]):
+      out_queue.put(_item)
+
+  def _worker(self, idx, in_queue, out_queue, remaining) -> None:
+    _name, _method, _ = self.stages[idx]
+    while True:
+      _item = in_queue.get()
+      if _item is self._stop:
+        break
+
+      try:
+        self._put_results(_method(_item), out_queue)
+        with self._lock:
+          self.stats[_name] = self.stats[_name] + 1
+      except Exception as _e:
+        with self._lock:
+          self.errors.append((_name, _item, _e))
+        callable(self.on_error) and self.on_error(_name, _item, _e)
+
+    # Last worker of the stage stops the next stage
+    with self._lock:
+      remaining[idx] = remaining[idx] - 1
+      _last = remaining[idx] == 0
+
+    if _last and out_queue is not None:
+      for _ in range(self.stages[idx + 1][2]):
+        out_queue.put(self._stop)
+
+  def run(self, items) -> dict:
+    if len(self.stages) == 0:
+      return self.stats
+
+    _queues = [Queue.Queue(maxsize=self.maxsize) for _ in self.stages]
+    _remaining = [_workers for *_, _workers in self.stages]
+
+    _threads = []
+    for _idx, (_name, _, _workers) in enumerate(self.stages):
+      _out_queue = _queues[_idx + 1] if _idx + 1 < len(self.stages) else None
+      for _w in range(_workers):
+        _thread = Threading.Thread(target=self._worker, args=(_idx, _queues[_idx], _out_queue, _remaining),
+                                   name=f"{_name}-{_w}", daemon=True)
+        _thread.start()
+        _threads.append(_thread)
+
+    try:
+      for _item in items:
+        _queues[0].put(_item)
+    finally:
+      for _ in range(self.stages[0][2]):
+        _queues[0].put(self._stop)
+
+    for _thread in _threads:
+      _thread.join()
+
+    return self.stats
+
+  def __repr__(self):
+    return f"StreamPipeline({' -> '.join(f'{_n}x{_w}' for _n, _, _w in self.stages)})"
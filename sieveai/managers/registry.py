@@ -0,0 +1,341 @@
+import os as OS
+
+from ..sieveaibase import EntityPath
+
+class FormatView():
+  """`Molecule.formats[ext]` of a registry entry; attribute writes go to the registry."""
+
+  __slots__ = ('_registry', '_idx', '_ext')
+
+  def __init__(self, registry, idx, ext):
+    self._registry = registry
+    self._idx = idx
+    self._ext = ext
+
+  @property
+  def mol_path(self):
+    return self._registry.get_path(self._idx, self._ext)
+
+  @mol_path.setter
+  def mol_path(self, value):
+    self._registry.set_path(self._idx, self._ext, value)
+
+  @property
+  def mol_hash(self):
+    return self._registry.get_hash(self._idx, self._ext)
+
+  @mol_hash.setter
+  def mol_hash(self, value):
+    self._registry.set_hash(self._idx, self._ext, value)
+
+  def __getitem__(self, key):
+    if not key in ('mol_path', 'mol_hash'):
+      raise KeyError(key)
+    return getattr(self, key)
+
+  def __setitem__(self, key, value):
+    if not key in ('mol_path', 'mol_hash'):
+      raise KeyError(key)
+    setattr(self, key, value)
+
+  def get(self, key, default=None):
+    _value = getattr(self, key, None) if key in ('mol_path', 'mol_hash') else None
+    return default if _value is None else _value
+
+  def keys(self):
+    return [_k for _k in ('mol_path', 'mol_hash') if not self.get(_k) is None]
+
+  def __contains__(self, key):
+    return key in self.keys()
+
+  def __repr__(self):
+    return f"{{'mol_path': {self.mol_path!r}, 'mol_hash': {self.mol_hash!r}}}"
+
+class FormatsView():
+  """`Molecule.formats` of a registry entry; a missing extension is created on write (like DictConfig)."""
+
+  __slots__ = ('_registry', '_idx')
+
+  def __init__(self, registry, idx):
+    self._registry = registry
+    self._idx = idx
+
+  def __getitem__(self, ext):
+    return FormatView(self._registry, self._idx, ext)
+
+  def __getattr__(self, ext):
+    if ext.startswith('_'):
+      raise AttributeError(ext)
+    return self[ext]
+
+  def __contains__(self, ext):
+    return not self._registry.get_path(self._idx, ext) is None
+
+  def keys(self):
+    return [_ext for _ext in self._registry.formats if _ext in self]
+
+  def __iter__(self):
+    return iter(self.keys())
+
+  def __len__(self):
+    return len(self.keys())
+
+  def items(self):
+    return [(_ext, self[_ext]) for _ext in self.keys()]
+
+  def __repr__(self):
+    return repr(dict(self.items()))
+
+class MoleculeView():
+  """Molecule/Compound-like view of one registry entry, created on access.
+
+  Supports what the plugins use of a Molecule: `mol_id`, `mol_path`,
+  `mol_cat`, `formats[ext].mol_path|mol_hash` and item access for extra
+  attributes (e.g. `mol_category`). `to_molecule` materialises a copy.
+  """
+
+  __slots__ = ('_registry', '_idx')
+
+  def __init__(self, registry, idx):
+    self._registry = registry
+    self._idx = idx
+
+  @property
+  def mol_id(self):
+    return self._registry.ids[self._idx]
+
+  @property
+  def mol_path(self):
+    return self._registry.get_path(self._idx, self._registry.primary[self._idx])
+
+  @mol_path.setter
+  def mol_path(self, value):
+    _path = EntityPath(value)
+    self._registry.set_path(self._idx, _path.suffix, _path)
+    self._registry.primary[self._idx] = self._registry.intern(_path.suffix)
+
+  @property
+  def formats(self) -> FormatsView:
+    return FormatsView(self._registry, self._idx)
+
+  @property
+  def mol_cat(self):
+    return self.get('mol_cat')
+
+  def _fields(self) -> dict:
+    return {'mol_id': self.mol_id, 'mol_path': self.mol_path, **self._registry.get_attrs(self._idx)}
+
+  def __getitem__(self, key):
+    if key == 'formats':
+      return self.formats
+    return self._fields()[key]
+
+  def __setitem__(self, key, value):
+    if key == 'mol_path':
+      self.mol_path = value
+    elif key in ('mol_id', 'formats'):
+      raise KeyError(f"{key} of a registered molecule cannot be replaced.")
+    else:
+      self._registry.set_attr(self._idx, key, value)
+
+  def __getattr__(self, key):
+    if key.startswith('_'):
+      raise AttributeError(key)
+    try:
+      return self._fields()[key]
+    except KeyError:
+      raise AttributeError(key)
+
+  def get(self, key, default=None):
+    return self._fields().get(key, default)
+
+  def __contains__(self, key):
+    return key == 'formats' or key in self._fields()
+
+  def keys(self):
+    return ['formats', *self._fields().keys()]
+
+  def to_molecule(self):
+    """Materialises the entry as the registry's Molecule type."""
+    _molecule = self._registry.mol_type(self.mol_id, [self.formats[_ext].mol_path for _ext in self.formats])
+    for _ext in self.formats:
+      _molecule.formats[_ext].mol_hash = self.formats[_ext].mol_hash
+    _molecule.update(self._fields())
+    return _molecule
+
+  def __eq__(self, other):
+    return isinstance(other, MoleculeView) and other._registry is self._registry and other._idx == self._idx
+
+  def __repr__(self):
+    return f"{self._registry.mol_type.__name__}View({self.mol_id}, {self.mol_path})"
+
+class MoleculeRegistry():
+  """Compact mapping of mol_id to molecule files for large libraries.
+
+    _registry = MoleculeRegistry(Compound)
+    _registry.add('L1', [EntityPath('L1.pdb'), EntityPath('L1.sdf')])
+    _registry['L1'].formats['.pdbqt'].mol_path = _path   # writes through
+    for _mol_id, _mol_obj in _registry.items(): ...
+
+  Entries live in parallel lists indexed by position: ids, the preferred
+  format (`mol_path`) and per format the file path (str) and hash (bytes).
+  Extra attributes are kept sparsely. `MoleculeView`s are created on access
+  so no per-molecule DictConfig is built or pickled.
+  """
+
+  def __init__(self, *args, **kwargs):
+    self.mol_type = kwargs.get('mol_type', args[0] if len(args) > 0 else None)
+    self.defaults = kwargs.get('defaults', args[1] if len(args) > 1 else None) or {}
+    self.ids = []
+    self.primary = []
+    self.formats = {} # ext: ([path...], [hash...])
+    self._index = {}
+    self._attrs = {}
+    self._strings = {}
+
+  def __getstate__(self):
+    _state = self.__dict__.copy()
+    # Rebuilt from ids
+    _state.pop('_index')
+    _state.pop('_strings')
+    return _state
+
+  def __setstate__(self, state):
+    self.__dict__.update(state)
+    self._index = {_mol_id: _idx for _idx, _mol_id in enumerate(self.ids)}
+    self._strings = {}
+
+  def intern(self, value):
+    return self._strings.setdefault(value, value)
+
+  def _format_lists(self, ext) -> tuple:
+    if not ext in self.formats:
+      self.formats[self.intern(ext)] = ([None] * len(self.ids), [None] * len(self.ids))
+    return self.formats[ext]
+
+  def add(self, mol_id, mol_paths, **attrs) -> int:
+    """Registers a molecule (paths with preset `_hash` are not read again); returns its position."""
+    if mol_id in self._index:
+      _idx = self._index[mol_id]
+    else:
+      _idx = len(self.ids)
+      self._index[mol_id] = _idx
+      self.ids.append(mol_id)
+      self.primary.append(None)
+      for _paths, _hashes in self.formats.values():
+        _paths.append(None)
+        _hashes.append(None)
+
+    _has_primary = not self.primary[_idx] is None
+    for _mp in mol_paths:
+      self.set_path(_idx, _mp.suffix, _mp)
+      _hash = _mp._hash if not _mp._hash is None else (_mp.hash if _mp.is_file() else None)
+      self.set_hash(_idx, _mp.suffix, _hash)
+
+    # prefer .pdb or set first path as mol_path
+    _suffixes = [_mp.suffix for _mp in mol_paths]
+    if not _has_primary and len(_suffixes) > 0:
+      self.primary[_idx] = self.intern('.pdb' if '.pdb' in _suffixes else _suffixes[0])
+
+    for _key, _value in attrs.items():
+      self.set_attr(_idx, _key, _value)
+
+    return _idx
+
+  def add_path(self, mol_id, path, mol_hash=None) -> int:
+    """Registers a molecule by its path without creating an EntityPath or reading the file."""
+    _ext = OS.path.splitext(str(path))[1]
+    if mol_id in self._index:
+      _idx = self._index[mol_id]
+    else:
+      _idx = self.add(mol_id, [])
+
+    self.set_path(_idx, _ext, path)
+    self.set_hash(_idx, _ext, mol_hash)
+    return _idx
+
+  def index_of(self, mol_id):
+    return self._index.get(mol_id)
+
+  def get_path(self, idx, ext):
+    if not ext in self.formats:
+      return None
+    _path = self.formats[ext][0][idx]
+    return None if _path is None else EntityPath(_path)
+
+  def set_path(self, idx, ext, value) -> None:
+    self._format_lists(ext)[0][idx] = None if value is None else str(value)
+    if self.primary[idx] is None and not value is None:
+      self.primary[idx] = self.intern(ext)
+
+  def get_hash(self, idx, ext):
+    if not ext in self.formats:
+      return None
+    _hash = self.formats[ext][1][idx]
+    return _hash.hex() if isinstance(_hash, (bytes)) else _hash
+
+  def set_hash(self, idx, ext, value) -> None:
+    if isinstance(value, (str)):
+      try:
+        value = bytes.fromhex(value)
+      except ValueError:
+        pass
+    self._format_lists(ext)[1][idx] = value
+
+  def get_attrs(self, idx) -> dict:
+    return {**self.defaults, **self._attrs.get(idx, {})}
+
+  def set_attr(self, idx, key, value) -> None:
+    self._attrs.setdefault(idx, {})[key] = value
+
+  def __getitem__(self, mol_id) -> MoleculeView:
+    return MoleculeView(self, self._index[mol_id])
+
+  def __setitem__(self, mol_id, molecule) -> None:
+    """Registers a Molecule (or a view/dict of the same shape) under mol_id."""
+    _formats = molecule['formats'] if 'formats' in molecule else {}
+    _paths = []
+    for _ext in list(_formats.keys()):
+      if not hasattr(_formats[_ext], 'get'):
+        continue
+      _path = _formats[_ext].get('mol_path')
+      if not _path is None:
+        _path = EntityPath(_path)
+        _path._hash = _formats[_ext].get('mol_hash')
+        _paths.append(_path)
+
+    _idx = self.add(mol_id, _paths)
+    if not molecule.get('mol_path') is None:
+      self.primary[_idx] = self.intern(EntityPath(molecule.get('mol_path')).suffix)
+
+    for _key in molecule.keys():
+      if str(_key).startswith('__') or _key in ('mol_id', 'mol_path', 'formats'):
+        continue
+      if not self.defaults.get(_key) == molecule[_key]:
+        self.set_attr(_idx, _key, molecule[_key])
+
+  def get(self, mol_id, default=None):
+    return self[mol_id] if mol_id in self._index else default
+
+  def __contains__(self, mol_id) -> bool:
+    return mol_id in self._index
+
+  def __len__(self) -> int:
+    return len(self.ids)
+
+  def __iter__(self):
+    return iter(self.ids)
+
+  def keys(self) -> list:
+    return list(self.ids)
+
+  def items(self):
+    for _idx, _mol_id in enumerate(self.ids):
+      yield (_mol_id, MoleculeView(self, _idx))
+
+  def values(self):
+    for _idx in range(len(self.ids)):
+      yield MoleculeView(self, _idx)
+
+  def __repr__(self):
+    return f"MoleculeRegistry(n={len(self.ids)}, formats={list(self.formats)})"
@@ -0,0 +1,66 @@
+import pickle as Pickle
+import queue as Queue
+import threading as Threading
+
+class ResultChannel():
+  """Carries per-complex step results from pool workers to a single writer in the parent.
+
+    _channel = ResultChannel(on_result)       # on_result(plugin_uid, cuid, record)
+    _channel.open()
+    _channel.put('Vina', cuid, record)        # from any worker, after each step
+    _channel.close()                          # drains the channel and stops the writer
+
+  Records are pickled by the worker when put, so the writer always receives a
+  consistent copy while the worker moves on to the next step. Pass a
+  `multiprocessing` queue for process based pools; results of child processes
+  then reach the parent the same way as those of threads.
+  """
+
+  _stop = None
+
+  def __init__(self, *args, **kwargs):
+    self.on_result = kwargs.get('on_result', args[0] if len(args) > 0 else None)
+    self.queue = kwargs.get('queue', args[1] if len(args) > 1 else None) or Queue.Queue()
+    self.on_error = kwargs.get('on_error', args[2] if len(args) > 2 else None)
+    self.num_results = 0
+    self.errors = []
+    self._writer = None
+
+  @property
+  def is_open(self) -> bool:
+    return not self._writer is None and self._writer.is_alive()
+
+  def open(self):
+    if not self.is_open:
+      self._writer = Threading.Thread(target=self._write, name='result-channel', daemon=True)
+      self._writer.start()
+    return self
+
+  def put(self, plugin_uid, cuid, record) -> None:
+    self.queue.put(Pickle.dumps((plugin_uid, cuid, record), protocol=Pickle.HIGHEST_PROTOCOL))
+
+  def _write(self) -> None:
+    while True:
+      _data = self.queue.get()
+      if _data is self._stop:
+        break
+
+      _result = None
+      try:
+        _result = Pickle.loads(_data)
+        self.on_result(*_result)
+        self.num_results = self.num_results + 1
+      except Exception as _e:
+        self.errors.append((_result, _e))
+        callable(self.on_error) and self.on_error(_result, _e)
+
+  def close(self) -> int:
+    """Blocks until every result put so far is written; returns the number of results."""
+    if self.is_open:
+      self.queue.put(self._stop)
+      self._writer.join()
+    self._writer = None
+    return self.num_results
+
+  def __repr__(self):
+    return f"ResultChannel(results={self.num_results}, open={self.is_open})"
@@ -0,0 +1,199 @@
+import json as JSON
+import time as Time
+import queue as Queue
+import socket as Socket
+import threading as Threading
+import subprocess as SubProcess
+import urllib.parse as URLParse
+import urllib.request as URLRequest
+
+class RESTSessionError(RuntimeError):
+  """A command failed in the session (the session itself may still be usable)."""
+
+class RESTSession():
+  """One long-lived ChimeraX process controlled through `remotecontrol rest`.
+
+    _session = RESTSession(45385)
+    _session.start()
+    _session.run('open /path/analysis.cxc')   # raises RESTSessionError on command errors
+    _session.stop()
+
+  `launcher` is the command line with `{port}` placeholders; any program that
+  answers GET /run?command=... like ChimeraX (e.g. a stub server) can be used.
+  """
+
+  launcher = ['chimerax', '--offscreen', '--nostatus', '--silent',
+              '--cmd', 'remotecontrol rest start port {port} json true']
+
+  def __init__(self, *args, **kwargs):
+    self.port = kwargs.get('port', args[0] if len(args) > 0 else None)
+    self.launcher = kwargs.get('launcher', args[1] if len(args) > 1 else None) or self.launcher
+    self.start_timeout = float(kwargs.get('start_timeout', args[2] if len(args) > 2 else 60))
+    self.job_timeout = kwargs.get('job_timeout', args[3] if len(args) > 3 else None)
+
+    self.process = None
+    self.num_jobs = 0
+    self.num_starts = 0
+    self.last_used = 0
+
+  @staticmethod
+  def free_port() -> int:
+    with Socket.socket(Socket.AF_INET, Socket.SOCK_STREAM) as _sock:
+      _sock.bind(('127.0.0.1', 0))
+      return _sock.getsockname()[1]
+
+  @property
+  def url(self) -> str:
+    return f"http://127.0.0.1:{self.port}/run"
+
+  @property
+  def is_running(self) -> bool:
+    return not self.process is None and self.process.poll() is None
+
+  def start(self):
+    self.stop()
+    self.port = self.port or self.free_port()
+    _cmd = [str(_part).format(port=self.port) for _part in self.launcher]
+    self.process = SubProcess.Popen(_cmd, stdout=SubProcess.DEVNULL, stderr=SubProcess.DEVNULL)
+    self.num_jobs = 0
+    self.num_starts = self.num_starts + 1
+
+    # ChimeraX takes seconds to start, the REST server answers once it is ready
+    _deadline = Time.time() + self.start_timeout
+    while Time.time() < _deadline:
+      if not self.is_running:
+        raise ConnectionError(f"Session on port {self.port} exited while starting ({self.process.returncode}).")
+      if self.ping(timeout=2):
+        return self
+      Time.sleep(0.25)
+
+    self.stop()
+    raise TimeoutError(f"Session on port {self.port} did not answer within {self.start_timeout}s.")
+
+  def _get(self, command, timeout=None):
+    _url = f"{self.url}?{URLParse.urlencode({'command': command})}"
+    with URLRequest.urlopen(_url, timeout=timeout) as _r:
+      _body = _r.read().decode(errors='replace')
+
+    try:
+      return JSON.loads(_body)
+    except ValueError:
+      # remotecontrol started without `json true` returns the log as text/html
+      return {'error': None, 'log messages': {'info': [_body]}}
+
+  def ping(self, timeout=5) -> bool:
+    try:
+      self._get('version', timeout=timeout)
+      return True
+    except Exception:
+      return False
+
+  def run(self, command) -> dict:
+    """Runs a command (e.g. `open script.cxc`), returns the JSON reply of the server."""
+    _reply = self._get(command, timeout=self.job_timeout)
+    self.num_jobs = self.num_jobs + 1
+    self.last_used = Time.time()
+
+    _error = _reply.get('error') if isinstance(_reply, dict) else None
+    if _error:
+      _message = _error.get('message', _error) if isinstance(_error, dict) else _error
+      raise RESTSessionError(str(_message).strip())
+
+    return _reply
+
+  def stop(self) -> None:
+    if self.process is None:
+      return
+
+    if self.is_running:
+      try:
+        self._get('exit', timeout=2)
+      except Exception:
+        pass
+
+      try:
+        self.process.wait(timeout=5)
+      except SubProcess.TimeoutExpired:
+        self.process.kill()
+        self.process.wait()
+
+    self.process = None
+
+  def __repr__(self):
+    return f"RESTSession(port={self.port}, running={self.is_running}, jobs={self.num_jobs})"
+
+class SessionPool():
+  """Pool of `RESTSession`s, one port per worker, shared by the analysis threads.
+
+    _pool = SessionPool(4, max_jobs=200)
+    _pool.run_script(_path_cxc)    # blocks until a session is free
+    _pool.close()
+
+  Sessions are started on first use and restarted after `max_jobs` scripts,
+  when the process died, or when a session idle for `health_interval`
+  seconds does not answer. A job that loses its session (connection error)
+  is retried once on a restarted session; command errors are raised.
+  """
+
+  def __init__(self, *args, **kwargs):
+    self.size = max(1, int(kwargs.get('size', args[0] if len(args) > 0 else 1) or 1))
+    self.base_port = kwargs.get('base_port', args[1] if len(args) > 1 else None)
+    self.max_jobs = kwargs.get('max_jobs', args[2] if len(args) > 2 else None)
+    self.health_interval = float(kwargs.get('health_interval', args[3] if len(args) > 3 else 30))
+    self.launcher = kwargs.get('launcher', args[4] if len(args) > 4 else None)
+    self.start_timeout = kwargs.get('start_timeout', 60)
+    self.job_timeout = kwargs.get('job_timeout', None)
+
+    self.sessions = [RESTSession(
+        port=(int(self.base_port) + _i) if self.base_port else None,
+        launcher=self.launcher,
+        start_timeout=self.start_timeout,
+        job_timeout=self.job_timeout,
+      ) for _i in range(self.size)]
+
+    self._idle = Queue.Queue()
+    for _session in self.sessions:
+      self._idle.put(_session)
+
+    self._lock = Threading.Lock()
+    self.num_restarts = 0
+
+  def _ready(self, session) -> RESTSession:
+    _restart = not session.is_running
+    _restart = _restart or (self.max_jobs and session.num_jobs >= int(self.max_jobs))
+    _restart = _restart or (Time.time() - session.last_used > self.health_interval and not session.ping())
+
+    if _restart:
+      with self._lock:
+        self.num_restarts = self.num_restarts + (1 if session.num_starts > 0 else 0)
+      session.start()
+
+    return session
+
+  def run(self, command) -> dict:
+    _session = self._idle.get()
+    try:
+      try:
+        return self._ready(_session).run(command)
+      except OSError:
+        # Session crashed or hung mid-job (connection refused/reset, timeout)
+        _session.stop()
+        return self._ready(_session).run(command)
+    finally:
+      self._idle.put(_session)
+
+  def run_script(self, path_script) -> dict:
+    return self.run(f"open {path_script}")
+
+  def close(self) -> None:
+    for _session in self.sessions:
+      _session.stop()
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *args):
+    self.close()
+
+  def __repr__(self):
+    return f"SessionPool(size={self.size}, restarts={self.num_restarts})"
@@ -0,0 +1,74 @@
+import os as OS
+import time as Time
+import errno as Errno
+import shutil as SHUTIL
+
+class FileStager():
+  """Places input structures in complex directories without duplicating them.
+
+    _stager = FileStager('hardlink')       # hardlink|symlink|copy
+    _stager.stage(_rec_pdbqt, _complex_path / 'REC.pdbqt')
+
+  The target path is the same as with a copy, so the tools read
+  `path_receptor`/`path_ligand` unchanged. Links fall back to a copy where
+  the filesystem cannot link (another device, no link support); after a
+  cross-device failure hardlinks are not tried again. Inputs are shared with
+  the structure directories and must not be modified in place.
+  """
+
+  modes = ('copy', 'hardlink', 'symlink')
+
+  def __init__(self, *args, **kwargs):
+    self.mode = kwargs.get('mode', args[0] if len(args) > 0 else None) or 'copy'
+    if not self.mode in self.modes:
+      raise ValueError(f"Staging mode {self.mode} is not one of {', '.join(self.modes)}.")
+
+    self.num_linked = 0
+    self.num_copied = 0
+    self._can_hardlink = True
+
+  def _link(self, path_source, path_tmp) -> bool:
+    if self.mode == 'symlink':
+      OS.symlink(OS.path.abspath(path_source), path_tmp)
+      return True
+
+    if self.mode == 'hardlink' and self._can_hardlink:
+      try:
+        OS.link(path_source, path_tmp)
+        return True
+      except OSError as _e:
+        if _e.errno == Errno.EXDEV:
+          self._can_hardlink = False
+        raise
+
+    return False
+
+  def stage(self, path_source, path_target):
+    """Links (or copies) `path_source` to `path_target`, replacing an existing target."""
+    _path_source, _path_target = str(path_source), str(path_target)
+    OS.makedirs(OS.path.dirname(_path_target) or '.', exist_ok=True)
+
+    # Created aside and renamed so that a restaged target is never missing
+    _tmp = f"{_path_target}.{OS.getpid()}-{Time.time_ns()}.tmp"
+    try:
+      _linked = self._link(_path_source, _tmp)
+    except (OSError, NotImplementedError):
+      _linked = False
+
+    if not _linked:
+      SHUTIL.copyfile(_path_source, _tmp)
+
+    OS.replace(_tmp, _path_target)
+    if OS.path.lexists(_tmp):
+      # rename() is a no-op when both are links to the same file (restaged hardlink)
+      OS.remove(_tmp)
+
+    if _linked:
+      self.num_linked = self.num_linked + 1
+    else:
+      self.num_copied = self.num_copied + 1
+
+    return path_target
+
+  def __repr__(self):
+    return f"FileStager({self.mode}, linked={self.num_linked}, copied={self.num_copied})"
@@ -1,4 +1,13 @@
+import os as OS
+import bisect as Bisect
+import pickle as Pickle
+import threading as Threading
+import concurrent.futures as ConcurrentFutures
+
 from ..entity import Compound, MacroMolecule
+from .hashes import FileHashCache
+from .registry import MoleculeRegistry
+from .library import LigandLibrary
 from Bio.PDB import PDBParser
 from rdkit import Chem
 
@@ -14,6 +23,10 @@ class Structures():
   }
 
   mol_type = None
+  file_hash_cache = '.sieveai.hashes'
+  _conversions_lock = Threading.RLock()
+  _conversions_save_every = 100 # Single molecule conversions between manifest writes
+  _molecule_locks = tuple(Threading.Lock() for _ in range(64)) # Striped by mol_id, jobs sharing a molecule convert it once
 
   PDB_AA = {"ALA","ARG","ASN","ASP","CYS","GLN","GLU","HIS","ILE","LEU","LYS","MET","PHE","PRO","PYL","SEC","SER","THR","TRP","TYR","VAL","DAL","DAR","DSG","DAS","DCY","DGN","DGL","DHI","DIL","DLE","DLY","MED","DPN","DPR","DSN","DTH","DTR","DTY","DVA","UNK","UNL"}
 
@@ -90,21 +103,143 @@ class Structures():
     if isinstance(self.mol_categories, (str)):
       self.mol_categories = [self.mol_categories]
 
-    self.molecules = {}
+    self.path_hash_cache = kwargs.get('path_hash_cache', (self.path_molecules / self.file_hash_cache) if self.path_molecules else None)
+
+    self.Hashes = FileHashCache(self.path_hash_cache)
+
+    self.libraries = []
+    self._library_starts = [] # Registry position of the first record of each library
 
     self._discover_molecules()
 
+  def __getstate__(self):
+    _state = self.__dict__.copy()
+    # Skip manifest is reloaded from its file
+    _state.pop('_conversions', None)
+    _state.pop('_conversions_unsaved', None)
+    return _state
+
+  def __setstate__(self, state):
+    self.__dict__.update(state)
+    # Progress written before the registry: {mol_id: Molecule}
+    if isinstance(self.molecules, (dict)):
+      _molecules, self.molecules = self.molecules, self._new_registry()
+      for _mol_id, _mol_obj in _molecules.items():
+        self.molecules[_mol_id] = _mol_obj
+
+    if not 'Hashes' in state:
+      self.path_hash_cache = None
+      self.Hashes = FileHashCache(None)
+
+    if not 'libraries' in state:
+      self.libraries = []
+      self._library_starts = []
+
+  def _new_registry(self) -> MoleculeRegistry:
+    return MoleculeRegistry(self.mol_type, {'mol_cat': 'compound'} if self.mol_type is Compound else {})
+
+  def _index_molecules(self) -> dict:
+    """Single scandir pass: {mol_id: [paths...]} with hashes from the hash cache.
+
+    Multi-record libraries (see LigandLibrary) are collected in `libraries`.
+    """
+    _mol_files = {}
+    with OS.scandir(self.path_molecules) as _entries:
+      for _entry in _entries:
+        if _entry.name.startswith('.') or not _entry.is_file():
+          continue
+
+        if LigandLibrary.is_library(_entry.path, _entry.stat().st_size):
+          self.libraries.append(LigandLibrary(_entry.path))
+          continue
+
+        _mol_path = self.path_molecules / _entry.name
+        # Preset so that Molecule does not read the file again
+        _mol_path._hash = self.Hashes.hash(_mol_path, _entry.stat())
+        _mol_files.setdefault(_mol_path.stem, []).append(_mol_path)
+
+    return _mol_files
+
   def _discover_molecules(self):
     _mol_types = set(self.mol_categories) & {'rna', 'dna', 'protein', 'macromolecule'}
     self.mol_type = MacroMolecule if len(_mol_types) > 0 else Compound
+    self.molecules = self._new_registry()
 
     if not self.path_molecules.exists():
       return
 
-    _file_stems = {_f.stem for _f in self.path_molecules.files}
-    for _mol_id in _file_stems:
-      _molecules = list(self.path_molecules.search(f"{_mol_id}.*"))
-      self.molecules[_mol_id] = self.mol_type(_mol_id, _molecules)
+    for _mol_id, _molecules in self._index_molecules().items():
+      self.molecules.add(_mol_id, sorted(_molecules))
+
+    self.libraries = sorted(self.libraries, key=lambda _l: _l.name)
+    for _library in self.libraries:
+      self._register_library(_library)
+
+    self.Hashes.save(prune=True)
+
+  def _register_library(self, library) -> None:
+    """Registers library records as molecules; files are only written by `materialise`.
+
+    Records of a library take consecutive registry positions so that the
+    record number is the offset from the library's first position.
+    """
+    self._library_starts.append(len(self.molecules))
+    _path_records = OS.path.join(str(self.path_molecules), f".{library.name}.records")
+    for _mol_id in library.names:
+      while _mol_id in self.molecules:
+        _mol_id = f"{library.stem}-{_mol_id}"
+
+      self.molecules.add_path(_mol_id, OS.path.join(_path_records, f"{_mol_id}.sdf"))
+
+  def _library_record(self, mol_id):
+    """(LigandLibrary, record number) of a library molecule, else None."""
+    _idx = self.molecules.index_of(mol_id)
+    if _idx is None or len(self._library_starts) == 0 or _idx < self._library_starts[0]:
+      return None
+
+    _lib_num = Bisect.bisect_right(self._library_starts, _idx) - 1
+    _rec_num = _idx - self._library_starts[_lib_num]
+    _library = self.libraries[_lib_num]
+    return (_library, _rec_num) if _rec_num < len(_library) else None
+
+  def is_library_record(self, mol_id) -> bool:
+    return not self._library_record(mol_id) is None
+
+  def get_record_mol(self, mol_id):
+    """RDKit molecule of a library record (None for molecule files)."""
+    _record = self._library_record(mol_id)
+    return None if _record is None else _record[0].get_mol(_record[1])
+
+  def materialise(self, mol_id):
+    """Writes a library record to its SDF path (once) and returns the path."""
+    _mol_path = self.molecules[mol_id].formats['.sdf'].mol_path
+    _record = self._library_record(mol_id)
+    if _record is None or _mol_path.exists():
+      return _mol_path
+
+    if _record[0].write_record(_record[1], _mol_path):
+      self.molecules[mol_id].formats['.sdf'].mol_hash = self.Hashes.hash(_mol_path)
+
+    return _mol_path
+
+  def add_molecule(self, *args, **kwargs):
+    """Registers a molecule file that appeared after discovery (e.g. streamed by StructureSync).
+
+    :param mol_path|0: EntityPath of the molecule file
+
+    :return: mol_id
+    """
+    _mol_path = kwargs.get('mol_path', args[0] if len(args) > 0 else None)
+    _mol_id = _mol_path.stem
+    _mol_path._hash = self.Hashes.hash(_mol_path)
+
+    if not _mol_id in self.molecules:
+      self.molecules.add(_mol_id, [_mol_path])
+    elif not _mol_path.suffix in self.molecules[_mol_id].formats:
+      self.molecules[_mol_id].formats[_mol_path.suffix].mol_path = _mol_path
+      self.molecules[_mol_id].formats[_mol_path.suffix].mol_hash = _mol_path.hash
+
+    return _mol_id
 
   def get_mol_as_pdb(self, *args, **kwargs):
     _path = kwargs.get('path', args[0] if len(args[0]) > 0 else None)
@@ -154,16 +289,15 @@ class Structures():
     return f"""N={len(self.molecules)} {*self.mol_categories,} structures from {self.path_molecules}."""
 
   def __getitem__(self, *args, **kwargs):
-    _first_key = list(self.molecules.keys())[0] if len(self.molecules.keys()) > 0 else None
+    _first_key = self.molecules.ids[0] if len(self.molecules) > 0 else None
     _key = kwargs.get('key', args[0] if len(args) > 0 else _first_key)
     return self.molecules.get(_key)
 
   def __iter__(self, *args, **kwargs):
-    for _mol_id, _mol_obj in self.molecules.items():
-      yield (_mol_id, _mol_obj)
+    yield from self.molecules.items()
 
   def __len__(self):
-    return len(self.molecules.keys())
+    return len(self.molecules)
 
   len = __len__
 
@@ -182,8 +316,114 @@ class Structures():
     for _mol_id, _mol_obj in self.items:
       self[_mol_id][attr_key] = method(_mol_obj)
 
-  def set_format(self, ext='.pdbqt', mol_id=None, converter=None, **kwargs) -> None:
+  def _load_conversions(self) -> dict:
+    """Skip manifest {target path: source hash} of earlier conversions."""
+    if not '_conversions' in self.__dict__:
+      self._conversions = {}
+      if self.path_hash_cache and OS.path.exists(f"{self.path_hash_cache}.conversions"):
+        try:
+          with open(f"{self.path_hash_cache}.conversions", 'rb') as _fh:
+            self._conversions = Pickle.load(_fh)
+        except Exception:
+          self._conversions = {}
+    return self._conversions
+
+  def _save_conversions(self, force=True) -> None:
+    if not self.path_hash_cache:
+      return
+
+    with self._conversions_lock:
+      self._conversions_unsaved = getattr(self, '_conversions_unsaved', 0) + 1
+      if not force and self._conversions_unsaved < self._conversions_save_every:
+        return
+
+      _tmp = f"{self.path_hash_cache}.conversions.{OS.getpid()}.tmp"
+      try:
+        with open(_tmp, 'wb') as _fh:
+          Pickle.dump(self._load_conversions(), _fh, protocol=Pickle.HIGHEST_PROTOCOL)
+        OS.replace(_tmp, f"{self.path_hash_cache}.conversions")
+        self._conversions_unsaved = 0
+      except OSError:
+        OS.path.exists(_tmp) and OS.remove(_tmp)
+
+  def _record_signature(self, mol_id):
+    """Stands in for the source hash of a library record that was not written."""
+    _library, _rec_num = self._library_record(mol_id)
+    _size, _mtime_ns = _library._signature()
+    return f"{_library.name}:{_size}:{_mtime_ns}:{_rec_num}"
+
+  def _pending_conversions(self, ext, items, records=False) -> list:
+    """[(mol_id, source, target, source hash)...] that need (re)conversion.
+
+    :param records: Include library records without a file (converted from the library)
+    """
+    _conversions = self._load_conversions()
+    _pending = []
+    for _mol_id, _mol_obj in items:
+      _source = _mol_obj.mol_path
+      _target = _source.with_suffix(ext)
+      _source_hash = _mol_obj.formats[_source.suffix].mol_hash
+      _converted_from = _conversions.get(str(_target))
+
+      # Existing targets are kept unless converted from a source that changed since
+      if ext in _mol_obj.formats and (_converted_from is None or _converted_from == _source_hash):
+        continue
+
+      # Library records are converted when a job needs them (mol_id is given)
+      if not _source.exists() and self.is_library_record(_mol_id):
+        if not records:
+          continue
+        _source_hash = self._record_signature(_mol_id)
+        _converted_from = _conversions.get(str(_target))
+
+      if _target.exists() and not _converted_from is None and _converted_from == _source_hash:
+        self[_mol_id].formats[ext].mol_path = _target
+        self[_mol_id].formats[ext].mol_hash = self.Hashes.hash(_target)
+        continue
+
+      _pending.append((_mol_id, _source, _target, _source_hash))
 
+    return _pending
+
+  @staticmethod
+  def _converter_id(method) -> str:
+    """Plugin, tool version (obabel -V, meeko...) and method: cached files of another tool version are not used."""
+    _owner = getattr(method, '__self__', None)
+    _name = getattr(_owner, 'plugin_uid', None) or type(_owner).__name__
+    _method_name = getattr(method, '__name__', str(method))
+    if callable(getattr(_owner, 'converter_version', None)):
+      _version = _owner.converter_version(_method_name)
+    else:
+      _version = getattr(_owner, 'plugin_version', None)
+    return f"{_name}-{_version}.{_method_name}"
+
+  def _molecule_lock(self, mol_id):
+    return self._molecule_locks[hash(mol_id) % len(self._molecule_locks)]
+
+  def set_format(self, ext='.pdbqt', mol_id=None, converter=None, workers=1, bulk_converter=None, library_converter=None, cache=None, **kwargs) -> None:
+    """Converts molecules to `ext` in parallel, skipping targets converted from the same source.
+
+    :param converter: method(path_source, path_target, ext_source, ext_target, **kwargs) per molecule
+    :param workers: Converter calls running at once (converters run external tools)
+    :param bulk_converter: method([(path_source, path_target)...], workers=) -> {target: error|None}
+      for many molecules per call, e.g. OpenBabel.bulk_convert
+    :param library_converter: method(library, [(record number, path_target)...], workers=) -> {target: error|None}
+      converts library records straight from the library, e.g. MGLTools.prepare_library;
+      without it records are written out and converted when a job needs them
+    :param cache: DiskCache shared across projects; converted files are looked up by
+      source hash, converter (plugin, tool version, method), target format and kwargs
+
+    Molecules that failed are listed in `conversion_failures` {mol_id: reason}. Calls
+    for one `mol_id` (jobs sharing a ligand or receptor) run one at a time, the
+    later ones find the target converted.
+    """
+    if mol_id:
+      with self._molecule_lock(mol_id):
+        return self._set_format(ext, mol_id, converter, workers, bulk_converter, library_converter, cache, **kwargs)
+
+    return self._set_format(ext, mol_id, converter, workers, bulk_converter, library_converter, cache, **kwargs)
+
+  def _set_format(self, ext, mol_id, converter, workers, bulk_converter, library_converter, cache, **kwargs) -> None:
     ext = str(ext)
     ext = f".{ext}" if not '.' in ext else ext
 
@@ -198,25 +438,88 @@ class Structures():
 
     _items = []
     if mol_id:
+      self.materialise(mol_id)
       _items.append((mol_id, self[mol_id]))
     else:
-      _items =  self.items
-
-    for _mol_id, _mol_obj in _items:
-      if ext in _mol_obj.formats:
+      _items = self.molecules.items()
+
+    _pending = self._pending_conversions(ext, _items, records=callable(library_converter) and not mol_id)
+    if not hasattr(self, 'conversion_failures'):
+      self.conversion_failures = {}
+
+    # makedirs: validate() would create `.<library>.records` as a file (it has a suffix)
+    for _path_dir in {str(_target.parents[0]) for _, _, _target, _ in _pending}:
+      OS.makedirs(_path_dir, exist_ok=True)
+
+    # Records grouped per library, streamed by the library converter
+    _records = {}
+    _files = []
+    for _task in _pending:
+      _record = None if _task[1].exists() else self._library_record(_task[0])
+      if _record is None:
+        _files.append(_task)
+      else:
+        _records.setdefault(id(_record[0]), (_record[0], []))[1].append((_record[1], _task[2]))
+
+    _errors = {}
+    _cache_keys = {}
+    if not cache is None:
+      _converter_id = self._converter_id(_method)
+      for _task in list(_files):
+        _mol_id, _source, _target, _source_hash = _task
+        if _source_hash is None:
+          continue
+
+        _cache_keys[str(_target)] = cache.key(_source_hash, _converter_id, ext, sorted(kwargs.items()))
+        if cache.fetch(_cache_keys[str(_target)], _target):
+          _errors[str(_target)] = None
+          _files.remove(_task)
+
+      self.cache_hits = len(_errors)
+
+    # Converters (obabel -O, prepare_receptor) write the target in place: a new
+    # file keeps hardlinked copies (staged inputs, cache entries) unchanged
+    for _, _, _target, _ in _files:
+      if OS.path.lexists(str(_target)):
+        OS.remove(str(_target))
+
+    for _library, _library_records in _records.values():
+      _errors.update(library_converter(_library, _library_records, workers=workers) or {})
+
+    if callable(bulk_converter) and len(_files) > 1:
+      _errors.update(bulk_converter([(_source, _target) for _, _source, _target, _ in _files], workers=workers) or {})
+    elif len(_files) > 0:
+      def _convert(_task):
+        _, _source, _target, _ = _task
+        try:
+          _method(_source, _target, _source.suffix.strip('.'), ext, **kwargs)
+        except Exception as _e:
+          return (str(_target), str(_e))
+        return (str(_target), None)
+
+      if int(workers or 1) > 1 and len(_files) > 1:
+        with ConcurrentFutures.ThreadPoolExecutor(max_workers=int(workers)) as _pool:
+          _errors.update(_pool.map(_convert, _files))
+      else:
+        _errors.update(map(_convert, _files))
+
+    for _mol_id, _source, _target, _source_hash in _pending:
+      self[_mol_id].formats[ext].mol_path = _target
+      if _target.exists() and _errors.get(str(_target)) is None:
+        self[_mol_id].formats[ext].mol_hash = self.Hashes.hash(_target)
+        with self._conversions_lock:
+          self._load_conversions()[str(_target)] = _source_hash
+        self.conversion_failures.pop(_mol_id, None)
+      else:
+        self.conversion_failures[_mol_id] = _errors.get(str(_target)) or f"{_target.name} was not written."
         continue
 
-      _target_path = _mol_obj.mol_path.with_suffix(ext)
-      self[_mol_id].formats[ext].mol_path = _target_path
-
-      _target_path.parents[0].validate()
-
-      _method(_mol_obj.mol_path, _target_path,
-              _mol_obj.mol_path.suffix.strip('.'), ext, **kwargs)
-
-      if _target_path.exists():
-        self[_mol_id].formats[ext].mol_hash = _target_path.hash
+      if str(_target) in _cache_keys:
+        cache.put(_cache_keys[str(_target)], _target)
 
+    if len(_pending) > 0:
+      self._save_conversions(force=mol_id is None)
+      mol_id is None and self.Hashes.save()
     return True
 
   @property
@@ -224,7 +527,7 @@ class Structures():
     return list(self.molecules.items())
 
   def keys(self):
-    return list(self.molecules.keys())
+    return self.molecules.keys()
 
   @property
   def ids(self):
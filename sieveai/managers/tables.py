@@ -0,0 +1,125 @@
+import os as OS
+import time as Time
+
+class TableRef():
+  """Reference to a table written by `TableStore`, kept in place of the DataFrame.
+
+    _ref = _store.put(cuid, 'Model_1.contacts', _df)
+    _df = _ref.load()                  # read on demand
+    _df = _ref.load(['atom1__resid'])  # only the required columns (parquet)
+
+  Only the location, format and shape are pickled with the progress.
+  """
+
+  __slots__ = ('path', 'format', 'num_rows', 'columns')
+
+  def __init__(self, *args, **kwargs):
+    self.path = str(kwargs.get('path', args[0] if len(args) > 0 else None))
+    self.format = kwargs.get('format', args[1] if len(args) > 1 else None)
+    self.num_rows = kwargs.get('num_rows', args[2] if len(args) > 2 else None)
+    self.columns = kwargs.get('columns', args[3] if len(args) > 3 else None)
+
+  def __getstate__(self):
+    return {_k: getattr(self, _k) for _k in self.__slots__}
+
+  def __setstate__(self, state):
+    for _k, _v in state.items():
+      setattr(self, _k, _v)
+
+  def exists(self) -> bool:
+    return OS.path.exists(self.path)
+
+  def load(self, columns=None):
+    return TableStore.read(self.path, self.format, columns)
+
+  def __len__(self):
+    return self.num_rows or 0
+
+  def __repr__(self):
+    return f"TableRef({self.path}, rows={self.num_rows})"
+
+class TableStore():
+  """Per-plugin directory of columnar tables, one file per complex table.
+
+    _store = TableStore(path_base / 'tables' / 'Vina')
+    _cmplx['Model_1'].contacts = _store.put(cuid, 'Model_1.contacts', _df)
+
+  Parquet (pyarrow) is used when available and memory-mapped on read; tables
+  that Parquet cannot hold (mixed object columns) and installs without
+  pyarrow fall back to NPZ.
+  """
+
+  formats = ('parquet', 'npz')
+  _extensions = {'parquet': '.parquet', 'npz': '.npz'}
+
+  def __init__(self, *args, **kwargs):
+    self.path_tables = str(kwargs.get('path_tables', args[0] if len(args) > 0 else None))
+    self.format = kwargs.get('format', args[1] if len(args) > 1 else None)
+    if self.format in (None, '', 'auto'):
+      self.format = self.default_format()
+    if not self.format in self.formats:
+      raise ValueError(f"Table format {self.format} is not one of {', '.join(self.formats)}.")
+
+    OS.makedirs(self.path_tables, exist_ok=True)
+
+  @staticmethod
+  def default_format() -> str:
+    try:
+      import pyarrow
+      return 'parquet'
+    except ImportError:
+      return 'npz'
+
+  def path(self, cuid, name, fmt=None) -> str:
+    return OS.path.join(self.path_tables, str(cuid), f"{name}{self._extensions[fmt or self.format]}")
+
+  def put(self, cuid, name, table):
+    """Writes the DataFrame and returns its TableRef (None is passed through)."""
+    if table is None:
+      return None
+
+    OS.makedirs(OS.path.join(self.path_tables, str(cuid)), exist_ok=True)
+
+    _format = self.format
+    if _format == 'parquet':
+      try:
+        self._write(self.path(cuid, name, 'parquet'), table, 'parquet')
+      except Exception:
+        # e.g. lists mixed with scalars in an object column
+        _format = 'npz'
+
+    if _format == 'npz':
+      self._write(self.path(cuid, name, 'npz'), table, 'npz')
+
+    return TableRef(self.path(cuid, name, _format), _format, int(table.shape[0]), [str(_c) for _c in table.columns])
+
+  def _write(self, path, table, fmt) -> None:
+    # Written aside and renamed so that readers never see a partial table
+    _tmp = f"{path}.{OS.getpid()}-{Time.time_ns()}.tmp"
+    try:
+      if fmt == 'parquet':
+        table.to_parquet(_tmp, index=False)
+      else:
+        import numpy as NP
+        with open(_tmp, 'wb') as _fh:
+          NP.savez(_fh, **{f"c{_i}": table[_c].to_numpy() for _i, _c in enumerate(table.columns)},
+                   __columns__=NP.array([str(_c) for _c in table.columns]))
+      OS.replace(_tmp, path)
+    finally:
+      if OS.path.exists(_tmp):
+        OS.remove(_tmp)
+
+  @staticmethod
+  def read(path, fmt, columns=None):
+    import pandas as PD
+    if fmt == 'parquet':
+      return PD.read_parquet(path, columns=columns, memory_map=True)
+
+    import numpy as NP
+    with NP.load(path, allow_pickle=True) as _npz:
+      _names = list(_npz['__columns__'])
+      _selected = [_c for _c in _names if columns is None or _c in columns]
+      return PD.DataFrame({_c: _npz[f"c{_names.index(_c)}"] for _c in _selected}, columns=_selected)
+
+  def __repr__(self):
+    return f"TableStore({self.path_tables}, format={self.format})"
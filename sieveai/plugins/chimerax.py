@@ -19,6 +19,12 @@ class ChimeraX(PluginAnalysisBase, PluginConverterBase):
     self.re_contacts = self.RegEx.compile(f"(\d+) contacts")
     self.re_hbonds = self.RegEx.compile(f"(\d+) H-bonds")
 
+    # Result lines of saved `contacts`/`hb` logs: atom specs then overlap/distance or D..A/D-H..A
+    _atom = self._re_atom_spec
+    self.re_contact_lines = self.RegEx.compile(rf"^[^#\n]*{_atom}[^#\n]*?{_atom}[ \t]+(\S+)[ \t]+(\S+)[ \t]*$", self.RegEx.M)
+    self.re_hbond_lines = self.RegEx.compile(rf"^[^#\n]*{_atom}[^#\n]*?{_atom}[^#\n]*?{_atom}[ \t]+(\S+)[ \t]+(\S+)[ \t]*$", self.RegEx.M)
+    self.re_no_model_lines = self.RegEx.compile(r"^[^#\n]*/[^#\n]*$", self.RegEx.M)
+
     self._set_default_vars()
 
   def _set_default_vars(self):
@@ -54,10 +60,18 @@ class ChimeraX(PluginAnalysisBase, PluginConverterBase):
 
     return _r
 
-  def exe_cxc_file(self, file_path=None):
+  def exe_cxc_file(self, file_path=None, sessions=None):
+    """Runs a .cxc script in a new ChimeraX process, or in a session of `sessions` (SessionPool)."""
     if file_path is None:
       return
 
+    if not sessions is None:
+      try:
+        return sessions.run_script(file_path)
+      except Exception as _e:
+        self.log_error(f'CHIMERAX_04: {file_path} failed in the ChimeraX session: {_e}')
+        return None
+
     _res = self.cmd_run(*["chimerax",
       "--cmd", f"open {file_path}",
       "--silent",
@@ -197,37 +211,130 @@ class ChimeraX(PluginAnalysisBase, PluginConverterBase):
     else:
       raise Exception(f"Problem in atom records {atom_details}")
 
-  def parse_contacts(self, file_path):
-    _contacts = self.DF(self._parse_contacts_file(file_path))
+  # `#2.1/A ALA 45 CA`: model, sub-model, chain, resname, resid, atom
+  _re_atom_spec = r"#(\d+)(?:\.(\d+))?\S*?/(\S*)[ \t]+(\S+)[ \t]+(\S+)[ \t]+(\S+)"
 
-    if not _contacts.shape[0]:
-        return None
+  def _read_results_block(self, file_path, re_count) -> str:
+    """Text after the `N contacts`/`N H-bonds` line of a saved result ('' if there are none)."""
+    file_path = EntityPath(file_path)
+    if not file_path.exists():
+      return ''
 
-    for _atomN in ['atom1', 'atom2']:
-      _atomN_cols = [f"{_atomN}__{_c}" for _c in self._atom_identity_keys]
+    _text = file_path.read_text(errors='replace')
+    _count = re_count.search(_text)
+    if _count is None or not int(_count.group(1)) > 0:
+      return ''
+
+    # Atoms without model (single model session) are of model #1
+    return self.re_no_model_lines.sub(lambda _m: _m.group(0).replace('/', '#1/'), _text[_count.end():])
 
-      _contacts[_atomN_cols] = _contacts.apply(lambda _x: self._parse_atom_identity(_x[_atomN]), result_type='expand', axis='columns')
+  def _results_table(self, rows, atoms, values):
+    """DataFrame of regex rows (6 atom identity groups per atom, then values) in the parse_* column order."""
+    _spec_keys = [_k for _k in self._atom_identity_keys if not _k == 'atom_type']
+    _cols = [f"{_atomN}__{_k}" for _atomN in atoms for _k in _spec_keys] + values
+    _table = self.PD.DataFrame(rows, columns=_cols, dtype=object)
 
-      if _atomN in _contacts.columns:
-        _contacts.drop([_atomN], axis=1, inplace=True)
+    for _atomN in atoms:
+      _table.loc[_table[f"{_atomN}__sub_model_id"] == '', f"{_atomN}__sub_model_id"] = None
+      _table[f"{_atomN}__atom_type"] = None
 
-    return _contacts
+    return _table[values + [f"{_atomN}__{_k}" for _atomN in atoms for _k in self._atom_identity_keys]]
+
+  def parse_contacts(self, file_path):
+    """Table of a saved `contacts` log: overlap, distance, atom1__* (model_id, chain, resname, resid...) and atom2__*."""
+    _rows = self.re_contact_lines.findall(self._read_results_block(file_path, self.re_contacts))
+    if len(_rows) == 0:
+      return None
+
+    return self._results_table(_rows, ['atom1', 'atom2'], ['overlap', 'distance'])
 
   def parse_hbonds(self, file_path):
-    _hbonds = self.DF(self._parse_hbonds_file(file_path))
+    """Table of a saved `hb` log: distance_DA, distance_DHA, donor__*, acceptor__* and hydrogen__*.
 
-    if not _hbonds.shape[0]:
+    H-bonds without a hydrogen (`no hydrogen`) are not included.
+    """
+    _rows = self.re_hbond_lines.findall(self._read_results_block(file_path, self.re_hbonds))
+    if len(_rows) == 0:
       return None
 
-    for _atomN in ['donor', 'acceptor', 'hydrogen']:
+    return self._results_table(_rows, ['donor', 'acceptor', 'hydrogen'], ['distance_DA', 'distance_DHA'])
+
+  def _parse_rowwise(self, file_path, kind='contacts'):
+    """Line by line parser (`_parse_*_file`, `_parse_atom_identity` per row), the reference of benchmark_parsers."""
+    if kind == 'contacts':
+      _table, _atoms = self.DF(self._parse_contacts_file(file_path)), ['atom1', 'atom2']
+    else:
+      _table, _atoms = self.DF(self._parse_hbonds_file(file_path)), ['donor', 'acceptor', 'hydrogen']
+
+    if not _table.shape[0]:
+      return None
+
+    for _atomN in _atoms:
       _atomN_cols = [f"{_atomN}__{_c}" for _c in self._atom_identity_keys]
+      _table[_atomN_cols] = _table.apply(lambda _x: self._parse_atom_identity(_x[_atomN]), result_type='expand', axis='columns')
+      _table.drop([_atomN], axis=1, inplace=True)
+
+    return _table
+
+  def _write_synthetic_results(self, file_path, kind='contacts', num_lines=50000, seed=0):
+    """Writes a `contacts`/`hb` log of `num_lines` receptor-ligand (#1, #2.N) records."""
+    self.require('random', 'Random')
+    _rand = self.Random.Random(seed)
+    _resnames = ('ALA', 'ARG', 'ASN', 'ASP', 'GLU', 'GLN', 'HIS', 'LEU', 'LYS', 'SER', 'THR', 'TYR')
+    _rec = lambda: f"REC.pdbqt #1/{_rand.choice('AB')} {_rand.choice(_resnames)} {_rand.randint(1, 999)} {_rand.choice(('CA', 'CB', 'N', 'O', 'OG1', 'NZ'))}"
+    _lig = lambda: f"out.pdbqt #2.{_rand.randint(1, 9)}/? UNL 1 {_rand.choice(('C', 'N', 'O'))}{_rand.randint(1, 40)}"
+
+    if kind == 'contacts':
+      _lines = ["Allowed overlap: -0.4", "H-bond overlap reduction: 0.4", "Ignore contacts between atoms separated by 4 bonds or less",
+                "Detect intra-residue contacts: False", "Detect intra-molecule contacts: False", "",
+                f"{num_lines} contacts", "atom1  atom2  overlap  distance"]
+      _lines.extend(f"{_rec()}    {_lig()}    {_rand.uniform(-0.4, 0.6):.3f}    {_rand.uniform(2.8, 4.2):.3f}" for _ in range(num_lines))
+    else:
+      _lines = ["Finding intermodel H-bonds", "Constraints relaxed by 0.4 angstroms and 20 degrees", "Models used:",
+                "\t1 REC.pdbqt", "\t2.1 out.pdbqt", "", f"{num_lines} H-bonds",
+                "H-bond donor -> acceptor  D--A dist  D-H..A dist"]
+      _lines.extend(f"{_rec()}    {_lig()}    {_rec()}    {_rand.uniform(2.5, 3.5):.3f}    {_rand.uniform(1.5, 2.5):.3f}" for _ in range(num_lines))
+
+    EntityPath(file_path).write_text("\n".join(_lines) + "\n")
+    return file_path
 
-      _hbonds[_atomN_cols] = _hbonds.apply(lambda _x: self._parse_atom_identity(_x[_atomN]), result_type='expand', axis='columns')
+  def benchmark_parsers(self, *args, **kwargs) -> dict:
+    """Times parse_contacts/parse_hbonds against the line by line parsers on synthetic logs.
 
-      if _atomN in _hbonds.columns:
-        _hbonds.drop([_atomN], axis=1, inplace=True)
+      ChimeraX().benchmark_parsers(num_lines=50000)
+      # {'contacts': {'lines': 50000, 'rowwise': 9.1, 'vectorized': 0.2, 'speedup': 45.5, 'same': True}, 'hbonds': {...}}
+    """
+    _num_lines = int(kwargs.get('num_lines', args[0] if len(args) > 0 else 50000))
+    _repeats = int(kwargs.get('repeats', args[1] if len(args) > 1 else 1))
+    self.require('time', 'Time')
+    self.require('tempfile', 'TempFile')
+
+    _results = {}
+    with self.TempFile.TemporaryDirectory() as _dir:
+      for _kind, _parse in (('contacts', self.parse_contacts), ('hbonds', self.parse_hbonds)):
+        _path = self._write_synthetic_results(EntityPath(_dir) / f"{_kind}.txt", _kind, _num_lines)
+
+        _times = {}
+        for _method, _fn in (('rowwise', lambda: self._parse_rowwise(_path, _kind)), ('vectorized', lambda: _parse(_path))):
+          _best = None
+          for _ in range(_repeats):
+            _start = self.Time.perf_counter()
+            _table = _fn()
+            _elapsed = self.Time.perf_counter() - _start
+            _best = _elapsed if _best is None else min(_best, _elapsed)
+          _times[_method] = (_best, _table)
+
+        _rowwise, _vectorized = _times['rowwise'][1], _times['vectorized'][1]
+        _results[_kind] = {
+          'lines': _num_lines,
+          'rowwise': round(_times['rowwise'][0], 4),
+          'vectorized': round(_times['vectorized'][0], 4),
+          'speedup': round(_times['rowwise'][0] / max(_times['vectorized'][0], 1e-9), 1),
+          'same': _rowwise.astype(object).where(_rowwise.notna(), None).values.tolist() == _vectorized.values.tolist() and list(_rowwise.columns) == list(_vectorized.columns),
+        }
+        self.log_info(f"CHIMERAX_05: Parsed {_num_lines} {_kind} in {_results[_kind]['vectorized']}s (line by line {_results[_kind]['rowwise']}s).")
 
-    return _hbonds
+    return _results
 
 
 
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from ..sieveaibase import StepManager, DictConfig
-from ..managers import Structures
+from ..managers import Structures, ReceptorGeometry
 from ..process.docking import PluginDockingBase
 
 class HDockLite(PluginDockingBase):
@@ -20,11 +20,20 @@ class HDockLite(PluginDockingBase):
   _hdock_exe_name = 'hdock'
   _hdock_exe_name_pl = 'hdockpl'
 
+  _cost_weights = {
+    'receptor_atoms': 1.0,
+    'ligand_atoms': 1.0,
+  }
+  _cost_steps = ('run_hdock_main', )
+  # VMDPython.get_interaction_matrix: contacts(cutoff=3.5), hbonds(cutoff=3, maxangle=100)
+  _interaction_options = {'contact_distance': 3.5, 'hbond_distance': 3.0, 'hbond_angle': 80}
+
   def __init__(self, *args, **kwargs):
     super().__init__(**kwargs)
 
     self.Receptors = None
     self.Ligands = None
+    self._ligand_atoms = {}
 
     self.path_plugin_docking = self.SETTINGS.plugin_data[self.plugin_uid].path_plugin_docking = (self.path_sieveai_docking / self.plugin_uid).validate().rel_path()
 
@@ -49,6 +58,7 @@ class HDockLite(PluginDockingBase):
     self.setup(*args, **kwargs)
     self.Receptors = Structures(self.SETTINGS.user.path_receptors, '*.pdb', 'macromolecule')
     self.Ligands = Structures(self.SETTINGS.user.path_ligands, '*.pdb', 'macromolecule')
+    self.Geometry = ReceptorGeometry(self.path_sieveai_master_config / 'cache' / 'geometry')
 
   def _run_hdock_main(self, cuid) -> None:
     """Runs hdock and hdockpl to perform docking and later extact the complexes.
@@ -57,10 +67,18 @@ class HDockLite(PluginDockingBase):
     if (_cmplx.path_docking / f"{cuid}.out").exists():
       self.log_debug(f'HDOCKLITE_05: {cuid} already docked.')
     else:
-      _log = self.cmd_run(self._hdock_exe_name, _cmplx.path_receptor.name, _cmplx.path_ligand.name, cwd=_cmplx.path_docking, **{
+      self.TASKS.start_step('run_hdock_main', cuid, self.plugin_uid)
+      _log = self.cmd_run(self._hdock_exe_name, _cmplx.path_receptor.name, _cmplx.path_ligand.name, **{
         '-out': f"{cuid}.out",
+        'cmd_params': {
+          'cwd': _cmplx.path_docking,
+          'capture_output': True,
+          'text': True,
+          'env': self.job_env(), # OMP_NUM_THREADS for FFT threads
+        },
       })
       _cmplx.path_log.write(str(_log))
+      self.TASKS.end_step('run_hdock_main', cuid, self.plugin_uid)
 
   def _run_hdock_pl(self, cuid):
     """Runs hdock and hdockpl to perform docking and later extact the complexes.
@@ -79,51 +97,113 @@ class HDockLite(PluginDockingBase):
     return int(_number)
 
   def _run_analysis(self, cuid):
-    _VPY = self.SETTINGS.PLUGIN_REFS.vmdpython()
-
     *_models, = list(self.Complexes[cuid].path_docking.search('model*'))
     _models.sort(key=self._fn_sort_model)
 
-    _model_results = []
-    for _model in _models:
-      _vmd_id = _VPY.parse_molecule(str(_model))
-      _rec_obj = _VPY.get_atom_sel('chain A', _vmd_id)
-      _lig_obj = _VPY.get_atom_sel('chain B', _vmd_id)
+    # All models in one pass, HDock keeps the receptor fixed
+    _native = self.Interactions.interaction_matrix(_models) if self.native_interactions else None
+    _VPY = self.SETTINGS.PLUGIN_REFS.vmdpython() if _native is None else None
 
+    _model_results = []
+    for _idx, _model in enumerate(_models):
       _lines = list(_model.readlines(num_lines=5))
       _remarks = dict([_r[0] for _r in map(self.re_remarks.findall, _lines)])
       _remarks['Complex_uid'] = cuid
-      _interactions = _VPY.get_interactions(_rec_obj, _lig_obj)
-      _remarks.update(_interactions)
+
+      if _native is None:
+        _vmd_id = _VPY.parse_molecule(str(_model))
+        _rec_obj = _VPY.get_atom_sel('chain A', _vmd_id)
+        _lig_obj = _VPY.get_atom_sel('chain B', _vmd_id)
+        _interactions = _VPY.get_interactions(_rec_obj, _lig_obj)
+      else:
+        _interactions = _native[_idx]
+
+      _remarks.update(_interactions or {})
       _model_results.append(_remarks)
 
     self.log_debug(f'{cuid}:: Conformer Results Generated')
 
     _df_conformer_scores = self.DF(_model_results)
     _df_conformer_scores['plugin'] = self.plugin_uid
-    self.Complexes[cuid].conformer_scores = _df_conformer_scores
+    self.Complexes[cuid].conformer_scores = self._store_table(cuid, 'conformer_scores', _df_conformer_scores)
+
+  def _get_cost_features(self, cuid) -> dict:
+    _cmplx = self.Complexes[cuid]
+    # Receptors are few: memoized by their registry hash; ligands are only counted, once
+    _rec = self.Receptors[_cmplx.rec_uid]
+    if not _cmplx.lig_uid in self._ligand_atoms:
+      self._ligand_atoms[_cmplx.lig_uid] = self.Geometry.count_atoms(self.Ligands[_cmplx.lig_uid].mol_path)
+
+    return {
+      'receptor_atoms': self.Geometry.get_atom_count(_rec.mol_path, _rec.formats[_rec.mol_path.suffix].get('mol_hash')),
+      'ligand_atoms': self._ligand_atoms[_cmplx.lig_uid],
+    }
 
   def _run_preprocess_check(self, cuid):
     return cuid
 
   def _finalise_complex(self, cuid):
+    self._publish_complex(cuid)
     return cuid
 
-  def _process_complex(self, cuid):
+  def _process_complex(self, cuid, last_step=None):
     if cuid in self.Complexes:
       for _step in self.Complexes[cuid].step:
-        if _step in self.Complexes[cuid].steps_completed:
-          continue
+        if not _step in self.Complexes[cuid].steps_completed:
+          _step = self.Complexes[cuid].step._current
+
+          if self.Complexes[cuid].step.is_last:
+            self.log_debug(f"{cuid}:: Last Step: {_step}")
+          else:
+            self.log_debug(f"{cuid}:: Step: {_step}")
+
+          self._steps_map_methods[_step](cuid)
+          self.Complexes[cuid].steps_completed.append(_step)
+          self._checkpoint_complex(cuid)
+
+        if _step == last_step:
+          break
+
+    return cuid
+
+  def _init_complex(self, rec_uid, lig_uid):
+    _rec = self.Receptors[rec_uid]
+    _lig = self.Ligands[lig_uid]
+
+    _complex_uid = self.slug(f"{_rec.mol_id}--{_lig.mol_id}")
+
+    if not _complex_uid in self.Complexes:
+      _complex_path = (self.path_plugin_docking / _complex_uid).validate()
 
-        _step = self.Complexes[cuid].step._current
+      # Stage inputs (linked or copied by staging_mode)
+      _c_rec = _complex_path / f'REC{_rec.mol_path.suffix}'
+      _c_lig = _complex_path / f'LIG{_lig.mol_path.suffix}'
 
-        if self.Complexes[cuid].step.is_last:
-          self.log_debug(f"{cuid}:: Last Step: {_step}")
-        else:
-          self.log_debug(f"{cuid}:: Step: {_step}")
+      self._stage_file(_rec.mol_path, _c_rec)
+      self._stage_file(_lig.mol_path, _c_lig)
 
-        self._steps_map_methods[_step](cuid)
-        self.Complexes[cuid].steps_completed.append(_step)
+      _record = DictConfig()
+      _record.update({
+          "step": StepManager(self._step_sequence),
+          "steps_completed": [],
+          "uid": _complex_uid,
+          "rec_uid": _rec.mol_id,
+          "lig_uid": _lig.mol_id,
+          "path_receptor": _c_rec,
+          "path_ligand": _c_lig,
+          "path_docking": _complex_path,
+          "path_log": _complex_path / f'{_complex_uid}.log',
+        })
+      self.Complexes[_complex_uid] = _record
+
+      self.log_debug(f'{_complex_uid}:: Queued.')
+
+    return _complex_uid
+
+  def _prepare_stream_molecule(self, mol_group, mol_id) -> bool:
+    # hdock works on PDB structures
+    _structures = self.Receptors if mol_group == 'receptors' else self.Ligands
+    return _structures[mol_id].mol_path.suffix == '.pdb'
 
   def _queue_complexes(self):
     # Pre-process or cleaning of molecules
@@ -139,55 +219,40 @@ class HDockLite(PluginDockingBase):
       return
 
     # Perform Docking
-    self.SETTINGS.user.multiprocessing and self.init_multiprocessing()
-
     _combs = list(self.product(self.Receptors.keys(), self.Ligands.keys()))
+    self.SETTINGS.user.multiprocessing and self.init_multiprocessing(num_jobs=len(_combs))
 
-    for _rck, _ligk in _combs:
-      _rec = self.Receptors[_rck]
-      _lig = self.Ligands[_ligk]
-
-      _complex_uid = self.slug(f"{_rec.mol_id}--{_lig.mol_id}")
-
-      if not _complex_uid in self.Complexes:
-        self.Complexes[_complex_uid] = DictConfig()
-
-        _complex_path = (self.path_plugin_docking / _complex_uid).validate()
-
-        # Copy _path
-        _c_rec = _complex_path / f'REC{_rec.mol_path.suffix}'
-        _c_lig = _complex_path / f'LIG{_lig.mol_path.suffix}'
+    _queue = []
 
-        _rec.mol_path.copy(_c_rec)
-        _lig.mol_path.copy(_c_lig)
-
-        self.Complexes[_complex_uid].update({
-            "step": StepManager(self._step_sequence),
-            "steps_completed": [],
-            "uid": _complex_uid,
-            "rec_uid": _rec.mol_id,
-            "lig_uid": _lig.mol_id,
-            "path_receptor": _c_rec,
-            "path_ligand": _c_lig,
-            "path_docking": _complex_path,
-            "path_log": _complex_path / f'{_complex_uid}.log',
-          })
-
-        self.log_debug(f'{_complex_uid}:: Queued.')
+    for _rck, _ligk in _combs:
+      _queue.append(self._init_complex(_rck, _ligk))
 
+    # Longest jobs first so that large complexes do not straggle
+    _costs = self._estimate_costs(_queue)
+    for _complex_uid in self._order_by_cost(_queue, _costs):
       if self.SETTINGS.user.multiprocessing:
         self.queue_task(self._process_complex, _complex_uid)
       else:
         self._process_complex(_complex_uid)
 
   def _manage_queue(self, *args, **kwargs):
+    if self.SETTINGS.user.sync_streaming:
+      self._stream_complexes()
+      self._update_progress()
+      self._finalise_results()
+      return
+
     self._queue_complexes()
     self._update_progress()
     if self.SETTINGS.user.multiprocessing:
       self.process_queue()
-      self.queue_final_callback(self._tabulate_results)
+      self.queue_final_callback(self._finalise_results)
     else:
-      self._tabulate_results()
+      self._finalise_results()
+
+  def _finalise_results(self, *args, **kwargs):
+    self._refit_cost_model()
+    self._tabulate_results()
 
   def _rank_conformers(self, _all_res):
     _ranking_columns = {
@@ -258,15 +323,15 @@ class HDockLite(PluginDockingBase):
     self.require('pandas', 'PD')
 
     # Combine all the interactions
-    _score_table = None
-    for _idx, _cmplx in self.Complexes.items():
-      if not isinstance(_cmplx, (dict)) or not 'conformer_scores' in _cmplx:
+    _score_tables = []
+    for _idx in self._complex_uids(completed='analyse'):
+      _cmplx = self.Complexes[_idx]
+      if not 'conformer_scores' in _cmplx:
         continue
 
-      if _score_table is None:
-        _score_table = _cmplx.conformer_scores
-      else:
-        _score_table = self.PD.concat([_score_table, _cmplx.conformer_scores])
+      _score_tables.append(self._load_table(_cmplx.conformer_scores))
+
+    _score_table = self.PD.concat(_score_tables) if len(_score_tables) > 0 else None
 
     _score_table['HBond_total'] = (_score_table.HBond_1_don.apply(lambda _x: len(set(_x))) + _score_table.HBond_2_don.apply(lambda _x: len(set(_x))))
     _score_table['Contact_Total'] = (_score_table.Contact_1.apply(lambda _x: len(set(_x))) + _score_table.Contact_2.apply(lambda _x: len(set(_x))))
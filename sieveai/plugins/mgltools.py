@@ -1,3 +1,6 @@
+import os as OS
+import time as Time
+
 from ..process.converter import PluginConverterBase
 
 class MGLTools(PluginConverterBase):
@@ -8,6 +11,13 @@ class MGLTools(PluginConverterBase):
   assignments = ['conversion']
   current_assignment = None
   url = "https://github.com/forlilab/Meeko"
+  _converter_tools = {
+    'prepare_receptor': ('executable', 'prepare_receptor'), # ADFR suite, no version flag
+    'mk_prepare_receptor': ('module', 'meeko', 'rdkit'),
+    'convert_pqbqt': ('module', 'meeko', 'rdkit'),
+    'prepare_ligands': ('module', 'meeko', 'rdkit'),
+    'prepare_library': ('module', 'meeko', 'rdkit'),
+  }
 
   def __init__(self, *args, **kwargs):
     super().__init__(**kwargs)
@@ -45,26 +55,170 @@ class MGLTools(PluginConverterBase):
       })
 
   def convert_pqbqt(self, *args, **kwargs):
-    _source = kwargs.get('path_source', args[0] if len(args) > 0 else None)
+    """Prepares one ligand PDBQT in-process with Meeko (first molecule of the source)."""
+    _path_source = kwargs.get('path_source', args[0] if len(args) > 0 else None)
     _path_target = kwargs.get('path_target', args[1] if len(args) > 1 else None)
-
-    _format_to = kwargs.get('format_to', args[2] if len(args) > 2 else None)
-    _format_from = kwargs.get('format_from', args[3] if len(args) > 3 else None)
     _addH = kwargs.get('addH', args[4] if len(args) > 4 else True)
-    _removeH = kwargs.get('removeH', args[4] if len(args) > 4 else True)
+
+    _error = _meeko_prepare([(str(_path_source), 'path', str(_path_target))], {'addH': _addH}, fresh=True).get(str(_path_target))
+    if not _error is None:
+      self.log_error(f'Error in MGLTools: {_error}')
+      raise RuntimeError(_error)
+
+    return _path_target
+
+  def _run_meeko_pool(self, tasks, workers=1, chunk_size=32, options=None) -> dict:
+    """Sends chunks of `tasks` [(source, kind, path_target)...] to worker processes.
+
+    Tasks are consumed lazily with at most two chunks per worker in flight so
+    that a library is streamed rather than read in full.
+    """
+    self.require('itertools', 'IterTools')
+    self.require('multiprocessing', 'MultiProcessing')
+    self.require('concurrent.futures', 'ConcurrentFutures')
+
+    _tasks = iter(tasks)
+    _options = {'addH': True, **(options or {})}
+    _errors = {}
+
+    if int(workers or 1) <= 1:
+      for _chunk in iter(lambda: list(self.IterTools.islice(_tasks, chunk_size)), []):
+        _errors.update(_meeko_prepare(_chunk, _options))
+      return _errors
+
+    # spawn: the parent runs threads (pool, result channel) that fork would copy mid-state
+    _context = self.MultiProcessing.get_context('spawn')
+    with self.ConcurrentFutures.ProcessPoolExecutor(max_workers=int(workers), mp_context=_context,
+                                                    initializer=_init_meeko_worker, initargs=(_options,)) as _pool:
+      _pending = set()
+      for _chunk in iter(lambda: list(self.IterTools.islice(_tasks, chunk_size)), []):
+        _pending.add(_pool.submit(_meeko_prepare, _chunk))
+        if len(_pending) >= 2 * int(workers):
+          _done, _pending = self.ConcurrentFutures.wait(_pending, return_when=self.ConcurrentFutures.FIRST_COMPLETED)
+          for _future in _done:
+            _errors.update(_future.result())
+
+      for _future in self.ConcurrentFutures.as_completed(_pending):
+        _errors.update(_future.result())
+
+    return _errors
+
+  def prepare_ligands(self, *args, **kwargs):
+    """Prepares ligand PDBQTs with Meeko in a pool of worker processes.
+
+    :param pairs|0: [(path_source, path_target)...]
+    :param workers|1: Worker processes, each keeps one MoleculePreparation
+    :param chunk_size|2: Molecules sent to a worker at once
+
+    :return: {target: None|error} per molecule
+    """
+    _pairs = kwargs.get('pairs', args[0] if len(args) > 0 else [])
+    _workers = int(kwargs.get('workers', args[1] if len(args) > 1 else 1) or 1)
+    _chunk_size = int(kwargs.get('chunk_size', args[2] if len(args) > 2 else 32))
+
+    _workers = max(1, min(_workers, -(-len(_pairs) // _chunk_size)))
+    _errors = self._run_meeko_pool(((str(_source), 'path', str(_target)) for _source, _target in _pairs), _workers, _chunk_size)
+
+    _failed = sum(1 for _e in _errors.values() if not _e is None)
+    self.log_debug(f'MEEKO_01: Prepared {len(_errors) - _failed}/{len(_errors)} ligands with {_workers} worker(s).')
+    return _errors
+
+  def prepare_library(self, *args, **kwargs):
+    """Streams records of a LigandLibrary (.sdf/.smi) to Meeko workers, one PDBQT per record.
+
+    :param library|0: LigandLibrary
+    :param records|1: [(record number, path_target)...], records are read in file order
+    :param workers|2: Worker processes
+    :param chunk_size|3: Records sent to a worker at once
+
+    :return: {target: None|error} per record
+    """
+    _library = kwargs.get('library', args[0] if len(args) > 0 else None)
+    _records = kwargs.get('records', args[1] if len(args) > 1 else [])
+    _workers = int(kwargs.get('workers', args[2] if len(args) > 2 else 1) or 1)
+    _chunk_size = int(kwargs.get('chunk_size', args[3] if len(args) > 3 else 32))
+
+    _records = sorted(_records, key=lambda _r: _r[0])
+    _workers = max(1, min(_workers, -(-len(_records) // _chunk_size)))
+    _tasks = ((_library.get_block(_num), _library.format, str(_target)) for _num, _target in _records)
     try:
-      from meeko import MoleculePreparation, PDBQTWriterLegacy
-      from rdkit import Chem
-
-      _molecules = Chem.SDMolSupplier(_path_source, removeHs=_removeH) if 'sdf' in _format_from else [Chem.MolFromPDBFile(_path_source)]
-
-      # there is one molecule in this SD file, this loop iterates just once
-      for _mol in _molecules:
-        _preparator = MoleculePreparation()
-        _mol_setups = _preparator.prepare(_mol)
-        for _setup in _mol_setups:
-          # _setup.show() # optional
-          _pdbqt_string, _, _ = PDBQTWriterLegacy.write_string(_setup)
-          self.write(_path_target, _pdbqt_string)
+      _errors = self._run_meeko_pool(_tasks, _workers, _chunk_size)
+    finally:
+      _library.close()
+
+    _failed = sum(1 for _e in _errors.values() if not _e is None)
+    self.log_debug(f'MEEKO_02: Prepared {len(_errors) - _failed}/{len(_errors)} records of {_library.name} with {_workers} worker(s).')
+    return _errors
+
+# Worker side of the Meeko pool, module level so that spawned processes can import it
+_MEEKO_PREPARATOR = None
+_MEEKO_OPTIONS = {}
+
+def _init_meeko_worker(options=None):
+  global _MEEKO_PREPARATOR, _MEEKO_OPTIONS
+  from meeko import MoleculePreparation
+  _MEEKO_OPTIONS = dict(options or {})
+  _MEEKO_PREPARATOR = MoleculePreparation()
+
+def _meeko_read(source, kind):
+  from rdkit import Chem
+  if kind == 'sdf':
+    return Chem.MolFromMolBlock(source, removeHs=False)
+  if kind == 'smi':
+    return Chem.MolFromSmiles(source.split()[0])
+
+  _ext = OS.path.splitext(source)[1].lower()
+  if _ext == '.sdf':
+    with open(source, 'rb') as _fh:
+      return next(iter(Chem.ForwardSDMolSupplier(_fh, removeHs=False)), None)
+  if _ext == '.mol2':
+    return Chem.MolFromMol2File(source, removeHs=False)
+  if _ext == '.mol':
+    return Chem.MolFromMolFile(source, removeHs=False)
+  return Chem.MolFromPDBFile(source, removeHs=False)
+
+def _meeko_prepare(tasks, options=None, fresh=False) -> dict:
+  """[(source, kind, path_target)...] -> {path_target: None|error}
+
+  `kind` is 'path' for molecule files, 'sdf'/'smi' for library record text.
+  The worker's MoleculePreparation is reused; `fresh=True` uses a new one
+  (in-process calls from threads).
+  """
+  from rdkit import Chem
+  from rdkit.Chem import AllChem
+  from meeko import PDBQTWriterLegacy
+
+  if fresh or _MEEKO_PREPARATOR is None:
+    from meeko import MoleculePreparation
+    _preparator = MoleculePreparation()
+  else:
+    _preparator = _MEEKO_PREPARATOR
+
+  _options = {**_MEEKO_OPTIONS, **(options or {})}
+  _errors = {}
+  for _source, _kind, _path_target in tasks:
+    try:
+      _mol = _meeko_read(_source, _kind)
+      if _mol is None:
+        raise ValueError('RDKit could not read the molecule.')
+
+      if _options.get('addH', True) or _mol.GetNumConformers() == 0:
+        _mol = Chem.AddHs(_mol, addCoords=_mol.GetNumConformers() > 0)
+      if _mol.GetNumConformers() == 0 and AllChem.EmbedMolecule(_mol, randomSeed=0xf00d) != 0:
+        raise ValueError('3D coordinates could not be embedded.')
+
+      # One PDBQT per molecule: the first setup (extra setups are alternative states)
+      _setup = _preparator.prepare(_mol)[0]
+      _pdbqt_string, _is_ok, _error = PDBQTWriterLegacy.write_string(_setup)
+      if not _is_ok:
+        raise ValueError(_error.strip())
+
+      _tmp = f"{_path_target}.{OS.getpid()}-{Time.time_ns()}.tmp"
+      with open(_tmp, 'w') as _fh:
+        _fh.write(_pdbqt_string)
+      OS.replace(_tmp, _path_target)
+      _errors[_path_target] = None
     except Exception as _e:
-      self.log_error(f'Error in MGLTools: {_e}')
+      _errors[_path_target] = str(_e) or _e.__class__.__name__
+
+  return _errors
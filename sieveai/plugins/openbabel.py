@@ -8,6 +8,10 @@ class OpenBabel(PluginConverterBase):
   assignments = ['conversion']
   current_assignment = None
   url = "https://github.com/openbabel/openbabel"
+  _converter_tools = {
+    'convert': ('command', 'obabel', '-V'),
+    'bulk_convert': ('command', 'obabel', '-V'),
+  }
 
   def __init__(self, *args, **kwargs):
     super().__init__(**kwargs)
@@ -62,9 +66,69 @@ class OpenBabel(PluginConverterBase):
 
     _obc.WriteFile(_mol, str(_path_target))
 
+  def _convert_chunk(self, chunk) -> dict:
+    _ext = chunk[0][1].suffix
+    _path_tmp = chunk[0][1].parent / f".obabel-{self.OS.getpid()}-{self.Time.time_ns()}"
+    _path_tmp.validate()
+
+    try:
+      # -m writes one numbered output per input molecule in input order
+      self.cmd_run("obabel",
+                   *[str(_source) for _source, _ in chunk],
+                   "-O", str(_path_tmp / f"out{_ext}"),
+                   "-m", "-h", "--quiet")
+
+      _outputs = [_path_tmp / f"out{_num}{_ext}" for _num in range(1, len(chunk) + 1)]
+      _extra = _path_tmp / f"out{len(chunk) + 1}{_ext}"
+      if all(_o.exists() for _o in _outputs) and not _extra.exists():
+        for _output, (_, _target) in zip(_outputs, chunk):
+          self.OS.replace(_output, _target)
+        return {str(_target): None for _, _target in chunk}
+    finally:
+      self.SHUTIL.rmtree(_path_tmp, ignore_errors=True)
+
+    # A molecule failed or had several records: convert one by one to find it
+    _errors = {}
+    for _source, _target in chunk:
+      self.convert(_source, _target)
+      _errors[str(_target)] = None if _target.exists() else f"obabel could not convert {_source.name}."
+
+    return _errors
+
   def bulk_convert(self, *args, **kwargs):
-    # Use multiprocess
-    pass
+    """Converts many molecules with one obabel call per chunk.
+
+    :param pairs|0: [(path_source, path_target)...]
+    :param workers|1: Chunks converted at once
+    :param chunk_size|2: Molecules per obabel call
+
+    :return: {target: None|error} per molecule
+    """
+    _pairs = kwargs.get('pairs', args[0] if len(args) > 0 else [])
+    _workers = int(kwargs.get('workers', args[1] if len(args) > 1 else 1) or 1)
+    _chunk_size = int(kwargs.get('chunk_size', args[2] if len(args) > 2 else 64))
+
+    self.require('shutil', 'SHUTIL')
+    self.require('time', 'Time')
+    self.require('concurrent.futures', 'ConcurrentFutures')
+
+    # Outputs of a chunk share the extension
+    _groups = {}
+    for _source, _target in _pairs:
+      _groups.setdefault(_target.suffix, []).append((_source, _target))
+
+    # Smaller chunks when there are fewer molecules than workers x chunk_size
+    _chunk_size = max(1, min(_chunk_size, -(-len(_pairs) // _workers)))
+    _chunks = [_group[_i:_i + _chunk_size] for _group in _groups.values() for _i in range(0, len(_group), _chunk_size)]
+
+    _errors = {}
+    with self.ConcurrentFutures.ThreadPoolExecutor(max_workers=_workers) as _pool:
+      for _chunk_errors in _pool.map(self._convert_chunk, _chunks):
+        _errors.update(_chunk_errors)
+
+    _failed = sum(1 for _e in _errors.values() if not _e is None)
+    self.log_debug(f'OBABEL_01: Converted {len(_errors) - _failed}/{len(_errors)} molecules in {len(_chunks)} call(s).')
+    return _errors
 
   def convert(self, *args, **kwargs):
     _path_source = kwargs.get('path_source', args[0] if len(args) > 0 else None)
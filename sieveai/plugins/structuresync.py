@@ -20,18 +20,23 @@ class StructureSync(PluginConverterBase):
         'uniprot': self.fetch_uniprot,
       }
 
+  def _fetched(self, path, on_fetch=None) -> None:
+    if callable(on_fetch) and path.exists():
+      on_fetch(path)
+
   def fetch_pubchem(self, *args, **kwargs):
     self._re_pubchem_cid = self.re_compile(r'^[0-9]$')
 
     _cids = map(lambda _x: self.digit_only(_x), self.iterate(args))
 
     _storage_path = kwargs.get('storage', (self.path_base / 'unknown_molecules').validate())
+    _on_fetch = kwargs.get('on_fetch')
 
     _dim_3d = '3d'
     _dim_2d = '2d'
     for _cid in _cids:
       _sdf_path = _storage_path / f"{_cid}.sdf"
-      _dnld_path = f"https://pubchem.ncbi.nlm.nih.gov/rest/pug/compound/cid/{_cid}/SDF?record_type=%s"
+      _dnld_path = f"{self.SETTINGS.user.sync_url_pubchem}/compound/cid/{_cid}/SDF?record_type=%s"
       if not _sdf_path.exists():
         self.download_content(_dnld_path % _dim_3d, _sdf_path)
         self.sleep_random(0.5, 3)
@@ -39,6 +44,8 @@ class StructureSync(PluginConverterBase):
           self.log_debug("Couldn't download the 3D structure attempting 2D structure.")
           self.download_content(_dnld_path % _dim_2d, _sdf_path)
 
+      self._fetched(_sdf_path, _on_fetch)
+
   def fetch_pdbs(self, *args, **kwargs):
     self._re_pdbid = self.re_compile(r'^[a-zA-Z0-9]{4}$')
 
@@ -48,10 +55,13 @@ class StructureSync(PluginConverterBase):
 
     _pdb_ids = filter(lambda _x: bool(self._re_pdbid.match(str(_x))), self.iterate(args))
     _storage_path = kwargs.get('storage', (self.path_base / 'unknown_molecules').validate())
+    _on_fetch = kwargs.get('on_fetch')
     for _pdb_id in _pdb_ids:
       _pdb_file_path = _storage_path / f"{_pdb_id}.pdb"
       if not _pdb_file_path.exists():
-        self.get_file_content(f"https://files.rcsb.org/download/{_pdb_id}.pdb", _pdb_file_path)
+        self.get_file_content(f"{self.SETTINGS.user.sync_url_rcsb}/{_pdb_id}.pdb", _pdb_file_path)
+
+      self._fetched(_pdb_file_path, _on_fetch)
 
   def fetch_drugbank(self, *args, **kwargs):
     """WIP"""
@@ -68,13 +78,19 @@ class StructureSync(PluginConverterBase):
       _identifiers = filter(len, self.split_guess(_file_path.read()))
 
       _storage_path = self.SETTINGS.user[f"path_{_mol_group}"].validate()
-      # Fetch molecule/sync in background and proceed further
-      self.map_fetcher[str(_db).lower()](*_identifiers, storage=_storage_path)
+
+      # Streaming: every fetched molecule is handed to the docking plugins right away
+      _on_fetch = None
+      if self.SETTINGS.user.sync_streaming:
+        _on_fetch = lambda _path: self.EVENTS.publish(self.plugin_uid, _path.stem, mol_group=_mol_group, path=_path)
+
+      self.map_fetcher[str(_db).lower()](*_identifiers, storage=_storage_path, on_fetch=_on_fetch)
 
   def _check_text_file_input(self):
     """Downloads molecules from corresponding database using the listed identifier"""
-    _ligand_lists = list(map(self._parse_identifiers, self.path_base.search('ligand*.*.txt')))
+    # Receptors first so that streamed ligands can be docked as they arrive
     _receptor_lists = list(map(self._parse_identifiers, self.path_base.search('receptor*.*.txt')))
+    _ligand_lists = list(map(self._parse_identifiers, self.path_base.search('ligand*.*.txt')))
 
   # API Methods
   def setup(self, *args, **kwargs):
@@ -82,10 +98,14 @@ class StructureSync(PluginConverterBase):
 
   def boot(self, *args, **kwargs):
     self.log_debug('StructureSync was initiated...')
-    self._check_text_file_input()
+    if not self.SETTINGS.user.sync_streaming:
+      self._check_text_file_input()
 
   def _restore_progress(self, *args, **kwargs): pass
 
-  def run(self, *args, **kwargs): pass
+  def run(self, *args, **kwargs):
+    # Docking plugins consume the EVENTS concurrently (see Master)
+    if self.SETTINGS.user.sync_streaming:
+      self._check_text_file_input()
 
   def shutdown(self, *args, **kwargs): pass
@@ -1,12 +1,12 @@
 from __future__ import annotations
 
 from ..sieveaibase import StepManager, DictConfig
-from ..managers import Structures
+from ..managers import Structures, DiskCache, ReceptorGeometry, SessionPool
 from ..process.docking import PluginDockingBase
 
-from Bio.PDB import PDBParser
 from Bio.PDB.PDBExceptions import PDBConstructionWarning
 import warnings as WARNINGS
+import contextlib as ContextLib
 
 """
 ToDo:
@@ -30,6 +30,8 @@ class Vina(PluginDockingBase):
   Vina_config = None
 
   _num_modes = 5
+  _file_template_cxc_contacts = 'CXC-Result-Model-%s.contacts.txt'
+  _file_template_cxc_hbonds = 'CXC-Result-Model-%s.hbonds.txt'
 
   path_vina_exe = None
 
@@ -55,14 +57,40 @@ class Vina(PluginDockingBase):
     self._steps_map_methods = {
       "init": self._prepare_molecules,
       "config": self._write_receptor_vina_config,
-      "dock": self._run_cli_docking,
-      # "dock": self._run_api_docking,
+      "screen": self._run_screen_docking,
+      "dock": self._run_api_docking if self.SETTINGS.user.vina_engine == 'api' else self._run_cli_docking,
       "analyse": self._parse_analyse_interactions,
       "final": self._finalise_complex,
     }
 
+    # Funnel: screen every pair first and dock/analyse only the finalists
+    if not self.SETTINGS.user.vina_funnel:
+      self._steps_map_methods.pop("screen")
+
     self._step_sequence = tuple(self._steps_map_methods.keys())
 
+    self.Geometry = ReceptorGeometry(self.path_sieveai_master_config / 'cache' / 'geometry')
+    self._ligand_features = {}
+
+    self.MapCache = None
+    if self.SETTINGS.user.vina_map_cache:
+      self.require('threading', 'Threading')
+      self._map_cache_locks = {}
+      self._map_cache_lock = self.Threading.Lock()
+      self.MapCache = DiskCache(self.SETTINGS.user.path_vina_map_cache,
+                                max_size=float(self.SETTINGS.user.vina_map_cache_size_gb) * 1024 ** 3,
+                                max_age=float(self.SETTINGS.user.vina_map_cache_age_days) * 86400)
+
+    self.CXSessions = None
+    self.require('threading', 'Threading')
+    self._cx_sessions_lock = self.Threading.Lock()
+
+    self.StructureCache = None
+    if self.SETTINGS.user.structure_cache:
+      self.StructureCache = DiskCache(self.SETTINGS.user.path_structure_cache,
+                                      max_size=float(self.SETTINGS.user.structure_cache_size_gb) * 1024 ** 3,
+                                      evict_interval=60)
+
     if True: # Compare hash of file changes and reattach selectively
       self.Receptors = Structures(self.SETTINGS.user.path_receptors, ['protein', 'dna', 'rna'])
       self.Ligands = Structures(self.SETTINGS.user.path_ligands, 'compound', 'protein', 'rna')
@@ -102,70 +130,296 @@ class Vina(PluginDockingBase):
                   "cpu", "verbosity", # "seed",
                   "exhaustiveness", "num_modes", "energy_range"]
 
-  def _run_api_docking(self, cuid):
-    """
-    @ToDo: Docking using python binding for AutoDock VINA
-    """
+  _api_engines = None
+
+  _cost_weights = {
+    'box_volume': 1.0,
+    'receptor_atoms': 0.25,
+    'torsions': 1.0,
+    'heavy_atoms': 1.0,
+    'exhaustiveness': 1.0,
+  }
+  _cost_steps = ('run_cli_docking', 'run_api_docking')
+  _grid_spacing = 0.375
+
+  def _read_vina_config(self, config_path) -> dict:
+    """Reads `key = value` pairs from a vina config file."""
+    _config = {}
+    if not config_path.exists():
+      return _config
+
+    for _line in config_path.readlines():
+      if not '=' in _line:
+        continue
+      _k, _v = (_x.strip() for _x in str(_line).split('=', 1))
+      _config[_k] = _v
+
+    return _config
+
+  def _get_complex_box(self, cuid):
+    """Returns (center, box_size) of the complex, from the record or from its vina config."""
+    _cuid_c = self.Complexes[cuid]
+    if 'center' in _cuid_c and 'box_size' in _cuid_c:
+      return tuple(_cuid_c.center), tuple(_cuid_c.box_size)
+
+    _config = self._read_vina_config(_cuid_c.path_vina_config)
+    _center = tuple(float(_config[f"center_{_ax}"]) for _ax in 'xyz')
+    _box_size = tuple(float(_config[f"size_{_ax}"]) for _ax in 'xyz')
+    return _center, _box_size
 
+  def _get_api_engine(self, cuid):
+    """Returns VinaPy instance with receptor maps computed for the complex box.
+
+    One engine is kept per worker thread. Maps are only recomputed when the
+    receptor or the box changes, so consecutive ligands of a receptor reuse them.
+    """
     from vina import Vina as VinaPy
-    _vna = VinaPy(sf_name='vina')
+
+    if self._api_engines is None:
+      self.require('threading', 'Threading')
+      self._api_engines = self.Threading.local()
+
     _cuid_c = self.Complexes[cuid]
-    _vna.set_receptor(str(_cuid_c.path_receptor))
+    _center, _box_size = self._get_complex_box(cuid)
+    _engine_key = (_cuid_c.rec_uid, _center, _box_size, self._grid_spacing)
 
-    _vna.set_ligand_from_file(str(_cuid_c.path_ligand))
-    _vna.compute_vina_maps(center=_cuid_c.center, box_size=_cuid_c.box_size)
+    if getattr(self._api_engines, 'key', None) == _engine_key:
+      return self._api_engines.engine
 
-    # Score the current pose
-    energy = _vna.score()
-    print('Score before minimization: %.3f (kcal/mol)' % energy[0])
+    self.log_debug(f'VINA_04: Computing maps for {_cuid_c.rec_uid} with center {_center} and size {_box_size}.')
+    _vna = VinaPy(sf_name='vina', cpu=self.job_threads, seed=self.Vina_config.default.get('seed', 0), verbosity=0)
+    _vna.set_receptor(str(_cuid_c.path_receptor.resolve()))
+    _vna.compute_vina_maps(center=list(_center), box_size=list(_box_size), spacing=self._grid_spacing)
 
-    # Minimized locally the current pose
-    energy_minimized = _vna.optimize()
-    print('Score after minimization : %.3f (kcal/mol)' % energy_minimized[0])
-    _vna.write_pose(str(_cuid_c.path_ligand).with_suffix('.min.pdbqt'), overwrite=True)
+    self._api_engines.key = _engine_key
+    self._api_engines.engine = _vna
 
-    # Dock the ligand
-    _vna.dock(exhaustiveness=32, n_poses=20)
-    _vna.write_poses(str(_cuid_c.path_out), n_poses=5, overwrite=True)
+    return _vna
 
-  def _run_cli_docking(self, cuid) -> None:
-    """Runs vina command."""
-    self.TASKS.start_step('run_cli_docking', cuid, self.plugin_uid)
+  def _write_score_table(self, path_out, path_score) -> None:
+    """Writes vina CLI like result table from `REMARK VINA RESULT` records of the poses file."""
+    _lines = [
+      "mode |   affinity | dist from best mode",
+      "     | (kcal/mol) | rmsd l.b.| rmsd u.b.",
+      "-----+------------+----------+----------",
+    ]
+
+    _mode = 0
+    for _line in path_out.readlines():
+      if not _line.startswith('REMARK VINA RESULT:'):
+        continue
+      _mode = _mode + 1
+      _affinity, _rmsd_lb, _rmsd_ub = (float(_x) for _x in _line.split(':', 1)[1].split()[:3])
+      _lines.append(f"{_mode:>4} {_affinity:>12.3f} {_rmsd_lb:>10.3f} {_rmsd_ub:>10.3f}")
+
+    path_score.write("\n".join(_lines + [""]), mode='w')
+
+  def _get_dock_params(self, cuid, screen=False) -> tuple:
+    """Returns (path_out, path_score, exhaustiveness, num_modes) for the docking stage."""
     _cuid_c = self.Complexes[cuid]
+    if screen:
+      return (_cuid_c.path_docking / f'{cuid}.screen.out.pdbqt',
+              _cuid_c.path_docking / f'{cuid}.screen.vina.txt',
+              int(self.SETTINGS.user.vina_screen_exhaustiveness), 1)
+
+    if self.SETTINGS.user.vina_funnel:
+      return (_cuid_c.path_out, _cuid_c.path_score,
+              int(self.SETTINGS.user.vina_final_exhaustiveness), int(self.SETTINGS.user.vina_final_num_modes))
+
+    return _cuid_c.path_out, _cuid_c.path_score, int(self.Vina_config.default.exhaustiveness), self._num_modes
 
-    if _cuid_c.path_out.exists():
+  def _run_screen_docking(self, cuid) -> None:
+    """Funnel stage one: low exhaustiveness docking of every pair for ranking."""
+    if self.SETTINGS.user.vina_engine == 'api':
+      self._run_api_docking(cuid, screen=True)
+    else:
+      self._run_cli_docking(cuid, screen=True)
+
+  def _run_api_docking(self, cuid, screen=False) -> None:
+    """Docking using python binding for AutoDock VINA"""
+    self.TASKS.start_step('run_api_docking', cuid, self.plugin_uid)
+    _cuid_c = self.Complexes[cuid]
+    _path_out, _path_score, _exhaustiveness, _num_modes = self._get_dock_params(cuid, screen)
+
+    if _path_out.exists():
       self.log_debug(f'Vina result for {cuid} exists. Returning...')
-      self.TASKS.end_step('run_cli_docking', cuid, self.plugin_uid)
+      self.TASKS.end_step('run_api_docking', cuid, self.plugin_uid)
       return
 
-    _config = {
-            # "--cpu": 1,
+    try:
+      _vna = self._get_api_engine(cuid)
+      _vna.set_ligand_from_file(str(_cuid_c.path_ligand.resolve()))
+      _vna.dock(exhaustiveness=_exhaustiveness, n_poses=max(20, _num_modes))
+      _vna.write_poses(str(_path_out.resolve()), n_poses=_num_modes,
+                       energy_range=self.Vina_config.energy_range, overwrite=True)
+      self._write_score_table(_path_out, _path_score)
+    except Exception as _e:
+      self.log_error(f'VINA_05: API docking failed for {cuid}: {_e}')
+
+    self.TASKS.end_step('run_api_docking', cuid, self.plugin_uid)
+
+  _map_prefix = 'receptor'
+
+  def _get_receptor_hash(self, cuid) -> str:
+    _cuid_c = self.Complexes[cuid]
+    _rec_hash = None
+    if _cuid_c.rec_uid in self.Receptors.keys():
+      _rec_hash = self.Receptors[_cuid_c.rec_uid].formats['.pdbqt'].get('mol_hash')
+
+    return _rec_hash or _cuid_c.path_receptor.hash
+
+  @ContextLib.contextmanager
+  def _use_cached_maps(self, cuid):
+    """Yields affinity map prefix for the receptor and box of the complex.
+
+    Maps are generated once per (receptor hash, center, size, spacing) in the
+    map cache and loaded by later vina calls using `--maps`; the entry is not
+    evicted until the block exits. Yields None when the cache is disabled or
+    maps could not be generated.
+    """
+    if self.MapCache is None:
+      yield None
+      return
+
+    _cuid_c = self.Complexes[cuid]
+    _center, _box_size = self._get_complex_box(cuid)
+    _key = self.MapCache.key(self._get_receptor_hash(cuid), _center, _box_size, self._grid_spacing)
+
+    with self._map_cache_lock:
+      _key_lock = self._map_cache_locks.setdefault(_key, self.Threading.Lock())
+
+    with _key_lock:
+      _entry = self.MapCache.get(_key)
+      if _entry is None:
+        self.log_debug(f'VINA_06: Generating affinity maps for {_cuid_c.rec_uid} ({_key}).')
+        _staged = self.MapCache.stage(_key)
+        self.cmd_run(self.path_vina_exe, **{
             "--receptor": _cuid_c.path_receptor.resolve(),
-            "--ligand": _cuid_c.path_ligand.resolve(),
             "--config": _cuid_c.path_vina_config.resolve(),
-            "--out": _cuid_c.path_out.resolve(),
-            "--num_modes": self._num_modes,
-            # "--verbosity": self.Vina_config.default.get('verbosity', 2),
-            "cwd": _cuid_c.path_docking.resolve(),
-            # ">": _cuid_c.path_score.resolve() # from command line to file
-          }
-    _result = self.cmd_run(self.path_vina_exe, **_config)
-    _cuid_c.path_score.write_text(_result)
-    self.TASKS.end_step('run_cli_docking', cuid, self.plugin_uid)
+            "--spacing": self._grid_spacing,
+            "--force_even_voxels": [],
+            "--write_maps": _staged / self._map_prefix,
+            "cwd": _staged,
+          })
 
-  _score_headers = ["mode", "affinity", "rmsd_lb", "rmsd_ub"]
+        if len(list(_staged.search(f"{self._map_prefix}.*.map"))) == 0:
+          self.log_error(f'VINA_07: Affinity maps could not be generated for {_cuid_c.rec_uid}.')
+          self.MapCache.discard(_staged)
+        else:
+          self.MapCache.commit(_key, _staged)
+
+    with self.MapCache.use(_key) as _entry:
+      yield (_entry / self._map_prefix) if _entry else None
+
+  @ContextLib.contextmanager
+  def _use_receptor_input(self, cuid):
+    """Yields vina receptor arguments, cached `--maps` when available else `--receptor`."""
+    with self._use_cached_maps(cuid) as _maps:
+      if _maps:
+        yield {"--maps": _maps.resolve()}
+      else:
+        yield {"--receptor": self.Complexes[cuid].path_receptor.resolve()}
 
-  def _parse_analyse_interactions(self, cuid):
-    self.TASKS.start_step('parse_analyse_interactions', cuid, self.plugin_uid)
-    _cuid_c = self.Complexes[cuid]
+  def _run_cli_batch_docking(self, cuids, screen=False) -> None:
+    """Docks ligands of the same receptor in a single vina call using `--batch`.
 
-    _cuid_c.path_cxc_cmd = (_cuid_c.path_docking / 'analysis.cxc').rel_path()
+    Outputs are moved to `path_out` of each complex and a score table is
+    written to `path_score`. Complexes missing from the batch output are left
+    for the per-complex dock step.
+    """
+    _pending = [_cuid for _cuid in cuids if _cuid in self.Complexes and not self._get_dock_params(_cuid, screen)[0].exists()]
 
-    if not _cuid_c.path_score.exists():
-      self.TASKS.end_step('parse_analyse_interactions', cuid, self.plugin_uid)
+    if len(_pending) < 2:
+      return
+
+    _batch_uid = _pending[0]
+    self.TASKS.start_step('run_cli_batch_docking', _batch_uid, self.plugin_uid)
+
+    _first = self.Complexes[_batch_uid]
+    *_, _exhaustiveness, _num_modes = self._get_dock_params(_batch_uid, screen)
+    _path_batch = (self.path_plugin_docking / '_batches' / _batch_uid).validate()
+
+    # Ligand stems name the batch outputs so use unique source PDBQT files
+    _ligand_map = {}
+    for _cuid in _pending:
+      _lig_path = self.Ligands[self.Complexes[_cuid].lig_uid].formats['.pdbqt'].mol_path
+      _ligand_map[_lig_path.stem] = (_cuid, _lig_path)
+
+    with self._use_receptor_input(_batch_uid) as _receptor_input:
+      _config = {
+          **_receptor_input,
+          "--config": _first.path_vina_config.resolve(),
+          "--exhaustiveness": _exhaustiveness,
+          "--num_modes": _num_modes,
+          "--cpu": self.job_threads,
+          "--batch": [_lig_path.resolve() for _, _lig_path in _ligand_map.values()],
+          "--dir": _path_batch.resolve(),
+          "cwd": _path_batch.resolve(),
+        }
+
+      _result = self.cmd_run(self.path_vina_exe, **_config)
+    (_path_batch / 'vina.batch.log').write(str(_result), mode='w')
+
+    _n_docked = 0
+    for _stem, (_cuid, _) in _ligand_map.items():
+      _batch_out = _path_batch / f"{_stem}_out.pdbqt"
+      if not _batch_out.exists():
+        self.log_debug(f'VINA_08: {_cuid} missing in batch output, will be docked individually.')
+        continue
+
+      _path_out, _path_score, *_ = self._get_dock_params(_cuid, screen)
+      self.OS.replace(str(_batch_out), str(_path_out.resolve()))
+      self._write_score_table(_path_out, _path_score)
+      _n_docked = _n_docked + 1
+
+    self.log_debug(f'VINA_09: Batch {_batch_uid} docked {_n_docked}/{len(_pending)} complexes.')
+    self.TASKS.end_step('run_cli_batch_docking', _batch_uid, self.plugin_uid)
+
+  def _process_batch(self, cuids, last_step=None) -> list:
+    """Runs steps upto config per complex, docks them together and completes remaining steps."""
+    for _cuid in cuids:
+      self._process_complex(_cuid, last_step='config')
+
+    self._run_cli_batch_docking(cuids, screen=bool(self.SETTINGS.user.vina_funnel))
+
+    for _cuid in cuids:
+      self._process_complex(_cuid, last_step=last_step)
+
+    return cuids
+
+  def _run_cli_docking(self, cuid, screen=False) -> None:
+    """Runs vina command."""
+    self.TASKS.start_step('run_cli_docking', cuid, self.plugin_uid)
+    _cuid_c = self.Complexes[cuid]
+    _path_out, _path_score, _exhaustiveness, _num_modes = self._get_dock_params(cuid, screen)
+
+    if _path_out.exists():
+      self.log_debug(f'Vina result for {cuid} exists. Returning...')
+      self.TASKS.end_step('run_cli_docking', cuid, self.plugin_uid)
       return
 
-    _score = list(_cuid_c.path_score.readlines())
+    # Cached maps are held until vina has read them
+    with self._use_receptor_input(cuid) as _receptor_input:
+      _config = {
+              "--cpu": self.job_threads,
+              **_receptor_input,
+              "--ligand": _cuid_c.path_ligand.resolve(),
+              "--config": _cuid_c.path_vina_config.resolve(),
+              "--out": _path_out.resolve(),
+              "--exhaustiveness": _exhaustiveness,
+              "--num_modes": _num_modes,
+              # "--verbosity": self.Vina_config.default.get('verbosity', 2),
+              "cwd": _cuid_c.path_docking.resolve(),
+              # ">": _cuid_c.path_score.resolve() # from command line to file
+            }
+      _result = self.cmd_run(self.path_vina_exe, **_config)
+    _path_score.write(_result, mode='w')
+    self.TASKS.end_step('run_cli_docking', cuid, self.plugin_uid)
+
+  _score_headers = ["mode", "affinity", "rmsd_lb", "rmsd_ub"]
+
+  def _parse_score_table(self, path_score):
+    _score = list(path_score.readlines())
     _score_flag = False
     _score_records = []
     for _res_line in _score:
@@ -177,69 +431,185 @@ class Vina(PluginDockingBase):
       if not _score_flag and _res_line.startswith("-----+------------+----------+----------"):
         _score_flag = True
 
-    _df_score = self.DF(_score_records, columns=self._score_headers)
+    return self.DF(_score_records, columns=self._score_headers)
 
-    _models = _df_score['mode'].tolist()
-    _CX =  self.SETTINGS.PLUGIN_REFS.chimerax()
-    _file_template_cxc_contacts = 'CXC-Result-Model-%s.contacts.txt'
-    _file_template_cxc_hbonds = 'CXC-Result-Model-%s.hbonds.txt'
+  def _cxc_analysis_commands(self, cuid, models) -> list:
+    """ChimeraX commands computing contacts/H-bonds of the complex models (None if all results exist)."""
+    _cuid_c = self.Complexes[cuid]
+    _file_template_cxc_contacts = self._file_template_cxc_contacts
+    _file_template_cxc_hbonds = self._file_template_cxc_hbonds
 
     _n_models_contacts = len([*_cuid_c.path_docking.search(_file_template_cxc_contacts % '*')])
     _n_models_hb = len([*_cuid_c.path_docking.search(_file_template_cxc_hbonds % '*')])
 
     if (_n_models_contacts +  _n_models_hb) > 1:
       self.log_debug(f'ChimeraX analysis results (n={_n_models_contacts +  _n_models_hb}) for {cuid} exists, skipping CXC analysis...')
-    else:
-      _complex_commads = [
-        f"close;"
-        f"set bgColor white; open {_cuid_c.path_receptor.resolve()}; wait; hide surfaces; hide atoms; show cartoons; wait;"
-        "addh;",
-        "~sel;",
-        "wait;",
-        f"open {_cuid_c.path_out.resolve()}; wait;",
-      ]
-
-      for _model_id in _models:
-        _path_contacts = (_cuid_c.path_docking / (_file_template_cxc_contacts % _model_id)).resolve()
-
-        if _path_contacts.exists(): continue
-
-        _complex_commads.extend([
-          f"# MODEL-NO-{_model_id}",
-          "hide #!2.1-%s target m;" % (len(_models)),
-          f"show #!2.{_model_id} models;",
-          f"view;",
-          f"sel #!2.{_model_id};", # Select the model
-          f"contacts (#1 & ~hbonds) restrict sel radius 0.05 log t saveFile {_path_contacts};",
-          f"wait;",
-          f"hb #1 restrict sel reveal t show t select t radius 0.05 log t saveFile {(_cuid_c.path_docking / (_file_template_cxc_hbonds % _model_id)).resolve()};",
-          f"wait;",
-          "label sel residues text {0.name}-{0.number} height 1.5 offset -2,0.25,0.25 bgColor #00000099 color white;",
-          f"~sel;",
-          # f"save {self.path_analysis}/{_comp}--{_model_id}.complex.png width 1200 height 838 supersample 4 transparentBackground true;",
-          f"sel #!2.{_model_id};", # Select the model
-          f"view sel;",
-          f"~sel;",
-          # f"save {self.path_analysis}/{_comp}--{_model_id}.ligand.png width 1200 height 838 supersample 4 transparentBackground true;",
-          f"turn x 45;",
-          # f"save {self.path_analysis}/{_comp}--{_model_id}.T45.ligand.png width 1200 height 838 supersample 4 transparentBackground true;",
-          f"\n",
-        ])
+      return None
+
+    _complex_commads = [
+      f"close;"
+      f"set bgColor white; open {_cuid_c.path_receptor.resolve()}; wait; hide surfaces; hide atoms; show cartoons; wait;"
+      "addh;",
+      "~sel;",
+      "wait;",
+      f"open {_cuid_c.path_out.resolve()}; wait;",
+    ]
+
+    for _model_id in models:
+      _path_contacts = (_cuid_c.path_docking / (_file_template_cxc_contacts % _model_id)).resolve()
+
+      if _path_contacts.exists(): continue
 
       _complex_commads.extend([
-          f"exit;",
+        f"# MODEL-NO-{_model_id}",
+        "hide #!2.1-%s target m;" % (len(models)),
+        f"show #!2.{_model_id} models;",
+        f"view;",
+        f"sel #!2.{_model_id};", # Select the model
+        f"contacts (#1 & ~hbonds) restrict sel radius 0.05 log t saveFile {_path_contacts};",
+        f"wait;",
+        f"hb #1 restrict sel reveal t show t select t radius 0.05 log t saveFile {(_cuid_c.path_docking / (_file_template_cxc_hbonds % _model_id)).resolve()};",
+        f"wait;",
+        "label sel residues text {0.name}-{0.number} height 1.5 offset -2,0.25,0.25 bgColor #00000099 color white;",
+        f"~sel;",
+        # f"save {self.path_analysis}/{_comp}--{_model_id}.complex.png width 1200 height 838 supersample 4 transparentBackground true;",
+        f"sel #!2.{_model_id};", # Select the model
+        f"view sel;",
+        f"~sel;",
+        # f"save {self.path_analysis}/{_comp}--{_model_id}.ligand.png width 1200 height 838 supersample 4 transparentBackground true;",
+        f"turn x 45;",
+        # f"save {self.path_analysis}/{_comp}--{_model_id}.T45.ligand.png width 1200 height 838 supersample 4 transparentBackground true;",
+        f"\n",
+      ])
+
+    return _complex_commads
+
+  def _dock_last_step(self):
+    """Last step run per complex when the ChimeraX analysis is batched after docking (None: all steps)."""
+    if self.native_interactions:
+      return None
+    return 'dock' if int(self.SETTINGS.user.chimerax_batch_size or 1) > 1 else None
+
+  def _cxc_complex_done(self, cuid, models) -> bool:
+    _path_docking = self.Complexes[cuid].path_docking
+    return all((_path_docking / (self._file_template_cxc_hbonds % _model_id)).exists() for _model_id in models)
+
+  def _run_cxc_batch(self, batch_num, cuids) -> list:
+    """Analyses many complexes with one ChimeraX script; returns the uids that failed.
+
+    ChimeraX stops a script at the first error, so the first complex (in
+    script order) without results is the one that failed; the complexes
+    after it are written to a new script and run again.
+    """
+    _CX = self.SETTINGS.PLUGIN_REFS.chimerax()
+    _sessions = self._get_cx_sessions()
+    _path_batches = (self.path_plugin_analysis / 'cxc-batches').validate()
+
+    _models, _commands = {}, {}
+    for _cuid in cuids:
+      if not self.Complexes[_cuid].path_score.exists():
+        continue
+      _models[_cuid] = self._parse_score_table(self.Complexes[_cuid].path_score)['mode'].tolist()
+      _cmds = self._cxc_analysis_commands(_cuid, _models[_cuid])
+      if not _cmds is None:
+        _commands[_cuid] = _cmds
+
+    _failed = []
+    _remaining = list(_commands.keys())
+    _attempt = 0
+    while len(_remaining) > 0:
+      _attempt = _attempt + 1
+      _path_cxc = _path_batches / f'batch-{batch_num}.{_attempt}.cxc'
+      _script = []
+      for _cuid in _remaining:
+        # `close;` opening each complex's commands clears the previous complex
+        _script.extend([f"# COMPLEX {_cuid}", *_commands[_cuid]])
+      _script.append("exit;" if _sessions is None else "close;")
+
+      _path_cxc.write("\n".join(_script), mode='w')
+      _CX.exe_cxc_file(_path_cxc.resolve(), sessions=_sessions)
+
+      _pending = [_cuid for _cuid in _remaining if not self._cxc_complex_done(_cuid, _models[_cuid])]
+      if len(_pending) == 0:
+        break
+
+      self.log_error(f'VINA_16: ChimeraX analysis of {_pending[0]} failed in {_path_cxc}, {len(_pending) - 1} complex(es) after it are run again.')
+      self.Complexes[_pending[0]].cxc_failed = str(_path_cxc)
+      _failed.append(_pending[0])
+      _remaining = _pending[1:]
+
+    return _failed
+
+  def _analyse_batches(self) -> None:
+    """Runs the ChimeraX analysis of docked complexes in batches, then their remaining steps."""
+    if self._dock_last_step() is None:
+      return
+
+    _cuids = [_cuid for _cuid in self._complex_uids(completed='dock') if self.Complexes[_cuid].steps_completed[-1] == 'dock']
+    if len(_cuids) == 0:
+      return
+
+    self.TASKS.start_step('analyse_batches', self.plugin_uid, self.plugin_uid)
+    _batch_size = int(self.SETTINGS.user.chimerax_batch_size)
+    _batches = [_cuids[_i:_i + _batch_size] for _i in range(0, len(_cuids), _batch_size)]
+    _workers = min(len(_batches), int(getattr(self, 'max_workers', 1) or 1) if self.SETTINGS.user.multiprocessing else 1)
+
+    def _analyse_batch(_args):
+      _batch_num, _batch = _args
+      _failed = self._run_cxc_batch(_batch_num, _batch)
+      # Failed complexes are analysed on their own by the analyse step
+      for _cuid in _batch:
+        self._process_complex(_cuid)
+      return len(_failed)
+
+    self.require('concurrent.futures', 'ConcurrentFutures')
+    with self.ConcurrentFutures.ThreadPoolExecutor(max_workers=_workers) as _pool:
+      _num_failed = sum(_pool.map(_analyse_batch, enumerate(_batches, 1)))
+
+    self.log_info(f'VINA_17: Analysed {len(_cuids)} complexes in {len(_batches)} ChimeraX batch(es), {_num_failed} failed.')
+    self.TASKS.end_step('analyse_batches', self.plugin_uid, self.plugin_uid)
+
+  def _parse_analyse_interactions(self, cuid):
+    self.TASKS.start_step('parse_analyse_interactions', cuid, self.plugin_uid)
+    _cuid_c = self.Complexes[cuid]
+
+    _cuid_c.path_cxc_cmd = (_cuid_c.path_docking / 'analysis.cxc').rel_path()
+
+    if not _cuid_c.path_score.exists():
+      self.TASKS.end_step('parse_analyse_interactions', cuid, self.plugin_uid)
+      return
+
+    _df_score = self._parse_score_table(_cuid_c.path_score)
+
+    _models = _df_score['mode'].tolist()
+    _CX =  self.SETTINGS.PLUGIN_REFS.chimerax()
+    _file_template_cxc_contacts = self._file_template_cxc_contacts
+    _file_template_cxc_hbonds = self._file_template_cxc_hbonds
+
+    # Tables of all models in one pass, no ChimeraX script
+    _tables = self.Interactions.analyse(_cuid_c.path_receptor, _cuid_c.path_out, _models) if self.native_interactions else None
+
+    _complex_commads = None if self.native_interactions else self._cxc_analysis_commands(cuid, _models)
+    if not _complex_commads is None:
+      # A pooled session stays open for the next complex
+      _sessions = self._get_cx_sessions()
+      _complex_commads.extend([
+          f"exit;" if _sessions is None else "close;",
         ])
 
-      _cuid_c.path_cxc_cmd.write_text("\n".join(_complex_commads))
-      _CX.exe_cxc_file(_cuid_c.path_cxc_cmd.resolve())
+      _cuid_c.path_cxc_cmd.write("\n".join(_complex_commads), mode='w')
+      _CX.exe_cxc_file(_cuid_c.path_cxc_cmd.resolve(), sessions=_sessions)
 
     _summary = []
     for _model_id in _models:
-      _contacts_df = _CX.parse_contacts((_cuid_c.path_docking / (_file_template_cxc_contacts % _model_id)).resolve())
-      _hbonds_df = _CX.parse_hbonds((_cuid_c.path_docking / (_file_template_cxc_hbonds % _model_id)).resolve())
+      if not _tables is None:
+        _contacts_df, _hbonds_df = _tables.get(_model_id, (None, None))
+      else:
+        _contacts_df = _CX.parse_contacts((_cuid_c.path_docking / (_file_template_cxc_contacts % _model_id)).resolve())
+        _hbonds_df = _CX.parse_hbonds((_cuid_c.path_docking / (_file_template_cxc_hbonds % _model_id)).resolve())
 
-      self.Complexes[cuid][f'Model_{_model_id}'].contacts = _contacts_df
-      self.Complexes[cuid][f'Model_{_model_id}'].hbonds = _hbonds_df
+      self.Complexes[cuid][f'Model_{_model_id}'].contacts = self._store_table(cuid, f'Model_{_model_id}.contacts', _contacts_df)
+      self.Complexes[cuid][f'Model_{_model_id}'].hbonds = self._store_table(cuid, f'Model_{_model_id}.hbonds', _hbonds_df)
 
       _contacts, _hbonds = [], []
       _NoneType = type(None)
@@ -279,34 +649,106 @@ class Vina(PluginDockingBase):
     self.TASKS.end_step('parse_analyse_interactions', cuid, self.plugin_uid)
 
   def _prepare_molecules(self, cuid):
+    """Converts a ligand library record to PDBQT when its complex is processed."""
+    _cuid_c = self.Complexes[cuid]
+    if _cuid_c.path_ligand.exists():
+      return cuid
+
+    self.Ligands.set_format('pdbqt', mol_id=_cuid_c.lig_uid, converter=self._ligand_converter, cache=self.StructureCache)
+    _lig_path = self.Ligands[_cuid_c.lig_uid].formats['.pdbqt'].mol_path
+    if _lig_path is None or not _lig_path.exists():
+      self.log_error(f'VINA_13: {_cuid_c.lig_uid} could not be converted to PDBQT.')
+      return cuid
+
+    self._stage_file(_lig_path, _cuid_c.path_ligand.resolve())
     return cuid
 
   def _finalise_complex(self, cuid):
+    self._publish_complex(cuid)
     return cuid
 
-  def _process_complex(self, cuid) -> None:
+  def _process_complex(self, cuid, last_step=None) -> None:
     self.TASKS.start_step('process_complex', cuid, self.plugin_uid)
     if not cuid in self.Complexes:
       self.TASKS.end_step('process_complex', cuid, self.plugin_uid)
       return cuid
 
     for _step in self.Complexes[cuid].step:
-      if _step in self.Complexes[cuid].steps_completed:
-        continue
+      if not _step in self.Complexes[cuid].steps_completed:
+        _step = self.Complexes[cuid].step._current
 
-      _step = self.Complexes[cuid].step._current
+        if not self.Complexes[cuid].step.is_last:
+          self.log_debug(f"{cuid}:: Step: {_step}")
+        else:
+          self.log_debug(f"{cuid}:: Last Step: {_step}")
 
-      if not self.Complexes[cuid].step.is_last:
-        self.log_debug(f"{cuid}:: Step: {_step}")
-      else:
-        self.log_debug(f"{cuid}:: Last Step: {_step}")
+        self._steps_map_methods[_step](cuid)
+        self.Complexes[cuid].steps_completed.append(_step)
+        self._checkpoint_complex(cuid)
 
-      self._steps_map_methods[_step](cuid)
-      self.Complexes[cuid].steps_completed.append(_step)
+      if _step == last_step:
+        break
 
     self.TASKS.end_step('process_complex', cuid, self.plugin_uid)
     return cuid
 
+  def _init_complex(self, rec_uid, lig_uid):
+    _rec = self.Receptors[rec_uid]
+    _lig = self.Ligands[lig_uid]
+
+    _complex_uid = self.slug(f"{_rec.mol_id}--{_lig.mol_id}")
+
+    if _complex_uid in self.Complexes:
+      return _complex_uid
+
+    if not _rec.formats['.pdbqt'].mol_path.exists():
+      self.log_debug(f'{_rec.mol_id} PDBQT does not exist.')
+      return None
+
+    # Library records are converted by the init step of the complex
+    _lig_pending = self.Ligands.is_library_record(_lig.mol_id) and not '.pdbqt' in _lig.formats
+    if not _lig_pending and not _lig.formats['.pdbqt'].mol_path.exists():
+      self.log_debug(f'{_lig.mol_id} PDBQT does not exist.')
+      return None
+
+    _complex_path = (self.path_plugin_docking / _complex_uid).validate()
+
+    # Convert mol_path to PDBQT using meeko/OpenBabel???
+    _c_rec = _complex_path / f'REC.pdbqt'
+    _c_lig = _complex_path / f'LIG.pdbqt'
+
+    self._stage_file(_rec.formats['.pdbqt'].mol_path, _c_rec.resolve())
+    _lig_pending or self._stage_file(_lig.formats['.pdbqt'].mol_path, _c_lig.resolve())
+
+    _record = DictConfig()
+    _record.update({
+        "step": StepManager(self._step_sequence),
+        "steps_completed": [],
+        "uid": _complex_uid,
+        "rec_uid": _rec.mol_id,
+        "lig_uid": _lig.mol_id,
+        "path_receptor": _c_rec,
+        "path_ligand": _c_lig,
+        "path_docking": _complex_path,
+        "path_out": _complex_path / f'{_complex_uid}.out.pdbqt',
+        "path_score": _complex_path / f'{_complex_uid}.vina.txt',
+        "path_vina_config": _complex_path / f"{_complex_uid}.vina.config"
+      })
+    self.Complexes[_complex_uid] = _record
+
+    self.log_debug(f'VINA_01: {_complex_uid} initiated.')
+    return _complex_uid
+
+  def _prepare_stream_molecule(self, mol_group, mol_id) -> bool:
+    if mol_group == 'receptors':
+      self.Receptors.set_format('pdbqt', mol_id=mol_id, converter=self._receptor_converter, cache=self.StructureCache)
+      _mol_obj = self.Receptors[mol_id]
+    else:
+      self.Ligands.set_format('pdbqt', mol_id=mol_id, converter=self._ligand_converter, cache=self.StructureCache)
+      _mol_obj = self.Ligands[mol_id]
+
+    return _mol_obj.formats['.pdbqt'].mol_path.exists()
+
   def _queue_complexes(self) -> None:
     self.TASKS.start_step('queue_complexes', self.plugin_uid, self.plugin_uid)
 
@@ -318,60 +760,100 @@ class Vina(PluginDockingBase):
       return
 
     # Perform Docking
-    self.SETTINGS.user.multiprocessing and self.init_multiprocessing()
     _combs = list(self.product(self.Receptors.keys(), self.Ligands.keys()))
 
-    for _rck, _ligk in _combs:
-      _rec = self.Receptors[_rck]
-      _lig = self.Ligands[_ligk]
-
-      _complex_uid = self.slug(f"{_rec.mol_id}--{_lig.mol_id}")
-
-      if not _complex_uid in self.Complexes:
-        self.Complexes[_complex_uid] = DictConfig()
-
-        _complex_path = (self.path_plugin_docking / _complex_uid).validate()
-
-        # Convert mol_path to PDBQT using meeko/OpenBabel???
-        _c_rec = _complex_path / f'REC.pdbqt'
-        _c_lig = _complex_path / f'LIG.pdbqt'
-
-        if not _rec.formats['.pdbqt'].mol_path.exists():
-          self.log_debug(f'{_rec.mol_id} PDBQT does not exist.')
-          continue
-
-        if not _lig.formats['.pdbqt'].mol_path.exists():
-          self.log_debug(f'{_lig.mol_id} PDBQT does not exist.')
-          continue
-
-        _rec.formats['.pdbqt'].mol_path.copy(_c_rec.resolve())
-        _lig.formats['.pdbqt'].mol_path.copy(_c_lig.resolve())
-
-        self.Complexes[_complex_uid].update({
-            "step": StepManager(self._step_sequence),
-            "steps_completed": [],
-            "uid": _complex_uid,
-            "rec_uid": _rec.mol_id,
-            "lig_uid": _lig.mol_id,
-            "path_receptor": _c_rec,
-            "path_ligand": _c_lig,
-            "path_docking": _complex_path,
-            "path_out": _complex_path / f'{_complex_uid}.out.pdbqt',
-            "path_score": _complex_path / f'{_complex_uid}.vina.txt',
-            "path_vina_config": _complex_path / f"{_complex_uid}.vina.config"
-          })
+    _last_step = 'screen' if self.SETTINGS.user.vina_funnel else self._dock_last_step()
+    _batch_size = int(self.SETTINGS.user.vina_batch_size or 1)
+    _batch_size = _batch_size if self.SETTINGS.user.vina_engine != 'api' else 1
 
-        self.log_debug(f'VINA_01: {_complex_uid} initiated.')
+    self.SETTINGS.user.multiprocessing and self.init_multiprocessing(num_jobs=-(-len(_combs) // _batch_size))
 
-      if self.SETTINGS.user.multiprocessing:
-        self.queue_task(self._process_complex, _complex_uid)
+    _queue = []
+    _batches = {}
+
+    for _rck, _ligk in _combs:
+      _complex_uid = self._init_complex(_rck, _ligk)
+      if _complex_uid:
+        _queue.append(_complex_uid)
+
+    # Longest jobs first (per receptor, see _order_by_cost) so that large receptors/flexible ligands do not straggle
+    _costs = self._estimate_costs(_queue)
+    _queue = self._order_by_cost(_queue, _costs)
+
+    for _complex_uid in _queue:
+      _rec_uid = self.Complexes[_complex_uid].rec_uid
+      if _batch_size > 1:
+        _batches.setdefault(_rec_uid, [[]])
+        if len(_batches[_rec_uid][-1]) >= _batch_size:
+          _batches[_rec_uid].append([])
+        _batches[_rec_uid][-1].append(_complex_uid)
+      elif self.SETTINGS.user.multiprocessing:
+        self.queue_task(self._process_complex, _complex_uid, last_step=_last_step)
         self.log_debug(f'VINA_02: {_complex_uid} queued for multiprocessing.')
       else:
         self.log_debug(f'VINA_03: {_complex_uid} is being processed...')
-        self._process_complex(_complex_uid)
+        self._process_complex(_complex_uid, last_step=_last_step)
+
+    _batches = [(_rec_uid, _batch) for _rec_uid, _rec_batches in _batches.items() for _batch in _rec_batches]
+    _batches.sort(key=lambda _b: sum(_costs[_c] for _c in _b[1]), reverse=True)
+    for _rec_uid, _batch in _batches:
+      if self.SETTINGS.user.multiprocessing:
+        self.queue_task(self._process_batch, _batch, last_step=_last_step)
+        self.log_debug(f'VINA_10: Batch of {len(_batch)} complexes of {_rec_uid} queued for multiprocessing.')
+      else:
+        self._process_batch(_batch, last_step=_last_step)
 
     self.TASKS.end_step('queue_complexes', self.plugin_uid, self.plugin_uid)
 
+  def _select_finalists(self) -> list:
+    """Ranks screened complexes and returns top-K complexes per receptor."""
+    self.TASKS.start_step('select_finalists', self.plugin_uid, self.plugin_uid)
+    _score_tables = []
+    for _idx in self._complex_uids(completed='screen'):
+      _cmplx = self.Complexes[_idx]
+      _, _path_score, *_ = self._get_dock_params(_idx, screen=True)
+      if not _path_score.exists():
+        continue
+
+      _s = self._parse_score_table(_path_score)
+      _s['rec_uid'] = _cmplx.rec_uid
+      _s['lig_uid'] = _cmplx.lig_uid
+      _s['complex_uid'] = _cmplx.uid
+      _score_tables.append(_s)
+
+    if not len(_score_tables) > 0:
+      self.log_debug('VINA_11: No screening results were found to select finalists.')
+      self.TASKS.end_step('select_finalists', self.plugin_uid, self.plugin_uid)
+      return []
+
+    # Best pose per complex by affinity (lower is better), then top-K per receptor
+    _data = self.PD.concat(_score_tables)
+    _data['affinity'] = self.PD.to_numeric(_data['affinity'], errors='coerce')
+    _top_res = _data.dropna(subset=['affinity']).sort_values('affinity', kind='stable').drop_duplicates('complex_uid')
+
+    _top_k = int(self.SETTINGS.user.vina_funnel_top_k)
+    _finalists = _top_res.groupby('rec_uid').head(_top_k)['complex_uid'].tolist()
+
+    for _idx in self._complex_uids(completed='screen'):
+      self.Complexes[_idx].finalist = _idx in _finalists
+
+    self.log_info(f'VINA_12: {len(_finalists)} finalists selected from {len(_top_res)} screened complexes.')
+    self.TASKS.end_step('select_finalists', self.plugin_uid, self.plugin_uid)
+    return _finalists
+
+  def _queue_finalists(self) -> None:
+    self.require('pandas', 'PD')
+    _finalists = self._select_finalists()
+
+    self.SETTINGS.user.multiprocessing and self.init_multiprocessing(num_jobs=len(_finalists))
+
+    _costs = self._estimate_costs(_finalists)
+    for _cuid in self._order_by_cost(_finalists, _costs):
+      if self.SETTINGS.user.multiprocessing:
+        self.queue_task(self._process_complex, _cuid, last_step=self._dock_last_step())
+      else:
+        self._process_complex(_cuid, last_step=self._dock_last_step())
+
   def _rank_conformers(self, _df_all_conformers):
     self.TASKS.start_step('rank_conformers', self.plugin_uid, self.plugin_uid)
     _ranking_columns = {
@@ -431,9 +913,9 @@ class Vina(PluginDockingBase):
 
     # Combine all the interactions
     _score_tables = []
-    for _idx in self.Complexes._keys:
+    for _idx in self._complex_uids(completed='analyse'):
       _cmplx = self.Complexes[_idx]
-      if not all([isinstance(_cmplx, (dict)), 'vina_results' in _cmplx]):
+      if not 'vina_results' in _cmplx:
         continue
 
       _s = _cmplx.vina_results
@@ -467,16 +949,46 @@ class Vina(PluginDockingBase):
 
       # If no top ranked data
       self.log_debug('No data was provided for image generation')
+      return
 
     _CX =  self.SETTINGS.PLUGIN_REFS.chimerax()
 
+    _cx_html_path = self.path_plugin_analysis / f'{self.plugin_uid}-Top-Ranked.html'
+    _cx_cxc_path = self.path_plugin_analysis / f'{self.plugin_uid}-Top-Ranked.cxc'
+
     _cx_cxc_data = ""
     _cx_html_data = _CX.get_html_head()
 
     _cmd_contacts = _CX.get_cmd_contacts()
     _cmd_hbonds = _CX.get_cmd_hbonds()
 
-    for _, _row in self._df_top_ranked.iterrows():
+    for _, _row in _top_ranked.iterrows():
+      _cuid = self.slug(f"{_row['Receptor ID']}--{_row['Ligand ID']}")
+      if not _cuid in self.Complexes:
+        continue
+
+      _cmplx = self.Complexes[_cuid]
+      _img_prefix = (self.path_plugin_analysis / f"{_cuid}--{_row['Conformer ID']}").resolve()
+      _cmd_open = f"close; open {_cmplx.path_receptor.resolve()}; open {_cmplx.path_out.resolve()}; hide #2 models; show #!2.{_row['Conformer ID']} models; view;"
+
+      _cx_html_data = _cx_html_data + f"""
+<h3>{_cuid} (Conformer {_row['Conformer ID']}, Rank {_row['Composite Rank']})</h3>
+<a href="cxcmd:{_cmd_open}">Open</a>
+<ul>{_CX.get_contact_calc_html(_row['Total Contacts'], f"{_img_prefix}{_CX.suffix_jpeg_contacts}")}</ul>
+<ul>{_CX.get_hbonds_calc_html(_row['Total Hbonds'], f"{_img_prefix}{_CX.suffix_jpeg_hbonds}")}</ul>
+"""
+      _cx_cxc_data = _cx_cxc_data + "\n".join([
+          _cmd_open,
+          f"save {_img_prefix}{_CX.suffix_jpeg_full} supersample 3;",
+          f"{_cmd_contacts} view sel;",
+          f"save {_img_prefix}{_CX.suffix_jpeg_contacts} supersample 3;",
+          f"~contacts; ~label; {_cmd_hbonds} view sel;",
+          f"save {_img_prefix}{_CX.suffix_jpeg_hbonds} supersample 3;",
+          "",
+        ])
+
+    _cx_cxc_data = _cx_cxc_data + "exit;\n"
+
     self.write(_cx_html_path, _cx_html_data)
     self.write(_cx_cxc_path, _cx_cxc_data)
 
@@ -486,12 +998,97 @@ class Vina(PluginDockingBase):
     # """Open in ChimeraX"""
     self.OS.system(f'chimerax --cmd "open {_cx_html_path}" &')
 
+  def _get_cx_sessions(self):
+    """SessionPool shared by the analysis of all complexes (None: a ChimeraX process per complex)."""
+    if not int(self.SETTINGS.user.chimerax_sessions or 0) > 0:
+      return None
+
+    with self._cx_sessions_lock:
+      if self.CXSessions is None:
+        self.CXSessions = SessionPool(int(self.SETTINGS.user.chimerax_sessions),
+                                      base_port=self.SETTINGS.user.chimerax_session_port,
+                                      max_jobs=self.SETTINGS.user.chimerax_session_max_jobs)
+      return self.CXSessions
+
+  def _close_cx_sessions(self) -> None:
+    with self._cx_sessions_lock:
+      if not self.CXSessions is None:
+        self.log_debug(f'VINA_15: Closing {self.CXSessions}.')
+        self.CXSessions.close()
+        self.CXSessions = None
+
   def _finalise_results(self, *args, **kwargs):
     self.TASKS.start_step('Finalise_Results', 'FINAL_STEP', self.plugin_uid)
+    self._analyse_batches()
+    self._close_cx_sessions()
+    self._refit_cost_model()
     self._tabulate_results()
     self._cxc_generate_images()
     self.TASKS.end_step('Finalise_Results', 'FINAL_STEP', self.plugin_uid)
 
+  def _get_receptor_box(self, rec_uid) -> tuple:
+    """Returns (center, box_size) of the grid box for the receptor."""
+    _mol_obj = self.Receptors[rec_uid]
+    _mol_hash = _mol_obj.formats[_mol_obj.mol_path.suffix].get('mol_hash')
+
+    # If config settings has specific residues for site specific docking then prepare grid around specific residues
+    _residues = self.Vina_config.other.get("residues") or None
+    _center, _size = self.Geometry.get_box(_mol_obj.mol_path, _mol_hash, _residues)
+
+    _spacing = float(self.Vina_config.other.get("spacing", 1))
+    _center = tuple(round(_coord, 4) for _coord in _center)
+    _box_size = tuple(min(int(dim), 126) + _spacing for dim in _size)
+
+    return _center, _box_size
+
+  def _get_ligand_features(self, lig_uid) -> dict:
+    """Torsions (TORSDOF) and heavy atoms of the ligand PDBQT."""
+    if lig_uid in self._ligand_features:
+      return self._ligand_features[lig_uid]
+
+    _lig_path = self.Ligands[lig_uid].formats['.pdbqt'].mol_path
+    if (_lig_path is None or not _lig_path.exists()) and self.Ligands.is_library_record(lig_uid):
+      # Not converted yet, estimated from the library record
+      self.require('rdkit.Chem.rdMolDescriptors', 'RDKitDescriptors')
+      _mol = self.Ligands.get_record_mol(lig_uid)
+      self._ligand_features[lig_uid] = {
+        'torsions': self.RDKitDescriptors.CalcNumRotatableBonds(_mol) if _mol else 0,
+        'heavy_atoms': _mol.GetNumHeavyAtoms() if _mol else 0,
+      }
+      return self._ligand_features[lig_uid]
+
+    _torsions, _branches, _heavy_atoms = None, 0, 0
+    for _line in _lig_path.readlines():
+      if _line.startswith(('ATOM', 'HETATM')) and not _line[77:79].strip() in ('H', 'HD', 'HS'):
+        _heavy_atoms = _heavy_atoms + 1
+      elif _line.startswith('BRANCH'):
+        _branches = _branches + 1
+      elif _line.startswith('TORSDOF'):
+        _torsions = int(_line.split()[1])
+
+    self._ligand_features[lig_uid] = {
+      'torsions': _branches if _torsions is None else _torsions,
+      'heavy_atoms': _heavy_atoms,
+    }
+
+    return self._ligand_features[lig_uid]
+
+  def _get_cost_features(self, cuid) -> dict:
+    _cuid_c = self.Complexes[cuid]
+    _mol_obj = self.Receptors[_cuid_c.rec_uid]
+    _, _box_size = self._get_receptor_box(_cuid_c.rec_uid)
+
+    # Features describe the docking run whose duration TASKS will record
+    _screen = bool(self.SETTINGS.user.vina_funnel) and not _cuid_c.get('finalist')
+    *_, _exhaustiveness, _ = self._get_dock_params(cuid, _screen)
+
+    return {
+      'box_volume': _box_size[0] * _box_size[1] * _box_size[2],
+      'receptor_atoms': self.Geometry.get_atom_count(_mol_obj.mol_path, _mol_obj.formats[_mol_obj.mol_path.suffix].get('mol_hash')),
+      **self._get_ligand_features(_cuid_c.lig_uid),
+      'exhaustiveness': _exhaustiveness,
+    }
+
   def _write_receptor_vina_config(self, cuid):
     self.TASKS.start_step('write_receptor_vina_config', cuid, self.plugin_uid)
     if not cuid in self.Complexes:
@@ -507,48 +1104,23 @@ class Vina(PluginDockingBase):
 
     _config_path = self.Complexes[cuid].path_vina_config
 
-    _mol_obj = self.Receptors[_complx.rec_uid]
-
-    _Parser = PDBParser(get_header=False)
-    _structure = _Parser.get_structure(_mol_obj.mol_id, _mol_obj.mol_path)
-
-    _coordinates = []
-
-    # If config settings has specific residues for site specific docking then prepare grid around specific residues
-    if self.Vina_config.other.get("residues") and len(self.Vina_config.other.get("residues")):
-      for _chains in _structure.get_chains():
-        for _chain in _chains:
-          _chain_vars = vars(_chain)
-          if _chain_vars.get("resname") in self.Vina_config.other.get("residues"):
-            _coordinates.extend([[k for k in res.get_coord()] for res in _chain])
-    else:
-      _coordinates = [_atom.get_coord() for _atom in _structure.get_atoms()]
-
-    # Calculate center, size, and distance
-    _coord_x, _coord_y, _coord_z = zip(*_coordinates) if _coordinates else ([], [], [])
-
-    _center = (sum(_coord_x) / len(_coord_x), sum(_coord_y) / len(_coord_y), sum(_coord_z) / len(_coord_z))
-
-    _size = (max(_coord_x) - min(_coord_x), max(_coord_y) - min(_coord_y), max(_coord_z) - min(_coord_z))
-
     # Prepare VINA config
-    _center_x, _center_y, _center_z = (round(_coord, 4) for _coord in _center)
-    _size_x, _size_y, _size_z = (min(int(dim), 126) for dim in _size)
-
-    _spacing = float(self.Vina_config.other.get("spacing", 1))
+    _center, _box_size = self._get_receptor_box(_complx.rec_uid)
+    _center_x, _center_y, _center_z = _center
+    _size_x, _size_y, _size_z = _box_size
 
     _vina_config = {
         **self.Vina_config.default,
         "center_x": _center_x,
         "center_y": _center_y,
         "center_z": _center_z,
-        "size_x": _size_x + _spacing,
-        "size_y": _size_y + _spacing,
-        "size_z": _size_z + _spacing,
+        "size_x": _size_x,
+        "size_y": _size_y,
+        "size_z": _size_z,
       }
 
-    self.Complexes[cuid].center = [_center_x, _center_y, _center_z]
-    self.Complexes[cuid].box_size = [_size_x + _spacing, _size_y + _spacing, _size_z + _spacing]
+    self.Complexes[cuid].center = list(_center)
+    self.Complexes[cuid].box_size = list(_box_size)
 
     _vina_config = {_k: _vina_config[_k] for _k in _vina_config if _k in self.Vina_config.allowed_keys}
 
@@ -560,17 +1132,52 @@ class Vina(PluginDockingBase):
 
     self.TASKS.end_step('write_receptor_vina_config', cuid, self.plugin_uid)
 
+  def _finalise_streaming(self) -> None:
+    """Funnel selection and results once the stream is drained (all complexes are done)."""
+    if self.SETTINGS.user.vina_funnel:
+      self._queue_finalists()
+      self.SETTINGS.user.multiprocessing and self.process_queue(wait=True)
+
+    self._finalise_results()
+
   def _start_preparation(self, *args, **kwargs):
     # Setting molecular formats
     self.TASKS.start_step('start_preparation', self.plugin_uid, self.plugin_uid)
     _mgltools = self.SETTINGS.PLUGIN_REFS.MGLTools() # CIR
-    self.Receptors.set_format('pdbqt', converter=_mgltools.prepare_receptor)
+    self._receptor_converter = _mgltools.prepare_receptor
 
     _openBabel = self.SETTINGS.PLUGIN_REFS.OpenBabel()
-    self.Ligands.set_format('pdbqt', converter=_openBabel.convert)
+    self._ligand_converter = _openBabel.convert
+    _bulk_converter, _library_converter = _openBabel.bulk_convert, None
+    if self.SETTINGS.user.ligand_prep_engine == 'meeko':
+      # Ligands are prepared by worker processes instead of one obabel call per chunk
+      self._ligand_converter = _mgltools.convert_pqbqt
+      _bulk_converter, _library_converter = _mgltools.prepare_ligands, _mgltools.prepare_library
+
+    if self.SETTINGS.user.sync_streaming:
+      # Conversion happens per molecule as it arrives
+      self._stream_complexes(last_step='screen' if self.SETTINGS.user.vina_funnel else self._dock_last_step())
+      self._finalise_streaming()
+      self.TASKS.end_step('start_preparation', self.plugin_uid, self.plugin_uid)
+      return
+
+    # Conversions are single threaded external tools, run as many as the CPU budget allows
+    self.plan_cpu_budget()
+    self.Receptors.set_format('pdbqt', converter=self._receptor_converter, workers=self.num_cores, cache=self.StructureCache)
+    self.Ligands.set_format('pdbqt', converter=self._ligand_converter, workers=self.num_cores,
+                            bulk_converter=_bulk_converter, library_converter=_library_converter, cache=self.StructureCache)
+
+    for _structures in (self.Receptors, self.Ligands):
+      for _mol_id, _reason in _structures.conversion_failures.items():
+        self.log_error(f'VINA_14: {_mol_id} could not be converted to PDBQT: {_reason}')
 
     self._queue_complexes()
 
+    if self.SETTINGS.user.vina_funnel:
+      # Screening has to complete before finalists can be ranked
+      self.SETTINGS.user.multiprocessing and self.process_queue(wait=True)
+      self._queue_finalists()
+
     if self.SETTINGS.user.multiprocessing:
       self.process_queue()
       self.queue_final_callback(self._finalise_results)
@@ -599,6 +1206,7 @@ class Vina(PluginDockingBase):
 
   def shutdown(self, *args, **kwargs) -> Vina:
     self.TASKS.start_step('shutdown', self.plugin_uid, self.plugin_uid)
+    self._close_cx_sessions()
     self._update_progress()
     self.post_docking()
     self.TASKS.end_step('shutdown', self.plugin_uid, self.plugin_uid)
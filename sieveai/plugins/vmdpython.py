@@ -18,6 +18,7 @@ class VMDPython(PluginAnalysisBase):
   def __init__(self, *args, **kwargs):
     super().__init__(**kwargs)
     self.require('math', 'Math')
+    self.require('numpy', 'NP')
 
   def parse_molecule(self, mol_path, mol_type="pdb"):
     _mol_id = VMDMol.load(mol_type, str(mol_path))
@@ -51,61 +52,50 @@ class VMDPython(PluginAnalysisBase):
 
     return (_dist, _sasa1, _sasa2, _contact1, _contact2, _hb1_a, _hb2_d, _hd12_p, _hb1_d, _hb2_a, _hd21_p)
 
-  def get_interactions(self, _rec_obj, _lig_obj):
+  # Atom index columns mapped to residues and their selection (0: receptor, 1: ligand)
+  _residue_columns = {'Contact_1': 0, 'Contact_2': 1, 'HBond_1_don': 0, 'HBond_2_don': 1, 'HBond_1_acc': 0, 'HBond_2_acc': 1}
+
+  def get_residue_arrays(self, atom_sel) -> tuple:
+    """(index, `resname:resid`) arrays of the selection, in selection order."""
+    _index = self.NP.asarray(atom_sel.index)
+    _labels = self.NP.char.add(self.NP.char.add(self.NP.asarray(atom_sel.resname, dtype=str), ':'), self.NP.asarray(atom_sel.resid).astype(str))
+    return (_index, _labels)
+
+  def map_residues(self, residue_arrays, atom_indices) -> list:
+    """Unique `resname:resid` of the atom indices, in selection order."""
+    _index, _labels = residue_arrays
+    _labels = _labels[self.NP.isin(_index, self.NP.asarray(atom_indices))]
+    _labels, _first = self.NP.unique(_labels, return_index=True)
+    return _labels[self.NP.argsort(_first)].tolist()
+
+  def map_residues_df(self, structure_df, atom_indices) -> list:
+    _df = structure_df[structure_df['index'].isin(atom_indices)]
+    return list((_df.resname + ":" + _df.resid.astype(str)).unique())
+
+  def get_interactions(self, _rec_obj, _lig_obj, structure_df=False):
+    """Interaction matrix of the selections with atom indices mapped to `resname:resid`.
+
+    Residues come from the index/resname/resid arrays of each selection;
+    `structure_df=True` maps them through `get_pdb_structure_df` instead.
+    """
     _con_mat = None
 
     if all([len(_rec_obj) > 0, len(_lig_obj) > 0]):
       _con_mat = self.get_interaction_matrix(_rec_obj, _lig_obj)
       _con_mat = dict(zip(self._matrix_columns, _con_mat))
 
-      _rec_df = self.get_pdb_structure_df(_rec_obj)
-      _lig_df = self.get_pdb_structure_df(_lig_obj)
-
-      _c1 = _con_mat['Contact_1']
-      if len(_c1) > 0:
-        _c1_df = _rec_df[_rec_df['index'].isin(_c1)]
-        _c1_list = _c1_df.resname +":"+_c1_df.resid.astype(str)
-        _c1 = list(_c1_list.unique())
-
-      _c2 = _con_mat['Contact_2']
-      if len(_c2) > 0:
-        _c2_df = _lig_df[_lig_df['index'].isin(_c2)]
-        _c2_list = _c2_df.resname +":"+_c2_df.resid.astype(str)
-        _c2 = list(_c2_list.unique())
-
-      _h1d = _con_mat['HBond_1_don']
-      if len(_h1d) > 0:
-        _h1d_df = _rec_df[_rec_df['index'].isin(_h1d)]
-        _h1d_list = _h1d_df.resname +":"+_h1d_df.resid.astype(str)
-        _h1d = list(_h1d_list.unique())
-
-      _h2d = _con_mat['HBond_2_don']
-      if len(_h2d) > 0:
-        _h2d_df = _lig_df[_lig_df['index'].isin(_h2d)]
-        _h2d_list = _h2d_df.resname +":"+_h2d_df.resid.astype(str)
-        _h2d = list(_h2d_list.unique())
-
-      _h1a = _con_mat['HBond_1_acc']
-      if len(_h1a) > 0:
-        _h1a_df = _rec_df[_rec_df['index'].isin(_h1a)]
-        _h1a_list = _h1a_df.resname +":"+_h1a_df.resid.astype(str)
-        _h1a = list(_h1a_list.unique())
-
-      _h2a = _con_mat['HBond_2_acc']
-      if len(_h2a) > 0:
-        _h2a_df = _lig_df[_lig_df['index'].isin(_h2a)]
-        _h2a_list = _h2a_df.resname +":"+_h2a_df.resid.astype(str)
-        _h2a = list(_h2a_list.unique())
-
-      _con_mat['Contact_1'] = _c1
-      _con_mat['Contact_2'] = _c2
-      _con_mat['HBond_1_don'] = _h1d
-      _con_mat['HBond_2_don'] = _h2d
-      _con_mat['HBond_1_acc'] = _h1a
-      _con_mat['HBond_2_acc'] = _h2a
+      if structure_df:
+        _residues = (self.get_pdb_structure_df(_rec_obj), self.get_pdb_structure_df(_lig_obj))
+        _map = self.map_residues_df
+      else:
+        _residues = (self.get_residue_arrays(_rec_obj), self.get_residue_arrays(_lig_obj))
+        _map = self.map_residues
 
-    return _con_mat
+      for _col, _side in self._residue_columns.items():
+        if len(_con_mat[_col]) > 0:
+          _con_mat[_col] = _map(_residues[_side], _con_mat[_col])
 
+    return _con_mat
 
   def setup(self, *args, **kwargs):
     self.update_attributes(self, kwargs)
@@ -1,9 +1,74 @@
 from ..sieveaibase import SieveAIBase
 
 class PluginBase(SieveAIBase):
+  # Threads per job when `cpu_per_job` is not set
+  _cpu_per_job = 1
+  _job_threads = None
+
+  # Fraction of the CPU budget when plugins of a workflow step run concurrently
+  cpu_share = 1.0
+
+  # Plugins consuming EVENTS of `upstream_plugins` may start before those finish
+  consumes_complexes = False
+  upstream_plugins = []
+
   def __init__(self, *args, **kwargs):
     super().__init__(**kwargs)
 
+  @classmethod
+  def streams_from_upstream(cls, settings) -> bool:
+    """Whether Master may start the plugin while its upstream plugins are running."""
+    return bool(cls.consumes_complexes)
+
+  def plan_cpu_budget(self, *args, **kwargs) -> tuple:
+    """Splits `cpu_budget` cores into concurrent jobs and threads per job.
+
+    :param num_jobs|0: Number of jobs to be queued; with fewer jobs than
+      workers the idle cores are given to the jobs instead.
+
+    :return: (max_workers, threads per job)
+    """
+    _num_jobs = kwargs.get('num_jobs', args[0] if len(args) > 0 else None)
+
+    _cpu_count = self.OS.cpu_count() or 1
+    _budget = int(self.SETTINGS.user.cpu_budget or _cpu_count)
+    _budget = max(1, int(min(_budget, _cpu_count) * float(self.cpu_share or 1)))
+    _per_job = int(self.SETTINGS.user.cpu_per_job or 0)
+
+    if not self.SETTINGS.user.multiprocessing:
+      _workers, _per_job = 1, (_per_job or _budget)
+    else:
+      _per_job = max(1, min(_per_job or self._cpu_per_job, _budget))
+      _workers = max(1, _budget // _per_job)
+      if _num_jobs and _num_jobs < _workers:
+        _workers = _num_jobs
+        _per_job = _per_job if self.SETTINGS.user.cpu_per_job else max(_per_job, _budget // _num_jobs)
+
+    self.num_cores = _budget
+    self.max_workers = _workers
+    self._job_threads = min(_per_job, _budget)
+
+    self.log_debug(f'PLUGIN_01: CPU budget {_budget} split into {_workers} job(s) x {self._job_threads} thread(s).')
+    return self.max_workers, self._job_threads
+
+  @property
+  def job_threads(self) -> int:
+    """Threads a single docking/analysis job is allowed to use."""
+    if self._job_threads is None:
+      self.plan_cpu_budget()
+    return self._job_threads
+
+  def job_env(self) -> dict:
+    """Environment for external tools restricted to `job_threads`."""
+    return {**self.OS.environ, 'OMP_NUM_THREADS': str(self.job_threads)}
+
+  def init_multiprocessing(self, *args, **kwargs):
+    """Starts the worker pool sized by `plan_cpu_budget`."""
+    self.plan_cpu_budget(num_jobs=kwargs.pop('num_jobs', None))
+    super().init_multiprocessing(*args, **kwargs)
+    # Default Semaphore(max_workers - 1) blocks forever with a single worker
+    self.semaphore = self.Threading.Semaphore(max(1, self.max_workers))
+
   def installation_instructions(self, *args, **kwargs):
     ...
 
@@ -15,6 +80,9 @@ class PluginBase(SieveAIBase):
 
     if not cuid is None and cuid in self.Complexes:
       _status = self.Complexes[cuid].step.current
+    elif hasattr(self.Complexes, 'columns'):
+      # Indexed store, records are not loaded
+      _status = self.Complexes.columns('uid', 'step')
     else:
       _status = []
       for _idx, _item in self.Complexes.items():
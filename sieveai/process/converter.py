@@ -1,5 +1,53 @@
+import os as OS
+import shutil as SHUTIL
+import subprocess as SubProcess
 from .base import PluginBase
 
 class PluginConverterBase(PluginBase):
+  # {converter method name: tool}: ('command', *argv) prints the version, ('module', *names)
+  # Python packages, ('executable', name) a tool without version flag (path, size and mtime)
+  _converter_tools = {}
+  _tool_versions = {} # Queried once per process, shared by all converters
+
   def __init__(self, *args, **kwargs):
     super().__init__(**kwargs)
+
+  def converter_version(self, method_name) -> str:
+    """Version of the tool behind a converter method, part of the structure cache keys."""
+    _tool = self._converter_tools.get(method_name)
+    if _tool is None:
+      return str(self.plugin_version)
+
+    if not _tool in self._tool_versions:
+      self._tool_versions[_tool] = self._query_tool_version(_tool)
+    return self._tool_versions[_tool]
+
+  @staticmethod
+  def _query_tool_version(tool) -> str:
+    _kind, *_names = tool
+    if _kind == 'module':
+      import importlib as ImportLib
+      _versions = []
+      for _name in _names:
+        try:
+          _versions.append(f"{_name}-{getattr(ImportLib.import_module(_name), '__version__', 'unknown')}")
+        except ImportError:
+          _versions.append(f"{_name}-unknown")
+      return '+'.join(_versions)
+
+    if _kind == 'command':
+      try:
+        _res = SubProcess.run(_names, capture_output=True, text=True, timeout=60)
+        _lines = [_l.strip() for _l in (_res.stdout + _res.stderr).splitlines() if _l.strip()]
+        if len(_lines) > 0:
+          return _lines[0]
+      except (OSError, SubProcess.SubprocessError):
+        pass
+      _names = _names[:1]
+
+    # Executable without version output: changes when the tool is reinstalled
+    _path = SHUTIL.which(_names[0])
+    if _path is None:
+      return f"{_names[0]}-unknown"
+    _stat = OS.stat(_path)
+    return f"{OS.path.realpath(_path)}:{_stat.st_size}:{_stat.st_mtime_ns}"
@@ -1,7 +1,18 @@
 from .base import PluginBase
 from ..sieveaibase import DictConfig
+from ..managers import JobCostModel, StreamPipeline, ComplexStore, TableStore, TableRef, ResultChannel, FileStager, InteractionEngine
 
 class PluginDockingBase(PluginBase):
+  # Prior weights of the job runtime features and the TASKS steps they are measured from
+  _cost_weights = {}
+  _cost_steps = ()
+  CostModel = None
+  _tables = None
+  _result_channel = None
+  _stager = None
+  _interactions = None
+  _interaction_options = {} # InteractionEngine criteria of the plugin's external analysis
+
   def __init__(self, *args, **kwargs):
     super().__init__(**kwargs)
     self.path_sieveai_docking = (self.path_base / 'docking').validate()
@@ -17,6 +28,9 @@ class PluginDockingBase(PluginBase):
     else:
       self.Complexes = DictConfig()
 
+    if self.SETTINGS.user.complexes_backend == 'sqlite' and not isinstance(self.Complexes, ComplexStore):
+      self.Complexes = self._migrate_complexes(self.Complexes)
+
     if 'Receptors' in _plugin_data_ref:
       self.Receptors = _plugin_data_ref.Receptors
     else:
@@ -27,8 +41,45 @@ class PluginDockingBase(PluginBase):
     else:
       self.Ligands = DictConfig()
 
+  def _migrate_complexes(self, complexes) -> ComplexStore:
+    """Moves in-memory complexes to the SQLite store of the project."""
+    _store = ComplexStore(self.path_base / self.SETTINGS.user.file_complexes_db, self.plugin_uid,
+                          int(self.SETTINGS.user.complexes_cache_size or 1024))
+    for _cuid, _record in complexes.items():
+      if isinstance(_record, (dict)):
+        _store[_cuid] = _record
+
+    _store.sync()
+    self.log_debug(f'DOCKING_07: Complexes are stored in {_store}.')
+    return _store
+
+  def _complex_uids(self, *args, **kwargs) -> list:
+    """Returns uids of the complexes that have completed `completed` step (all if None).
+
+    Steps complete in `_step_sequence` order so the last completed step is
+    enough to decide; the SQLite store answers it from an index.
+    """
+    _completed = kwargs.get('completed', args[0] if len(args) > 0 else None)
+    if _completed is None:
+      return list(self.Complexes.keys())
+
+    _sequence = list(self._step_sequence)
+    _last_steps = _sequence[_sequence.index(_completed):] if _completed in _sequence else [_completed]
+
+    if isinstance(self.Complexes, ComplexStore):
+      return self.Complexes.query(last_step=_last_steps)
+
+    _uids = []
+    for _cuid, _cmplx in self.Complexes.items():
+      if isinstance(_cmplx, (dict)) and len(_cmplx.get('steps_completed', [])) > 0 and _cmplx.steps_completed[-1] in _last_steps:
+        _uids.append(_cuid)
+
+    return _uids
+
   def _update_progress(self, *args, **kwargs):
     if hasattr(self, "Complexes"):
+      if isinstance(self.Complexes, ComplexStore):
+        self.Complexes.sync()
       self.SETTINGS.plugin_data[self.plugin_uid].Complexes = self.Complexes
 
     if hasattr(self, "Receptors"):
@@ -39,6 +90,255 @@ class PluginDockingBase(PluginBase):
 
     self.save_progress()
 
+  @classmethod
+  def streams_from_upstream(cls, settings) -> bool:
+    return super().streams_from_upstream(settings) or bool(settings.user.sync_streaming)
+
+  def _init_complex(self, rec_uid, lig_uid):
+    """Creates the complex record for the pair and returns its uid (None if not dockable)."""
+    return None
+
+  def _prepare_stream_molecule(self, mol_group, mol_id) -> bool:
+    """Prepares a streamed molecule (e.g. format conversion), False to drop it."""
+    return True
+
+  def _stream_molecule_events(self):
+    # Molecules already present are paired first, then the upstream stream
+    for _mol_group, _structures in (('receptors', self.Receptors), ('ligands', self.Ligands)):
+      for _mol_id, _mol_obj in _structures.items:
+        yield {'mol_group': _mol_group, 'path': _mol_obj.mol_path}
+
+    yield from self.EVENTS.iterate(*self.upstream_plugins)
+
+  def _stream_prepare(self, event):
+    _mol_group = event.get('mol_group')
+    if not _mol_group in ('receptors', 'ligands') or not event.get('path'):
+      return None
+
+    _structures = self.Receptors if _mol_group == 'receptors' else self.Ligands
+    _mol_id = _structures.add_molecule(event['path'])
+    if not self._prepare_stream_molecule(_mol_group, _mol_id):
+      self.log_debug(f'DOCKING_03: {_mol_id} could not be prepared for streaming.')
+      return None
+
+    with self._stream_lock:
+      if _mol_id in self._stream_ready[_mol_group]:
+        return None
+      self._stream_ready[_mol_group].add(_mol_id)
+
+      if _mol_group == 'receptors':
+        _pairs = [(_mol_id, _lig_uid) for _lig_uid in self._stream_ready['ligands']]
+      else:
+        _pairs = [(_rec_uid, _mol_id) for _rec_uid in self._stream_ready['receptors']]
+
+    _cuids = [self._init_complex(_rec_uid, _lig_uid) for _rec_uid, _lig_uid in _pairs]
+    return [_cuid for _cuid in _cuids if _cuid]
+
+  def _stream_complexes(self, *args, **kwargs) -> dict:
+    """Docks complexes while upstream plugins (StructureSync) are still delivering molecules.
+
+    molecule events -> prepare (conversion, pairing) -> process complex; the
+    stages are connected by bounded queues of `stream_buffer_size`.
+
+    :param last_step|0: Last step of `_process_complex` to run
+
+    :return: Number of items processed per stage
+    """
+    _last_step = kwargs.get('last_step', args[0] if len(args) > 0 else None)
+
+    self.require('threading', 'Threading')
+    self._stream_lock = self.Threading.Lock()
+    self._stream_ready = {'receptors': set(), 'ligands': set()}
+
+    _workers, _ = self.plan_cpu_budget()
+    _on_error = lambda _stage, _item, _e: self.log_error(f'DOCKING_04: Streaming {_stage} failed for {_item}: {_e}')
+
+    _pipeline = StreamPipeline(int(self.SETTINGS.user.stream_buffer_size or 16), _on_error)
+    _pipeline.add_stage('prepare', self._stream_prepare, workers=1)
+    _process = (lambda _cuid: self._process_complex(_cuid, last_step=_last_step)) if _last_step else self._process_complex
+    _pipeline.add_stage('process', _process, workers=_workers)
+
+    self.log_info(f'DOCKING_05: Streaming complexes from {self.upstream_plugins or "local molecules"} using {_pipeline}.')
+    self._open_result_channel()
+    try:
+      _stats = _pipeline.run(self._stream_molecule_events())
+    finally:
+      self._close_result_channel()
+    self.log_debug(f'DOCKING_06: Streaming completed {_stats}.')
+    return _stats
+
+  def _checkpoint_complex(self, cuid) -> None:
+    """Journals the complex after a completed step (see SieveAIBase.checkpoint_complex).
+
+    While pool workers run, the record is sent through the result channel
+    and written by the parent instead (see `_merge_complex`).
+    """
+    if not self._result_channel is None:
+      self._result_channel.put(self.plugin_uid, cuid, self.Complexes[cuid])
+    elif isinstance(self.Complexes, ComplexStore):
+      self.Complexes.flush(cuid)
+    else:
+      self.checkpoint_complex(self.plugin_uid, cuid, self.Complexes[cuid])
+
+  def _merge_complex(self, plugin_uid, cuid, record) -> None:
+    """Result channel writer: merges a worker's copy of the complex and journals it.
+
+    Thread workers already updated the shared record; records of worker
+    processes (more completed steps than the parent knows of) replace it.
+    Snapshots are deferred to `_close_result_channel` as the workers are
+    still changing the records.
+    """
+    _current = self.Complexes.get(cuid)
+    _steps = lambda _r: len(_r.get('steps_completed', [])) if isinstance(_r, (dict)) else -1
+    if _steps(record) > _steps(_current):
+      self.Complexes[cuid] = record
+
+    if isinstance(self.Complexes, ComplexStore):
+      self.Complexes.flush(cuid, record)
+    else:
+      self.checkpoint_complex(plugin_uid, cuid, record, compact=False)
+
+  def _open_result_channel(self) -> ResultChannel:
+    if self._result_channel is None:
+      _on_error = lambda _result, _e: self.log_error(f'DOCKING_08: Could not merge result {_result and _result[1]}: {_e}')
+      self._result_channel = ResultChannel(self._merge_complex, on_error=_on_error).open()
+    return self._result_channel
+
+  def _close_result_channel(self) -> None:
+    """Writes the pending worker results and compacts them into a progress snapshot."""
+    if self._result_channel is None:
+      return
+
+    _channel, self._result_channel = self._result_channel, None
+    _num_results = _channel.close()
+    self.log_debug(f'DOCKING_09: Merged {_num_results} worker result(s).')
+    self._update_progress()
+
+  def init_multiprocessing(self, *args, **kwargs):
+    super().init_multiprocessing(*args, **kwargs)
+    self._open_result_channel()
+
+  def process_queue(self, *args, **kwargs):
+    _result = super().process_queue(*args, **kwargs)
+    if kwargs.get('wait', args[0] if len(args) > 0 else False):
+      self._close_result_channel()
+    return _result
+
+  def queue_final_callback(self, callback=None, *args, **kwargs) -> None:
+    """Merges the worker results before the final callback (e.g. `_finalise_results`) runs."""
+    def _final_callback(*cb_args, **cb_kwargs):
+      self._close_result_channel()
+      return callback(*cb_args, **cb_kwargs)
+
+    super().queue_final_callback(_final_callback if callable(callback) else callback, *args, **kwargs)
+
+  def _publish_complex(self, cuid) -> None:
+    """Notifies downstream plugins (see Master) that a complex is completed; they read it from Complexes."""
+    self.EVENTS.publish(self.plugin_uid, cuid, plugin=self.plugin_uid)
+
+  @property
+  def Tables(self) -> TableStore:
+    if self._tables is None:
+      self._tables = TableStore(self.path_plugin_analysis / 'tables', self.SETTINGS.user.table_format)
+    return self._tables
+
+  @property
+  def Stager(self) -> FileStager:
+    if self._stager is None:
+      self._stager = FileStager(self.SETTINGS.user.staging_mode)
+    return self._stager
+
+  def _stage_file(self, path_source, path_target):
+    """Places a structure at its per-complex path (hardlink|symlink|copy by `staging_mode`)."""
+    return self.Stager.stage(path_source, path_target)
+
+  @property
+  def Interactions(self) -> InteractionEngine:
+    if self._interactions is None:
+      self._interactions = InteractionEngine(**self._interaction_options)
+    return self._interactions
+
+  @property
+  def native_interactions(self) -> bool:
+    return self.SETTINGS.user.interaction_engine == 'native'
+
+  def _store_table(self, cuid, name, table):
+    """Writes a per-complex table to the plugin's table store and returns the reference to keep in the record."""
+    return self.Tables.put(cuid, name, table)
+
+  def _load_table(self, table, columns=None):
+    """Loads a stored table; DataFrames of older progress files are returned as they are."""
+    if isinstance(table, TableRef):
+      return table.load(columns)
+    return table
+
+  def _get_cost_model(self) -> JobCostModel:
+    if self.CostModel is None:
+      _saved = self.SETTINGS.plugin_data[self.plugin_uid].get('cost_model')
+      self.CostModel = JobCostModel.from_dict(_saved, self._cost_weights)
+    return self.CostModel
+
+  def _get_cost_features(self, cuid) -> dict:
+    return {}
+
+  def _estimate_costs(self, cuids) -> dict:
+    """Returns {cuid: estimated runtime} and keeps the features in the complex record."""
+    _model = self._get_cost_model()
+    _costs = {}
+    for _cuid in cuids:
+      try:
+        _features = self._get_cost_features(_cuid)
+        self.Complexes[_cuid].cost_features = _features
+        _costs[_cuid] = _model.estimate(_features)
+      except Exception as _e:
+        self.log_debug(f'DOCKING_01: Cost of {_cuid} could not be estimated: {_e}')
+        _costs[_cuid] = 0.0
+
+    return _costs
+
+  def _order_by_cost(self, cuids, costs) -> list:
+    """Complexes grouped by receptor (costliest group first), longest first within a group.
+
+    Jobs of a receptor stay adjacent in the queue so workers reuse its maps
+    and cached files instead of alternating receptors.
+    """
+    _groups = {}
+    for _cuid in cuids:
+      _groups.setdefault(self.Complexes[_cuid].rec_uid, []).append(_cuid)
+
+    _groups = sorted(_groups.values(), key=lambda _g: sum(costs.get(_c) or 0 for _c in _g), reverse=True)
+    return [_cuid for _group in _groups for _cuid in sorted(_group, key=lambda _c: costs.get(_c) or 0, reverse=True)]
+
+  def _refit_cost_model(self) -> None:
+    """Adds measured step durations of this run to the cost model and refits it."""
+    _model = self._get_cost_model()
+    _tasks = self.TASKS._tasks.get(self.plugin_uid) or {}
+
+    _n_samples = 0
+    # Only complexes with step timings of this run (not every record of the screen)
+    for _cuid in list(_tasks):
+      _cmplx = self.Complexes.get(_cuid)
+      if not isinstance(_cmplx, (dict)) or not 'cost_features' in _cmplx:
+        continue
+
+      for _step in self._cost_steps:
+        _timing = _tasks[_cuid].get(_step)
+        if not _timing or not _timing.get('status') == 1:
+          continue
+        if _timing.get('start') == _cmplx.get('cost_sampled'):
+          break
+
+        if _model.add_sample(_cmplx.cost_features, _timing.get('last') - _timing.get('start')):
+          _cmplx.cost_sampled = _timing.get('start')
+          _n_samples = _n_samples + 1
+        break
+
+    if _n_samples > 0 and _model.fit():
+      self.log_debug(f'DOCKING_02: Cost model refitted with {_n_samples} new samples: {_model}')
+
+    self.SETTINGS.plugin_data[self.plugin_uid].cost_model = _model.to_dict()
+    self.save_progress()
+
   def post_docking(self, *args, **kwargs):
     _compressed_path = (self.path_sieveai_docking / self.plugin_uid).with_suffix('.tar.gz')
 
@@ -4,36 +4,145 @@ class Master(PluginBase):
   def __init__(self, *args, **kwargs):
     super().__init__(**kwargs)
 
+  def _build_workflow_graph(self) -> dict:
+    """Builds the plugin DAG of the workflow.
+
+    Every plugin waits for the plugins of the previous (non-empty) workflow step
+    and for its `dependencies` scheduled in earlier steps. Plugins of the same
+    step are independent. A plugin with `consumes_complexes` only waits for the
+    previous step plugins to start and reads their complexes from EVENTS.
+
+    :return: {node: {step, plugin_uid, ref, after, stream}}
+    """
+    _graph = {}
+    _previous = []
+    for _wf_step in self.iterate(self.SETTINGS.user.workflow_order):
+      _wf_plugins = self.SETTINGS.user.workflow[_wf_step]
+
+      _current = []
+      for _plugin_uid in self.iterate(_wf_plugins):
+        _node = f"{_wf_step}:{_plugin_uid}"
+        _ref = self.SETTINGS.PLUGIN_REFS[_plugin_uid]
+
+        _after = set(_previous)
+        for _dep in (getattr(_ref, 'dependencies', None) or []):
+          _dep_ref = self.SETTINGS.PLUGIN_REFS.get(_dep)
+          _after.update(_n for _n, _d in _graph.items() if _d['ref'] is _dep_ref)
+
+        _stream = set()
+        _streams = getattr(_ref, 'streams_from_upstream', None)
+        if callable(_streams) and _streams(self.SETTINGS):
+          _stream = _after & set(_previous)
+          _after = _after - _stream
+
+        _graph[_node] = {
+          'step': _wf_step,
+          'plugin_uid': _plugin_uid,
+          'ref': _ref,
+          'after': _after,
+          'stream': _stream,
+        }
+        _current.append(_node)
+
+      if len(_current) > 0:
+        _previous = _current
+
+    for _node, _details in _graph.items():
+      _details['cpu_share'] = 1 / sum(1 for _d in _graph.values() if _d['step'] == _details['step'])
+
+    return _graph
+
+  def _run_plugin_node(self, node, graph, started) -> None:
+    _details = graph[node]
+    _plugin_args = {
+      "path_base": self.path_base,
+      "SETTINGS": self.SETTINGS,
+      "current_assignment": _details['step'],
+      "cpu_share": _details['cpu_share'],
+      "upstream_plugins": [graph[_n]['ref'].plugin_uid for _n in _details['stream']],
+    }
+
+    _source = _details['ref'].plugin_uid
+    # Events are only kept for the plugins streaming from this one
+    self.EVENTS.reopen(_source, readers=sum(1 for _d in graph.values() if node in _d['stream']))
+    started[node].set()
+
+    try:
+      _tmp_plg_ref = _details['ref'](**_plugin_args)
+
+      self.log_debug(f"MASTER_01: Adding Plugin Dependency {_details['step'].upper()}:{_details['plugin_uid']}...")
+
+      self.log_info(f"Delegating Task to Plugin: {_details['plugin_uid']}...")
+      _tmp_plg_ref.boot()
+      _tmp_plg_ref.run()
+      _tmp_plg_ref.shutdown()
+    finally:
+      self.EVENTS.close(_source)
+
   def process(self, *args, **kwargs):
     self.update_attributes(self, kwargs)
 
     self.log_debug('SieveAI: Master Process Started.')
 
     self.register_reporter()
+    self.backup_progress()
     self.TASKS.start_step('MasterProcess', 'MasterProcess', self.name)
 
-    for _wf_step in self.iterate(self.SETTINGS.user.workflow_order):
-      _msg = f"Workflow Step {_wf_step.upper()}"
+    self.require('concurrent.futures', 'ConcurrentFutures')
+    self.require('threading', 'Threading')
 
-      _wf_plugins = self.SETTINGS.user.workflow[_wf_step]
+    _graph = self._build_workflow_graph()
+    _status = {_node: None for _node in _graph} # None|running|done|failed|skipped
+    _started = {_node: self.Threading.Event() for _node in _graph}
+    _steps_logged = set()
 
-      if self.is_iterable(_wf_plugins) and len(_wf_plugins) > 0:
-        self.log_info(_msg, hr=True)
+    _errors = {}
+    _max_workers = max(1, int(self.SETTINGS.user.workflow_max_workers or 1))
+    with self.ConcurrentFutures.ThreadPoolExecutor(max_workers=_max_workers) as _pool:
+      _futures = {}
+      while True:
+        for _node, _details in _graph.items():
+          if not _status[_node] is None:
+            continue
 
-      for _plugin_uid in self.iterate(_wf_plugins):
-        _plugin_args = {
-          "path_base": self.path_base,
-          "SETTINGS": self.SETTINGS,
-          "current_assignment": _wf_step
-        }
+          _blocked = [_n for _n in (_details['after'] | _details['stream']) if _status[_n] in ('failed', 'skipped')]
+          if len(_blocked) > 0:
+            _status[_node] = 'skipped'
+            self.log_error(f"MASTER_02: Skipping {_node} as {', '.join(sorted(_blocked))} did not complete.")
+            continue
+
+          _ready = all(_status[_n] == 'done' for _n in _details['after'])
+          _ready = _ready and all(_started[_n].is_set() for _n in _details['stream'])
+          if not _ready:
+            continue
 
-        _tmp_plg_ref = self.SETTINGS.PLUGIN_REFS[_plugin_uid](**_plugin_args)
+          if not _details['step'] in _steps_logged:
+            _steps_logged.add(_details['step'])
+            self.log_info(f"Workflow Step {_details['step'].upper()}", hr=True)
 
-        self.log_debug(f"MASTER_01: Adding Plugin Dependency {_wf_step.upper()}:{_plugin_uid}...")
+          _status[_node] = 'running'
+          _futures[_pool.submit(self._run_plugin_node, _node, _graph, _started)] = _node
 
-        self.log_info(f"Delegating Task to Plugin: {_plugin_uid}...")
-        _tmp_plg_ref.boot()
-        _tmp_plg_ref.run()
-        _tmp_plg_ref.shutdown()
+        if len(_futures) == 0:
+          break
+
+        # Timeout to pick up streaming consumers once their upstream has started
+        _done, _ = self.ConcurrentFutures.wait(list(_futures), timeout=1, return_when=self.ConcurrentFutures.FIRST_COMPLETED)
+        for _future in _done:
+          _node = _futures.pop(_future)
+          try:
+            _future.result()
+            _status[_node] = 'done'
+          except Exception as _e:
+            _status[_node] = 'failed'
+            _errors[_node] = _e
+            self.log_error(f"MASTER_03: Plugin {_node} failed: {_e}")
 
     self.TASKS.end_step('MasterProcess', 'MasterProcess', self.name)
+    self.backup_progress()
+
+    # Independent plugins are finished first, then the run fails like a sequential one
+    if len(_errors) > 0:
+      raise RuntimeError(f"Workflow failed in {', '.join(_errors)}.") from next(iter(_errors.values()))
+
+    return _status
@@ -8,9 +8,16 @@ from UtilityLib.lib.schedule import ScheduleManager
 from UtilityLib import ProjectManager
 
 from tqdm.auto import tqdm as _TQDMPB
+import os as OS
+import gzip as GZip
+import pickle as Pickle
+import time as Time
+import threading as Threading
 
 from .__metadata__ import __version__
 from .managers.plugin import PluginManager
+from .managers.events import ComplexEvents
+from .managers.journal import ProgressJournal
 
 _SM_Ref = ScheduleManager()
 
@@ -20,6 +27,9 @@ class SieveAIBase(ProjectManager):
   EXE_MAP = DictConfig()
   SETTINGS = DictConfig()
   TASKS = TaskManager()
+  EVENTS = ComplexEvents()
+  _progress_lock = Threading.RLock()
+  _journal = None
 
   path_backup_dir = None
   SchReporter = _SM_Ref
@@ -71,19 +81,58 @@ class SieveAIBase(ProjectManager):
     if callable(self.report_callback_fn):
       self.report_callback_fn(self, *args, **kwargs)
 
+  def get_journal(self) -> ProgressJournal:
+    with self._progress_lock:
+      if SieveAIBase._journal is None or not SieveAIBase._journal.path_journal == str(self.path_journal):
+        SieveAIBase._journal = ProgressJournal(self.path_journal)
+      return SieveAIBase._journal
+
+  @property
+  def path_journal(self):
+    return self.SETTINGS.user.path_sob_progress.with_suffix('.journal')
+
+  def backup_progress(self) -> None:
+    """Keeps a timestamped copy of the progress snapshot (on run start and end only)."""
+    with self._progress_lock:
+      self.create_file_backup(self.SETTINGS.user.path_sob_progress, self.path_backup_dir)
+
+  def _dump_settings(self, attempts=5) -> bytes:
+    # Plugins running concurrently may resize their dicts while SETTINGS is pickled
+    for _attempt in range(attempts):
+      try:
+        return Pickle.dumps(self.SETTINGS, protocol=Pickle.HIGHEST_PROTOCOL)
+      except RuntimeError:
+        if _attempt == attempts - 1:
+          raise
+        Time.sleep(0.05)
+
   def save_progress(self, *args, **kwargs):
-    """
-      Copy previous version with timestamp
-      Pickle SETTINGS
+    """Writes a snapshot of SETTINGS and compacts the journal into it.
+
+      Pickle SETTINGS in memory, then replace the snapshot (gzip pickle, see `unpickle`)
+      Journal appends wait on the same lock, so every journalled record is in the snapshot
       Collect all settings and data from different plugins (Memory Management?)
     """
-    self.create_file_backup(self.SETTINGS.user.path_sob_progress, self.path_backup_dir)
-    # Limit backup files to last 10
-    self.pickle(self.SETTINGS.user.path_sob_progress, self.SETTINGS)
+    with self._progress_lock:
+      _data = self._dump_settings()
+      _path = str(self.SETTINGS.user.path_sob_progress)
+      _tmp = f"{_path}.{OS.getpid()}.tmp"
+      with GZip.open(_tmp, 'wb') as _fh:
+        _fh.write(_data)
+      OS.replace(_tmp, _path)
+      # Snapshot includes every journalled record
+      self.get_journal().reset()
+
+  def checkpoint_complex(self, plugin_uid, cuid, record, compact=True) -> None:
+    """Journals the state of one complex; a snapshot is written every `progress_compact_every` records."""
+    with self._progress_lock:
+      _num_records = self.get_journal().append(plugin_uid, cuid, record)
+      if compact and _num_records >= int(self.SETTINGS.user.progress_compact_every or 1000):
+        self.save_progress()
 
   def restore_progress(self, *args, **kwargs):
     """
-      Read pickle file
+      Read pickle file and replay the journal written after it
       If there is any issue check SETTINGS backup and restore progress from there
     """
     if self.SETTINGS.user.path_sob_progress.exists() and self.SETTINGS.user.path_sob_progress.size > 0:
@@ -91,6 +140,14 @@ class SieveAIBase(ProjectManager):
       _s = self.unpickle(self.SETTINGS.user.path_sob_progress)
       self.SETTINGS.update(_s)
 
+    _num_replayed = 0
+    for _plugin_uid, _cuid, _record in self.get_journal().replay():
+      self.SETTINGS.plugin_data[_plugin_uid].Complexes[_cuid] = _record
+      _num_replayed = _num_replayed + 1
+
+    if _num_replayed > 0:
+      self.log_debug(f'BASE_01: Replayed {_num_replayed} journal records over the progress snapshot.')
+
   def get_plugin(self, _plugin_name):
     """Share plugin reference"""
     return self.PLUGINS[_plugin_name]
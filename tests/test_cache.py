@@ -0,0 +1,43 @@
+import os as OS
+import time as Time
+
+from sieveai.managers.cache import DiskCache
+
+def _commit(cache, key, data=b'x' * 1024):
+  _staged = cache.stage(key)
+  (_staged / 'receptor.A.map').write_bytes(data)
+  return cache.commit(key, _staged)
+
+def _age(cache, key, seconds):
+  _time = Time.time() - seconds
+  OS.utime(str(cache.path(key)), (_time, _time))
+
+def test_entries_in_use_are_not_evicted(tmp_path):
+  _cache = DiskCache(tmp_path / 'maps', max_age=60)
+  _commit(_cache, 'in-use')
+  _commit(_cache, 'idle')
+
+  with _cache.use('in-use') as _entry:
+    assert not _entry is None
+    _age(_cache, 'in-use', 3600)
+    _age(_cache, 'idle', 3600)
+    _removed = _cache.evict()
+
+    assert [OS.path.basename(_p) for _p in _removed] == ['idle']
+    assert (_entry / 'receptor.A.map').exists()
+
+  # Released: expired entries go on the next eviction
+  _age(_cache, 'in-use', 3600)
+  assert len(_cache.evict()) == 1
+  with _cache.use('in-use') as _entry:
+    assert _entry is None
+
+def test_fetch_places_single_file_entries(tmp_path):
+  _cache = DiskCache(tmp_path / 'structures')
+  _source = tmp_path / 'ligand.pdbqt'
+  _source.write_text('ATOM\n')
+
+  assert not _cache.fetch('ligand', tmp_path / 'missing.pdbqt')
+  _cache.put('ligand', _source)
+  assert _cache.fetch('ligand', tmp_path / 'staged.pdbqt')
+  assert (tmp_path / 'staged.pdbqt').read_text() == 'ATOM\n'
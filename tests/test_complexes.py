@@ -0,0 +1,39 @@
+from sieveai.sieveaibase import DictConfig
+from sieveai.managers.complexes import ComplexStore
+
+def _record(cuid):
+  return DictConfig(uid=cuid, rec_uid='R1', lig_uid=cuid, steps_completed=['init'])
+
+def test_records_held_by_workers_survive_eviction(tmp_path):
+  _store = ComplexStore(tmp_path / 'complexes.db', 'Vina', 2)
+  for _i in range(4):
+    _store[f'c{_i}'] = _record(f'c{_i}')
+
+  # A worker holds c0 while other complexes push it out of the cache
+  _held = _store['c0']
+  _store['c1'], _store['c2'], _store['c3']
+  assert not 'c0' in _store._cache
+
+  _held.steps_completed.append('dock')
+  assert _store['c0'] is _held
+  assert _store.query(last_step='dock') == ['c0']
+
+  _store.close()
+  _reopened = ComplexStore(tmp_path / 'complexes.db', 'Vina', 2)
+  assert _reopened['c0'].steps_completed == ['init', 'dock']
+
+def test_queries_do_not_rewrite_records(tmp_path):
+  _store = ComplexStore(tmp_path / 'complexes.db', 'Vina', 4)
+  for _i in range(3):
+    _store[f'c{_i}'] = _record(f'c{_i}')
+
+  _writes = []
+  _write = _store._write
+  _store._write = lambda *args: _writes.append(args[0]) or _write(*args)
+
+  _store['c1'].steps_completed.append('dock')
+  for _ in range(10):
+    assert _store.query(last_step='dock') == ['c1']
+    assert len(_store.columns('uid', 'step')) == 3
+
+  assert _writes == []
@@ -0,0 +1,71 @@
+import sys as SYS
+
+import pytest
+
+from sieveai.managers.sessions import RESTSession, RESTSessionError, SessionPool
+
+# Answers GET /run?command=... like `remotecontrol rest start port N json true`
+_STUB_SERVER = r'''
+import sys, json, threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import urlparse, parse_qs
+
+class Handler(BaseHTTPRequestHandler):
+  def do_GET(self):
+    _command = parse_qs(urlparse(self.path).query).get('command', [''])[0]
+    _reply = {'error': None, 'log messages': {'info': [_command]}}
+    if _command.startswith('open') and 'missing' in _command:
+      _reply['error'] = {'message': 'File not found'}
+    _body = json.dumps(_reply).encode()
+    self.send_response(200)
+    self.send_header('Content-Type', 'application/json')
+    self.send_header('Content-Length', str(len(_body)))
+    self.end_headers()
+    self.wfile.write(_body)
+    if _command == 'exit':
+      threading.Thread(target=self.server.shutdown).start()
+
+  def log_message(self, *args):
+    pass
+
+HTTPServer(('127.0.0.1', int(sys.argv[1])), Handler).serve_forever()
+'''
+
+@pytest.fixture
+def launcher(tmp_path):
+  # Launcher parts are formatted with the port, so the server is passed as a file
+  _path_server = tmp_path / 'stub_rest_server.py'
+  _path_server.write_text(_STUB_SERVER)
+  return [SYS.executable, str(_path_server), '{port}']
+
+def test_session_runs_commands_on_free_port(launcher):
+  _session = RESTSession(launcher=launcher, start_timeout=20)
+  try:
+    _session.start()
+    assert _session.port > 0
+    assert _session.run('open analysis.cxc')['log messages']['info'] == ['open analysis.cxc']
+    assert _session.num_jobs == 1
+    with pytest.raises(RESTSessionError):
+      _session.run('open missing.cxc')
+  finally:
+    _session.stop()
+
+  assert not _session.is_running
+
+def test_pool_port_zero_uses_free_ports_and_restarts(launcher):
+  with SessionPool(2, base_port=0, max_jobs=2, launcher=launcher, start_timeout=20) as _pool:
+    assert all(_session.port is None for _session in _pool.sessions)
+    for _i in range(6):
+      _pool.run_script(f'complex-{_i}.cxc')
+
+    _ports = [_session.port for _session in _pool.sessions]
+    assert all(_ports) and len(set(_ports)) == 2
+    assert _pool.num_restarts > 0
+
+def test_pool_recovers_from_crashed_session(launcher):
+  with SessionPool(1, launcher=launcher, start_timeout=20) as _pool:
+    _pool.run_script('first.cxc')
+    _pool.sessions[0].process.kill()
+    _pool.sessions[0].process.wait()
+    assert _pool.run_script('second.cxc')['error'] is None
+    assert _pool.sessions[0].num_starts == 2
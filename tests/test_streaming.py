@@ -0,0 +1,90 @@
+import threading as Threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+_PDB = """ATOM      1  N   ALA A   1      11.104   6.134  -6.504  1.00  0.00           N
+ATOM      2  CA  ALA A   1      11.639   6.071  -5.147  1.00  0.00           C
+ATOM      3  C   ALA A   1      13.155   5.888  -5.187  1.00  0.00           C
+END
+"""
+
+class _StubRCSB(BaseHTTPRequestHandler):
+  """Serves `/<PDB ID>.pdb` like files.rcsb.org/download."""
+  requests = []
+
+  def do_GET(self):
+    self.requests.append(self.path)
+    _body = _PDB.encode()
+    self.send_response(200)
+    self.send_header('Content-Type', 'text/plain')
+    self.send_header('Content-Length', str(len(_body)))
+    self.end_headers()
+    self.wfile.write(_body)
+
+  def log_message(self, *args):
+    pass
+
+@pytest.fixture
+def stub_rcsb():
+  _server = ThreadingHTTPServer(('127.0.0.1', 0), _StubRCSB)
+  _thread = Threading.Thread(target=_server.serve_forever, daemon=True)
+  _thread.start()
+  yield f"http://127.0.0.1:{_server.server_address[1]}"
+  _server.shutdown()
+  _server.server_close()
+
+@pytest.fixture
+def project(tmp_path, monkeypatch):
+  # ~/.SieveAI (master config and caches) inside the test directory
+  monkeypatch.setenv('HOME', str(tmp_path / 'home'))
+  (tmp_path / 'home' / '.SieveAI').mkdir(parents=True)
+  (tmp_path / 'home' / '.SieveAI' / 'sieveai.config.toml').write_text('[EXE_PATHS]\n')
+  _path_base = tmp_path / 'project'
+  (_path_base / 'receptors').mkdir(parents=True)
+  (_path_base / 'ligands').mkdir()
+  (_path_base / 'receptors.pdb.txt').write_text('1ABC\n')
+  (_path_base / 'ligands.pdb.txt').write_text('2XYZ\n')
+  return _path_base
+
+def test_hdocklite_docks_streamed_structures(project, stub_rcsb):
+  from sieveai.managers.config import ConfigManager
+  from sieveai.plugins.structuresync import StructureSync
+  from sieveai.plugins.hdocklite import HDockLite
+
+  _config = ConfigManager(path_base=project)
+  _config.SETTINGS.user.update({
+    'sync_streaming': True,
+    'sync_url_rcsb': stub_rcsb,
+    'multiprocessing': False,
+  })
+
+  _config.EVENTS.reopen(StructureSync.plugin_uid, readers=1)
+  _sync = StructureSync(path_base=project, SETTINGS=_config.SETTINGS)
+  _hdock = HDockLite(path_base=project, SETTINGS=_config.SETTINGS, upstream_plugins=[StructureSync.plugin_uid])
+  _hdock.boot()
+
+  # hdock, hdockpl and the interaction analysis are external tools
+  _docked = []
+  _hdock._steps_map_methods.update({
+    'dock': _docked.append,
+    'extract': lambda _cuid: _cuid,
+    'analyse': lambda _cuid: _cuid,
+  })
+
+  def _fetch():
+    try:
+      _sync.boot()
+      _sync.run()
+    finally:
+      _config.EVENTS.close(StructureSync.plugin_uid)
+
+  _thread = Threading.Thread(target=_fetch)
+  _thread.start()
+  _stats = _hdock._stream_complexes()
+  _thread.join()
+
+  assert sorted(_StubRCSB.requests) == ['/1ABC.pdb', '/2XYZ.pdb']
+  assert _docked == ['1ABC--2XYZ']
+  assert _stats['process'] == 1
+  assert _hdock.Complexes['1ABC--2XYZ'].steps_completed == list(_hdock._step_sequence)